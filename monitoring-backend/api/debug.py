@@ -1,15 +1,15 @@
 from fastapi import APIRouter
-from debug.pipeline_state import PIPELINE_STATE
+from debug.pipeline_state import get_state
 
 router = APIRouter(prefix="/debug")
 
 
 @router.get("/pipeline")
 def get_pipeline_state():
-    return PIPELINE_STATE
+    return get_state()
 
 pipeline_router = APIRouter(prefix="/pipeline")
 
 @pipeline_router.get("/status")
 def get_pipeline_status():
-    return PIPELINE_STATE
+    return get_state()
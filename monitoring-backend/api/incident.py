@@ -1,25 +1,155 @@
-from fastapi import APIRouter, Body, HTTPException
+import hashlib
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
 from correlation.incident_manager import IncidentManager, ApprovalStatus, ApprovalLockError
 from pydantic import BaseModel
 from typing import Optional, Literal
 from datetime import datetime
 from enum import Enum
+from storage.database import SessionLocal
+from storage.incident_repository import get_incident_history, get_incident_record
+from storage.timestamps import from_epoch_us, parse_timestamp_us
+from streaming.event_hub import encode_json
 
 router = APIRouter(prefix="/incident", tags=["incident"])
 
+HISTORY_MAX_LIMIT = 200
+
+# Body of /current when there is no incident
+_NO_INCIDENT = encode_json(None)
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 class ApprovalRequest(BaseModel):
     incident_id: str
     decision: Literal["APPROVE", "REJECT"]
     actor: str
     comment: Optional[str] = None
 
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # Weak comparison, as If-None-Match requires: W/ prefixes are ignored
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+def _with_duration(incident, body: bytes) -> bytes:
+    """Cached incident body with the live duration_seconds appended (the body is a JSON object)."""
+    return body[:-1] + b',"duration_seconds":' + repr(incident.duration_seconds()).encode() + b"}"
+
+def _json_response(request: Request, body: bytes, etag: str) -> Response:
+    """The body, or 304 without one if the client already has this ETag."""
+    # no-cache: clients may keep the body but must revalidate on every poll
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/current")
-def get_current_incident():
+def get_current_incident(request: Request):
     """
     Returns the active incident (OPEN, ONGOING, or RESOLVED) or null if none.
+    The body is encoded once per incident version; send its (weak) ETag
+    back in If-None-Match to get 304 while it is unchanged. Only the live
+    duration_seconds changes between versions, so clients holding a 304
+    compute it from started_at.
     """
     manager = IncidentManager.get_instance()
-    return manager.get_current()
+    current = manager.active_incident
+    if current is None:
+        return _json_response(request, *_NO_INCIDENT)
+    body, etag = current.to_json()
+    return _json_response(request, _with_duration(current, body), f"W/{etag}")
+
+@router.get("/active")
+def get_active_incidents(request: Request):
+    """
+    Returns every open (OPEN or ONGOING) incident, oldest first.
+    Supports If-None-Match like /current.
+    Returns: { "incidents": [...] }
+    """
+    manager = IncidentManager.get_instance()
+    incidents = manager.open_incidents
+    encoded = [incident.to_json() for incident in incidents]
+    # Cached per incident: building the list is a join, its ETag a hash of theirs
+    body = b'{"incidents":[' + b",".join(
+        _with_duration(incident, body) for incident, (body, _) in zip(incidents, encoded)
+    ) + b"]}"
+    etag = 'W/"' + hashlib.blake2b("".join(tag for _, tag in encoded).encode(), digest_size=8).hexdigest() + '"'
+    return _json_response(request, body, etag)
+
+def _iso_us(ts_us: Optional[int]) -> Optional[str]:
+    return from_epoch_us(ts_us).isoformat() if ts_us is not None else None
+
+def _history_entry(record: dict) -> dict:
+    """A persisted incident in the shape of Incident.to_dict (times as ISO strings)."""
+    entry = {key: value for key, value in record.items() if not key.endswith("_us")}
+    entry["started_at"] = _iso_us(record["started_us"])
+    entry["last_seen_at"] = _iso_us(record["last_seen_us"])
+    entry["resolved_at"] = _iso_us(record["resolved_us"])
+    return entry
+
+@router.get("/history")
+def get_incident_history_page(limit: int = 50, cursor: Optional[str] = None,
+                              status: Optional[str] = None, severity: Optional[str] = None,
+                              service: Optional[str] = None, since: Optional[str] = None,
+                              until: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Persisted incidents, newest first, optionally filtered by status,
+    severity, service and start time (since / until, ISO-8601).
+    Pass the returned next_cursor to get the following page; it is null
+    on the last page. Writes reach the store within
+    INCIDENT_STORE_FLUSH_SECONDS.
+    Returns: { "incidents": [...], "next_cursor": str | null }
+    """
+    if not 1 <= limit <= HISTORY_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {HISTORY_MAX_LIMIT}")
+    before = None
+    if cursor:
+        started_us, _, incident_id = cursor.partition(":")
+        if not started_us.isdigit() or not incident_id:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        before = (int(started_us), incident_id)
+    try:
+        since_us = parse_timestamp_us(since) if since else None
+        until_us = parse_timestamp_us(until) if until else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since / until must be ISO-8601 timestamps")
+
+    # One extra row tells whether another page exists
+    records = get_incident_history(
+        db, limit + 1, before=before,
+        status=status.upper() if status else None,
+        severity=severity.upper() if severity else None,
+        service=service, since_us=since_us, until_us=until_us
+    )
+    page = records[:limit]
+    next_cursor = f"{page[-1]['started_us']}:{page[-1]['incident_id']}" if len(records) > limit else None
+    return {"incidents": [_history_entry(record) for record in page], "next_cursor": next_cursor}
+
+@router.get("/history/{incident_id}")
+def get_incident_history_entry(incident_id: str, db: Session = Depends(get_db)):
+    """A persisted incident with the snapshot of every detection window attributed to it."""
+    record = get_incident_record(db, incident_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+    entry = _history_entry(record)
+    entry["snapshots"] = [
+        {**{key: value for key, value in snapshot.items() if key not in ("incident_id", "ts_us")},
+         "at": _iso_us(snapshot["ts_us"])}
+        for snapshot in record["snapshots"]
+    ]
+    return entry
 
 @router.get("/similar")
 def get_similar_incidents():
@@ -62,12 +192,18 @@ def approve_incident_endpoint(request: ApprovalRequest = Body(...)):
 from reasoning.agent import OfflineReasoningAgent as ReasoningAgent, IncidentReasoningRequest, ReasoningResult
 
 @router.post("/reason", response_model=ReasoningResult)
-def reason_about_incident(force_refresh: bool = False):
+def reason_about_incident(force_refresh: bool = False, incident_id: Optional[str] = None):
     """
-    Analyzes the current active incident using the Reasoning Agent.
+    Analyzes an incident (default: the current active one) using the Reasoning Agent.
     """
     manager = IncidentManager.get_instance()
-    current_data = manager.get_current()
+    if incident_id:
+        incident = manager.get_incident(incident_id)
+        if not incident:
+            raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+        current_data = incident.to_dict()
+    else:
+        current_data = manager.get_current()
     
     if not current_data:
         raise HTTPException(status_code=409, detail="No active incident to reason about")
@@ -1,24 +1,136 @@
+import json
+import os
 from datetime import datetime
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 
 from schemas.log_schema import LogEntry
-from storage.database import SessionLocal
-from storage.log_repository import save_log
+from ingestion.writer import LogWriter
+from ingestion.admission import AdmissionController, INGEST_RETRY_AFTER_SECONDS
+from storage.timestamps import parse_timestamp_us
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Upper bound on entries accepted by a single POST /ingest/logs call
+MAX_BATCH_SIZE = int(os.getenv("INGEST_MAX_BATCH_SIZE", "5000"))
+RETRY_AFTER_HEADERS = {"Retry-After": str(INGEST_RETRY_AFTER_SECONDS)}
 
 from debug.pipeline_state import update_state
 
+def _to_row(log: LogEntry) -> dict:
+    """Builds the storage row. The timestamp is parsed once here; raises ValueError if invalid."""
+    row = log.dict()
+    try:
+        row["ts_us"] = parse_timestamp_us(log.timestamp)
+    except ValueError:
+        raise ValueError(f"timestamp: invalid ISO-8601 value {log.timestamp!r}")
+    return row
+
 @router.post("/ingest/log")
-def ingest_log(log: LogEntry, db: Session = Depends(get_db)):
-    save_log(db, log.dict())
-    update_state(last_ingest_at=datetime.utcnow().isoformat())
+async def ingest_log(log: LogEntry):
+    try:
+        row = _to_row(log)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    admitted, _ = AdmissionController.get_instance().admit([row])
+    if not admitted:
+        raise HTTPException(status_code=429, detail="Ingest overloaded, log shed", headers=RETRY_AFTER_HEADERS)
+    update_state(last_ingest_at=datetime.utcnow().isoformat(), ingest_queue_depth=LogWriter.get_instance().depth())
     return {"status": "ok"}
+
+
+def _parse_batch(body: bytes, content_type: str) -> List[Tuple[int, Any]]:
+    """
+    Decodes a JSON array or NDJSON body into (index, item) pairs.
+    NDJSON lines that fail to decode are kept as ValueError items so they
+    can be reported per line instead of failing the whole batch.
+    """
+    text = body.decode("utf-8")
+    if "ndjson" not in content_type and text.lstrip().startswith("["):
+        try:
+            items = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON array: {e}")
+        return list(enumerate(items))
+
+    parsed = []
+    for index, line in enumerate(l for l in text.splitlines() if l.strip()):
+        try:
+            parsed.append((index, json.loads(line)))
+        except ValueError as e:
+            parsed.append((index, ValueError(f"Invalid JSON: {e}")))
+    return parsed
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+def _validate_batch(items: List[Tuple[int, Any]]) -> Tuple[List[dict], List[int], List[Dict[str, Any]]]:
+    """
+    Validates every item and splits the batch into insertable rows (with their
+    original indices) and per-item errors.
+    """
+    rows = []
+    row_indices = []
+    rejected = []
+    for index, item in items:
+        if isinstance(item, ValueError):
+            rejected.append({"index": index, "error": str(item)})
+            continue
+        if not isinstance(item, dict):
+            rejected.append({"index": index, "error": "Expected a JSON object"})
+            continue
+        try:
+            rows.append(_to_row(LogEntry(**item)))
+            row_indices.append(index)
+        except ValidationError as e:
+            rejected.append({"index": index, "error": _format_validation_error(e)})
+        except ValueError as e:
+            rejected.append({"index": index, "error": str(e)})
+    return rows, row_indices, rejected
+
+@router.post("/ingest/logs")
+async def ingest_logs(request: Request):
+    """
+    Bulk ingest. Accepts a JSON array of log entries or NDJSON (one entry per line),
+    validates them as a batch and hands all valid entries to the group-commit writer.
+    Invalid entries are reported per item and do not block the rest of the batch.
+
+    Under overload part of the batch may be shed: shed indices are listed so the
+    client can resend them after Retry-After. If nothing was admitted the
+    response is a 429.
+    """
+    body = await request.body()
+    try:
+        items = _parse_batch(body, request.headers.get("content-type", ""))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch of {len(items)} entries exceeds limit of {MAX_BATCH_SIZE}")
+
+    rows, row_indices, rejected = _validate_batch(items)
+    admitted, shed_positions = AdmissionController.get_instance().admit(rows)
+    if admitted:
+        update_state(last_ingest_at=datetime.utcnow().isoformat(), ingest_queue_depth=LogWriter.get_instance().depth())
+
+    status = "ok"
+    if shed_positions:
+        status = "partial" if admitted else "shed"
+
+    result = {
+        "status": status,
+        "received": len(items),
+        "accepted": admitted,
+        "rejected": len(rejected),
+        "shed": len(shed_positions),
+        "shed_indices": [row_indices[i] for i in shed_positions],
+        "errors": rejected
+    }
+    if shed_positions:
+        status_code = 429 if not admitted else 200
+        return JSONResponse(result, status_code=status_code, headers=RETRY_AFTER_HEADERS)
+    return result
@@ -0,0 +1,92 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from storage.database import SessionLocal
+from storage.rollups import RESOLUTIONS, query_rollups
+from storage.partitions import LOG_PARTITION_GRANULARITY, LOG_RETENTION_HOURS, partition_stats
+from detection.registry import DetectorRegistry
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _pick_resolution(span_seconds: int) -> str:
+    if span_seconds <= 30 * 60:
+        return "second"
+    if span_seconds <= 2 * 86400:
+        return "minute"
+    return "hour"
+
+@router.get("/timeline")
+def get_timeline(minutes: int = 15, service: Optional[str] = None, endpoint: Optional[str] = None,
+                 resolution: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Traffic, error and latency time series over the last `minutes`, read
+    from the rollup tables (never from raw logs). Resolution is picked from
+    the span unless given explicitly (second / minute / hour).
+    """
+    if minutes <= 0:
+        raise HTTPException(status_code=400, detail="minutes must be positive")
+    if resolution is None:
+        resolution = _pick_resolution(minutes * 60)
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {list(RESOLUTIONS)}")
+
+    end_s = int(time.time()) + 1
+    start_s = end_s - minutes * 60
+    points = []
+    for bucket in query_rollups(db, resolution, start_s, end_s, service=service, endpoint=endpoint):
+        count = bucket["row_count"]
+        points.append({
+            "bucket_start": datetime.fromtimestamp(bucket["bucket_start"], tz=timezone.utc).isoformat(),
+            "count": count,
+            "error_count": bucket["error_count"],
+            "error_rate": bucket["error_count"] / count if count else 0.0,
+            "avg_latency": bucket["latency_sum"] / bucket["latency_count"] if bucket["latency_count"] else 0.0,
+            "min_latency": bucket["latency_min"],
+            "max_latency": bucket["latency_max"],
+            "avg_retry": bucket["retry_sum"] / bucket["retry_count"] if bucket["retry_count"] else 0.0,
+        })
+
+    return {
+        "resolution": resolution,
+        "service": service,
+        "endpoint": endpoint,
+        "start": datetime.fromtimestamp(start_s, tz=timezone.utc).isoformat(),
+        "end": datetime.fromtimestamp(end_s, tz=timezone.utc).isoformat(),
+        "points": points
+    }
+
+@router.get("/storage")
+def get_storage_status(db: Session = Depends(get_db)):
+    """Row counts and on-disk size of each raw log partition."""
+    partitions = partition_stats(db)
+    return {
+        "granularity": LOG_PARTITION_GRANULARITY,
+        "retention_hours": LOG_RETENTION_HOURS,
+        "total_rows": sum(p["rows"] for p in partitions),
+        "total_bytes": sum((p["table_bytes"] or 0) + (p["index_bytes"] or 0) for p in partitions),
+        "partitions": partitions
+    }
+
+@router.get("/detectors")
+def get_detector_stats():
+    """Registered detectors with their run / hit / error counts and evaluation cost."""
+    registry = DetectorRegistry.get_instance()
+    detectors = []
+    for detector in registry.detectors:
+        stats = registry.stats[detector.name]
+        detectors.append({
+            "name": detector.name,
+            "expensive": detector.expensive,
+            **stats,
+            "avg_ms": stats["total_ms"] / stats["runs"] if stats["runs"] else None,
+        })
+    return {"detectors": detectors}
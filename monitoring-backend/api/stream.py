@@ -0,0 +1,70 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from correlation.incident_manager import IncidentManager
+from debug.pipeline_state import get_state
+from streaming.event_hub import EventHub, RESYNC, STREAM_KEEPALIVE_SECONDS, Event, Subscriber, encode_json
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+# Frames written to the socket in one go when a client has a backlog
+MAX_BATCH = 64
+
+def _snapshot() -> Event:
+    """Everything a client shows, with the current incident's and each open incident's cached body."""
+    manager = IncidentManager.get_instance()
+    current = manager.active_incident
+    incidents = b",".join(incident.to_json()[0] for incident in manager.open_incidents)
+    pipeline, _ = encode_json(get_state())
+    attack = EventHub.get_instance().retained.get("attack", b"null")
+    body = (b'{"current":' + (current.to_json()[0] if current else b"null")
+            + b',"incidents":[' + incidents + b'],"pipeline":' + pipeline
+            + b',"attack":' + attack + b"}")
+    return EventHub.get_instance().event("snapshot", body)
+
+async def _event_stream(request: Request, subscriber: Subscriber):
+    hub = EventHub.get_instance()
+    try:
+        yield _snapshot().frame
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # Comment line: keeps proxies from closing an idle stream
+                yield b": keepalive\n\n"
+                continue
+            events = [event]
+            while len(events) < MAX_BATCH and not subscriber.queue.empty():
+                events.append(subscriber.queue.get_nowait())
+            yield b"".join(_snapshot().frame if event is RESYNC else event.frame for event in events)
+    finally:
+        hub.unsubscribe(subscriber)
+
+@router.get("/events")
+async def stream_events(request: Request):
+    """
+    Server-Sent Events replacing the dashboard's polling of
+    /incident/current, /pipeline/status and /attack/status.
+
+    Events (data is JSON):
+      snapshot  {"current", "incidents" (open), "pipeline", "attack"}: first
+                event, and again whenever the client fell behind or state was
+                reset; replaces everything the client holds
+      incident  an incident (same shape as /incident/current, without the
+                live duration_seconds: compute it from started_at) that changed;
+                ignore it if its version is older than the one held
+      current   {"incident_id"}: the current incident changed
+      pipeline  the pipeline state keys that changed
+      attack    the attack backend status, when it changed
+    """
+    subscriber = EventHub.get_instance().subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many stream clients")
+    return StreamingResponse(
+        _event_stream(request, subscriber),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: reverse proxies (nginx) must not buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-service window metrics for the detector.
+
+Compares three ways of getting global + per-service error rate and
+latency for one 60 s window:
+  objects   - list of log objects, one list comprehension per service
+              (the original detect_anomaly dominance block)
+  masks     - NumPy columns, one boolean mask per service
+  bincount  - NumPy columns, one bincount per field (stats_from_columns)
+
+Usage:
+    python bench_detection_metrics.py [rows] [service counts...]
+    python bench_detection_metrics.py 20000 10 100 500
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from detection.aggregation import combine_stats, compute_avg_latency, compute_error_rate, stats_from_columns
+
+REPEATS = 5
+
+def make_logs(rows: int, services: int):
+    rng = np.random.default_rng(42)
+    codes = rng.integers(0, services, rows)
+    levels = rng.random(rows) < 0.05
+    statuses = np.where(rng.random(rows) < 0.08, 500, 200)
+    latencies = rng.integers(10, 400, rows)
+    retries = rng.integers(0, 3, rows)
+    names = [f"service-{i}" for i in range(services)]
+    logs = [
+        SimpleNamespace(service=names[codes[i]], level="ERROR" if levels[i] else "INFO",
+                        status_code=int(statuses[i]), latency_ms=int(latencies[i]), retry_count=int(retries[i]))
+        for i in range(rows)
+    ]
+    columns = {
+        "service": codes.astype(np.int32),
+        "is_error": levels | (statuses >= 400),
+        "is_level_error": levels,
+        "latency": latencies.astype(np.float64),
+        "retry": retries.astype(np.float64),
+    }
+    return logs, columns, names
+
+def metrics_objects(logs):
+    error_rate = sum(1 for l in logs if (l.status_code is not None and l.status_code >= 400) or l.level == "ERROR") / len(logs)
+    latencies = [l.latency_ms for l in logs if l.latency_ms is not None]
+    per_service = {}
+    for svc in set(l.service for l in logs):
+        svc_logs = [l for l in logs if l.service == svc]
+        err_count = sum(1 for l in svc_logs if l.level == "ERROR")
+        svc_latencies = [l.latency_ms for l in svc_logs if l.latency_ms is not None]
+        per_service[svc] = (err_count / len(svc_logs), sum(svc_latencies) / len(svc_latencies))
+    return error_rate, sum(latencies) / len(latencies), per_service
+
+def metrics_masks(columns, names):
+    service = columns["service"]
+    per_service = {}
+    for code in np.unique(service):
+        mask = service == code
+        per_service[names[code]] = (columns["is_level_error"][mask].mean(), columns["latency"][mask].mean())
+    return columns["is_error"].mean(), columns["latency"].mean(), per_service
+
+def metrics_bincount(columns, names):
+    by_service = stats_from_columns(columns, names)
+    total = combine_stats(by_service)
+    per_service = {
+        svc: (stats["level_error_count"] / stats["row_count"], compute_avg_latency(stats))
+        for svc, stats in by_service.items()
+    }
+    return compute_error_rate(total), compute_avg_latency(total), per_service
+
+def best_ms(fn, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def same(a, b):
+    return (np.isclose(a[0], b[0]) and np.isclose(a[1], b[1]) and a[2].keys() == b[2].keys()
+            and all(np.allclose(a[2][svc], b[2][svc]) for svc in a[2]))
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    service_counts = [int(arg) for arg in sys.argv[2:]] or [10, 100, 500]
+    print(f"Per-service window metrics over {rows:,} logs (best of {REPEATS})")
+    for services in service_counts:
+        logs, columns, names = make_logs(rows, services)
+        objects_ms, expected = best_ms(metrics_objects, logs)
+        masks_ms, masks_result = best_ms(metrics_masks, columns, names)
+        bincount_ms, bincount_result = best_ms(metrics_bincount, columns, names)
+        assert same(expected, masks_result) and same(expected, bincount_result)
+        print(f"{services:>5} services | objects {objects_ms:8.2f} ms | masks {masks_ms:8.2f} ms | "
+              f"bincount {bincount_ms:8.2f} ms | {objects_ms / bincount_ms:6.1f}x")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: detection window queries vs. table size.
+
+Fills a scratch SQLite database with N historical logs plus a fixed-size
+"live" 10-minute window (routed into the daily log partitions), then times the two window aggregate queries that
+every detection tick makes (60 s short window + 9 min baseline), with and
+without the partition indexes.
+
+Usage:
+    python bench_detection_queries.py [sizes...]
+    python bench_detection_queries.py 10000 100000 1000000 10000000
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from storage.database import Base
+from storage.migrations import run_migrations
+from storage.log_repository import aggregate_logs_by_service
+from storage.partitions import ensure_partition, group_by_partition, list_partitions, partition_table
+from storage.timestamps import to_epoch_us
+
+LIVE_WINDOW_ROWS = 6000  # ~10 logs/s over the last 10 minutes
+CHUNK = 50000
+REPEATS = 5
+
+def make_row(ts: datetime, i: int) -> dict:
+    return {
+        "ts_us": to_epoch_us(ts),
+        "timestamp": ts.isoformat().replace("+00:00", "Z"),
+        "service": f"service-{i % 8}",
+        "level": "ERROR" if i % 50 == 0 else "INFO",
+        "message": "bench",
+        "latency_ms": 20 + i % 80,
+        "status_code": 500 if i % 50 == 0 else 200,
+        "retry_count": 0,
+    }
+
+def insert_rows(db, rows):
+    for name, partition_rows in group_by_partition(rows).items():
+        db.execute(ensure_partition(db, name).insert(), partition_rows)
+    db.commit()
+
+def populate(Session, historical_rows: int, now: datetime):
+    # Historical rows spread over the 30 days before the live window
+    history_start = now - timedelta(days=30)
+    history_span = (timedelta(days=30) - timedelta(minutes=10)).total_seconds()
+    db = Session()
+    for offset in range(0, historical_rows, CHUNK):
+        count = min(CHUNK, historical_rows - offset)
+        insert_rows(db, [
+            make_row(history_start + timedelta(seconds=history_span * (offset + i) / historical_rows), offset + i)
+            for i in range(count)
+        ])
+
+    live_start = now - timedelta(minutes=10)
+    insert_rows(db, [
+        make_row(live_start + timedelta(seconds=600 * i / LIVE_WINDOW_ROWS), i)
+        for i in range(LIVE_WINDOW_ROWS)
+    ])
+    db.close()
+
+def time_detection_queries(Session, now: datetime) -> float:
+    short_start = now - timedelta(seconds=60)
+    baseline_start = now - timedelta(minutes=10)
+    best = float("inf")
+    for _ in range(REPEATS):
+        db = Session()
+        started = time.perf_counter()
+        aggregate_logs_by_service(db, to_epoch_us(short_start), to_epoch_us(now))
+        aggregate_logs_by_service(db, to_epoch_us(baseline_start), to_epoch_us(short_start))
+        best = min(best, time.perf_counter() - started)
+        db.close()
+    return best * 1000
+
+def drop_indexes(Session, engine):
+    db = Session()
+    names = list_partitions(db)
+    db.close()
+    with engine.begin() as conn:
+        for name in names:
+            for index in partition_table(name).indexes:
+                if index.name != f"ix_{name}_id":
+                    index.drop(bind=conn, checkfirst=True)
+
+def run(size: int):
+    now = datetime.now(timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+        fill_started = time.perf_counter()
+        populate(Session, size, now)
+        fill_s = time.perf_counter() - fill_started
+
+        indexed_ms = time_detection_queries(Session, now)
+        drop_indexes(Session, engine)
+        scan_ms = time_detection_queries(Session, now)
+        # Re-create through the migration path used for existing logs.db files
+        run_migrations(engine)
+        migrated_ms = time_detection_queries(Session, now)
+        engine.dispose()
+
+    print(f"{size:>10,} rows | fill {fill_s:6.1f}s | indexed {indexed_ms:8.1f} ms | "
+          f"no index {scan_ms:8.1f} ms | after migration {migrated_ms:8.1f} ms")
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000, 10_000_000]
+    print(f"Detection queries (short + baseline window, {LIVE_WINDOW_ROWS} live rows, best of {REPEATS})")
+    for size in sizes:
+        run(size)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent ingest + detection on SQLite, default journaling vs.
+the tuned pragmas from storage/database.py (WAL, synchronous=NORMAL, page
+cache, mmap, busy_timeout).
+
+A writer thread commits batches of logs at a fixed target rate (as the
+group-commit writer does) while a reader thread runs the detection window
+queries back to back.
+
+Usage:
+    python bench_ingest_detect.py [duration_seconds] [rows_per_second] [directory]
+
+Pass a tmpfs directory (e.g. /dev/shm) to take the disk out of the picture.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from storage.database import Base, SQLITE_PRAGMAS, create_storage_engine
+from storage.log_repository import aggregate_logs_by_service, save_logs
+from storage.timestamps import to_epoch_us
+
+PREFILL_ROWS = 30000   # ~50 logs/s over the 10-minute detection horizon
+BATCH_ROWS = 500
+
+def make_rows(start_us: int, count: int, step_us: int):
+    return [
+        {
+            "ts_us": start_us + i * step_us,
+            "service": f"service-{i % 8}",
+            "level": "ERROR" if i % 50 == 0 else "INFO",
+            "message": "bench",
+            "latency_ms": 20 + i % 80,
+            "status_code": 500 if i % 50 == 0 else 200,
+            "retry_count": 0,
+        }
+        for i in range(count)
+    ]
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+def run(label: str, pragmas: dict, directory: str, duration: float, target_rate: int):
+    path = os.path.join(directory, f"bench_{label}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    engine = create_storage_engine(f"sqlite:///{path}", sqlite_pragmas=pragmas)
+    Session = sessionmaker(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    now = datetime.now(timezone.utc)
+    start_us = to_epoch_us(now - timedelta(minutes=10))
+    db = Session()
+    save_logs(db, make_rows(start_us, PREFILL_ROWS, 600_000_000 // PREFILL_ROWS))
+    db.close()
+
+    stop = threading.Event()
+    written = [0]
+    commit_ms = []
+    detect_ms = []
+    errors = {"write": 0, "detect": 0}
+
+    def writer():
+        db = Session()
+        interval = BATCH_ROWS / target_rate
+        next_at = time.perf_counter()
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                save_logs(db, make_rows(to_epoch_us(datetime.now(timezone.utc)), BATCH_ROWS, 100))
+                written[0] += BATCH_ROWS
+                commit_ms.append((time.perf_counter() - started) * 1000)
+            except OperationalError:
+                db.rollback()
+                errors["write"] += 1
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+        db.close()
+
+    def detector():
+        while not stop.is_set():
+            db = Session()
+            tick_now = datetime.now(timezone.utc)
+            short_start = tick_now - timedelta(seconds=60)
+            started = time.perf_counter()
+            try:
+                aggregate_logs_by_service(db, to_epoch_us(short_start), to_epoch_us(tick_now))
+                aggregate_logs_by_service(db, to_epoch_us(tick_now - timedelta(minutes=10)), to_epoch_us(short_start))
+                detect_ms.append((time.perf_counter() - started) * 1000)
+            except OperationalError:
+                errors["detect"] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=detector)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    print(f"{label:<8} | ingest {written[0] / duration:7.0f} rows/s, commit p95 {percentile(commit_ms, 0.95):6.1f} ms | "
+          f"detect ticks {len(detect_ms):4d}, p50 {percentile(detect_ms, 0.50):6.1f} ms, "
+          f"p95 {percentile(detect_ms, 0.95):6.1f} ms | errors w={errors['write']} d={errors['detect']}")
+
+if __name__ == "__main__":
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    target_rate = int(sys.argv[2]) if len(sys.argv) > 2 else 2500
+    directory = sys.argv[3] if len(sys.argv) > 3 else None
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        print(f"Concurrent ingest ({target_rate} rows/s target) + detect for {duration:.0f}s in {tmp}")
+        # SQLite defaults: rollback journal, synchronous=FULL
+        run("before", {}, tmp, duration, target_rate)
+        run("after", SQLITE_PRAGMAS, tmp, duration, target_rate)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event loop lag while heavy detection ticks run.
+
+A tick runs detect_anomaly over a hot buffer holding HOT_ROWS logs, then
+stands in for IncidentManager.update with CPU work (embedding) and a
+blocking sleep (FAISS file write). LoopLagMonitor measures how late the
+event loop wakes up while ticks run every TICK_INTERVAL seconds:
+
+  inline  - the tick is called from the coroutine (the old run_detection_loop)
+  worker  - DetectionScheduler runs the tick on its detection thread
+
+Usage:
+    python bench_loop_lag.py [duration_seconds]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+HOT_ROWS = 300_000
+SERVICES = 200
+TICK_INTERVAL = 1.0
+EMBED_CPU_SECONDS = 0.15
+WRITE_BLOCK_SECONDS = 0.15
+STALL_MS = 50
+
+def heavy_tick(reason: str = "periodic"):
+    from storage.database import SessionLocal
+    from detection.anomaly_detector import detect_anomaly
+
+    db = SessionLocal()
+    try:
+        result = detect_anomaly(db)
+    finally:
+        db.close()
+    # Stand-in for embedding the incident summary and persisting the index
+    deadline = time.perf_counter() + EMBED_CPU_SECONDS
+    while time.perf_counter() < deadline:
+        sum(i * i for i in range(1000))
+    time.sleep(WRITE_BLOCK_SECONDS)
+    return result
+
+async def run_inline(duration: float):
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        await asyncio.sleep(TICK_INTERVAL)
+        heavy_tick()
+
+async def run_worker(duration: float):
+    from detection.scheduler import DetectionScheduler
+
+    scheduler = DetectionScheduler(heavy_tick, interval_seconds=TICK_INTERVAL)
+    task = asyncio.get_running_loop().create_task(scheduler.run())
+    await asyncio.sleep(duration)
+    task.cancel()
+    scheduler.shutdown()
+
+async def measure(mode: str, duration: float):
+    from debug.loop_lag import LoopLagMonitor
+
+    monitor = LoopLagMonitor(interval_ms=10, samples=100_000)
+    lag_task = asyncio.get_running_loop().create_task(monitor.run())
+    await (run_inline(duration) if mode == "inline" else run_worker(duration))
+    lag_task.cancel()
+    snapshot = monitor.snapshot()
+    stalls = [lag for lag in monitor.samples if lag > STALL_MS]
+    print(f"{mode:<7} | loop lag p99 {snapshot['event_loop_lag_p99_ms']:7.1f} ms | "
+          f"max {snapshot['event_loop_lag_max_ms']:7.1f} ms | stalls > {STALL_MS} ms: {len(stalls)} "
+          f"({sum(stalls) / 1000:.1f}s blocked)")
+
+def fill_hot_buffer():
+    from detection.hot_buffer import HotLogBuffer
+
+    buffer = HotLogBuffer.get_instance()
+    buffer.complete_from_us = 0
+    now_us = int(time.time() * 1_000_000)
+    step_us = 600_000_000 // HOT_ROWS
+    buffer.add_rows([
+        {
+            "ts_us": now_us - 600_000_000 + i * step_us,
+            "service": f"service-{i % SERVICES}",
+            "level": "ERROR" if i % 40 == 0 else "INFO",
+            "latency_ms": 20 + i % 90,
+            "status_code": 500 if i % 40 == 0 else 200,
+            "retry_count": 0,
+        }
+        for i in range(HOT_ROWS)
+    ])
+
+if __name__ == "__main__":
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+        from storage.database import Base, engine
+        from storage.migrations import run_migrations
+
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        fill_hot_buffer()
+
+        print(f"Event loop lag with a detection tick every {TICK_INTERVAL:.0f}s ({HOT_ROWS:,} hot rows) for {duration:.0f}s")
+        for mode in ("inline", "worker"):
+            asyncio.run(measure(mode, duration))
+        engine.dispose()
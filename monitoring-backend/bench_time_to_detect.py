@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end time-to-detect for an error burst.
+
+Each trial runs in a fresh process against a scratch SQLite database:
+10 minutes of healthy history, then live traffic through the LogWriter.
+At a random moment every auth request starts failing. Time-to-detect is
+measured from the first failing log being submitted to the first
+detect_anomaly result that reports an anomaly.
+
+  periodic   - detection every DETECTION_INTERVAL_SECONDS only
+  triggered  - plus early runs requested by DetectionTrigger
+  continuous - detection every 50 ms, the floor set by the detector's
+               own 60 s window thresholds (reference only)
+
+Usage:
+    python bench_time_to_detect.py [trials_per_mode]
+"""
+
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RATE = 50          # live logs per second
+HISTORY_RATE = 20  # logs per second in the prefilled 10 minutes
+TIMEOUT_SECONDS = 20
+
+def make_row(ts_us: int, i: int, failing: bool) -> dict:
+    auth = i % 2 == 0
+    error = failing and auth
+    return {
+        "ts_us": ts_us,
+        "service": "auth" if auth else "api",
+        "level": "ERROR" if error else "INFO",
+        "message": "bench",
+        "endpoint": "/login" if auth else "/items",
+        "latency_ms": 40 + i % 20,
+        "status_code": 401 if error else 200,
+        "retry_count": 0,
+    }
+
+def run_trial(mode: str) -> dict:
+    from storage.database import engine, Base, SessionLocal
+    from storage.migrations import run_migrations
+    from storage.log_repository import save_logs
+    from ingestion.writer import LogWriter
+    from detection.anomaly_detector import detect_anomaly
+    from detection.window_aggregator import SlidingWindowAggregator
+    from detection.hot_buffer import HotLogBuffer
+    from detection.trigger import DetectionTrigger
+    from detection.scheduler import DetectionScheduler
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    now_us = int(time.time() * 1_000_000)
+    step_us = 1_000_000 // HISTORY_RATE
+    history = [make_row(now_us - 600_000_000 + i * step_us, i, False) for i in range(600 * HISTORY_RATE)]
+    db = SessionLocal()
+    save_logs(db, history)
+    aggregator = SlidingWindowAggregator.get_instance()
+    aggregator.rebuild(db)
+    db.close()
+    buffer = HotLogBuffer.get_instance()
+    buffer.complete_from_us = 0
+    buffer.add_rows(history)
+
+    writer = LogWriter.get_instance()
+    writer.add_flush_listener(aggregator.add_rows)
+    writer.add_flush_listener(buffer.add_rows)
+
+    failing_since = [None]
+    outcome = {}
+    stop = threading.Event()
+
+    def load():
+        i = 0
+        fail_at = time.time() + random.uniform(2.0, 7.0)
+        while not stop.is_set():
+            failing = time.time() >= fail_at
+            if failing and failing_since[0] is None:
+                failing_since[0] = time.perf_counter()
+            batch = [make_row(int(time.time() * 1_000_000), i + k, failing) for k in range(RATE // 10)]
+            writer.submit(batch)
+            i += len(batch)
+            time.sleep(0.1)
+
+    def tick(reason: str):
+        db = SessionLocal()
+        try:
+            result = detect_anomaly(db)
+        finally:
+            db.close()
+        if not result["anomaly"]:
+            return
+        if failing_since[0] is None:
+            outcome["false_positive"] = True
+        elif "ttd_ms" not in outcome:
+            outcome["ttd_ms"] = (time.perf_counter() - failing_since[0]) * 1000
+            outcome["reason"] = reason
+
+    if mode == "continuous":
+        scheduler = DetectionScheduler(tick, interval_seconds=0.05, max_per_second=20)
+    else:
+        scheduler = DetectionScheduler(tick)
+    if mode == "triggered":
+        trigger = DetectionTrigger.get_instance()
+        trigger.set_callback(scheduler.request)
+        writer.add_flush_listener(trigger.observe)
+
+    async def main():
+        task = asyncio.get_running_loop().create_task(scheduler.run())
+        started = time.perf_counter()
+        while "ttd_ms" not in outcome and time.perf_counter() - started < TIMEOUT_SECONDS:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    writer.start()
+    loader = threading.Thread(target=load)
+    loader.start()
+    asyncio.run(main())
+    stop.set()
+    loader.join()
+    writer.stop()
+    return outcome
+
+def run_mode(mode: str, trials: int):
+    results = []
+    for _ in range(trials):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+            proc = subprocess.run([sys.executable, __file__, "--trial", mode], env=env,
+                                  capture_output=True, text=True, timeout=TIMEOUT_SECONDS + 60)
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    ttd = [r["ttd_ms"] for r in results if "ttd_ms" in r]
+    missed = trials - len(ttd)
+    false_positives = sum(1 for r in results if r.get("false_positive"))
+    if ttd:
+        print(f"{mode:<10} | mean {statistics.mean(ttd):7.0f} ms | median {statistics.median(ttd):7.0f} ms | "
+              f"max {max(ttd):7.0f} ms | missed {missed} | false positives {false_positives}")
+    else:
+        print(f"{mode:<10} | no detections in {trials} trials")
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    if len(sys.argv) > 2 and sys.argv[1] == "--trial":
+        outcome = run_trial(sys.argv[2])
+        print(json.dumps(outcome))
+    else:
+        trials = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+        print(f"Time-to-detect for an auth error burst ({trials} trials per mode)")
+        for mode in ("periodic", "triggered", "continuous"):
+            run_mode(mode, trials)
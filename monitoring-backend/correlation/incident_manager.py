@@ -1,5 +1,8 @@
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Optional, List, Set, Dict, Any, Literal
+from typing import Optional, List, Set, Dict, Any, Literal, Tuple
+import os
+import threading
 import uuid
 from enum import Enum
 from correlation.incident_rules import (
@@ -7,9 +10,17 @@ from correlation.incident_rules import (
     calculate_severity, 
     INCIDENT_RESOLUTION_TIMEOUT
 )
-from memory.vector_store import VectorStore
-from memory.embedder import Embedder
+from correlation.timer_wheel import TimerWheel
+from correlation.incident_store import IncidentStore
 from debug.pipeline_state import update_state
+from streaming.event_hub import EventHub, encode_json
+from storage.timestamps import from_epoch_us, to_epoch_us
+
+# Resolved incidents kept in memory for the API (lookups by id, approvals)
+INCIDENTS_RESOLVED_KEPT = int(os.getenv("INCIDENTS_RESOLVED_KEPT", "100"))
+# A window snapshot is stored when the incident's services, the window's
+# signals or the severity change, otherwise at most this often per incident
+INCIDENT_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("INCIDENT_SNAPSHOT_INTERVAL_SECONDS", "60"))
 
 class ApprovalStatus(str, Enum):
     PENDING = "PENDING"
@@ -21,7 +32,19 @@ class ApprovalLockError(Exception):
     pass
 
 class Incident:
+    """
+    One incident. Fields are only changed under `lock`, and every change
+    ends with publish(), which bumps `version`; readers use the published
+    view (to_dict, or to_json for the encoded body) and never take the lock.
+    """
     def __init__(self, services: Set[str], signals: Set[str], started_at: datetime, similar_incidents: List[Dict] = None, metrics: Dict = None):
+        self.lock = threading.Lock()
+        self.version = 0
+        # (view, body, etag) of the last view encoded by to_json
+        self._encoded = None
+        # (services, window signals, severity) and ts_us of the last stored snapshot
+        self._snapshot_key = None
+        self._snapshot_us: Optional[int] = None
         self.incident_id = f"INC-{uuid.uuid4().hex[:8].upper()}"
         self.status = "OPEN"
         self.started_at = started_at
@@ -56,10 +79,18 @@ class Incident:
             "execution_mode": None,
             "executed_at": None
         }
+        self.publish()
 
-    def to_dict(self):
-        return {
+    def publish(self):
+        """
+        Replaces the view readers get with a copy of the current state
+        (copy-on-write). A published view is never modified: nested dicts
+        such as approval are replaced on change, not mutated.
+        """
+        self.version += 1
+        self._view = {
             "incident_id": self.incident_id,
+            "version": self.version,
             "status": self.status,
             "started_at": self.started_at.isoformat(),
             "last_seen_at": self.last_seen_at.isoformat(),
@@ -68,7 +99,55 @@ class Incident:
             "signals": list(self.signals),
             "severity": self.severity,
             "window_count": self.window_count,
-            "duration_seconds": (datetime.now(timezone.utc) - self.started_at).total_seconds(),
+            # Observed span, first to latest anomalous window (as in the summary).
+            # The live duration_seconds is added per read (to_dict, duration_seconds)
+            # so the cached body only changes with the version.
+            "observed_seconds": (self.last_seen_at - self.started_at).total_seconds(),
+            "summary_text": self.summary_text,
+            "resolution": self.resolution,
+            "similar_incidents": self.similar_incidents,
+            "metrics": self.metrics,
+            "reasoning": self.reasoning,
+            "confidence": self.confidence,
+            "approval": self.approval,
+            "remediation": self.remediation
+        }
+
+    def duration_seconds(self) -> float:
+        """Time since the incident started (now - started_at)."""
+        return (datetime.now(timezone.utc) - self.started_at).total_seconds()
+
+    def to_dict(self):
+        view = dict(self._view)
+        view["duration_seconds"] = self.duration_seconds()
+        return view
+
+    def to_json(self) -> Tuple[bytes, str]:
+        """
+        The published view as a JSON body plus its ETag, encoded once per
+        version. Racing readers may both encode a new version; either
+        result is the same. The body has no duration_seconds: it changes
+        on every read (see api/incident.py).
+        """
+        view = self._view
+        encoded = self._encoded
+        if encoded is None or encoded[0] is not view:
+            encoded = (view, *encode_json(view))
+            self._encoded = encoded
+        return encoded[1], encoded[2]
+
+    def to_record(self) -> Dict[str, Any]:
+        """Row of the incidents table (storage/incident_repository.py)."""
+        return {
+            "incident_id": self.incident_id,
+            "status": self.status,
+            "severity": self.severity,
+            "started_us": to_epoch_us(self.started_at),
+            "last_seen_us": to_epoch_us(self.last_seen_at),
+            "resolved_us": to_epoch_us(self.resolved_at) if self.resolved_at else None,
+            "services": sorted(self.services),
+            "signals": sorted(self.signals),
+            "window_count": self.window_count,
             "summary_text": self.summary_text,
             "resolution": self.resolution,
             "similar_incidents": self.similar_incidents,
@@ -79,170 +158,409 @@ class Incident:
             "remediation": self.remediation
         }
 
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Incident":
+        """Rebuilds an incident from its row in the incidents table."""
+        incident = cls(set(record["services"]), set(record["signals"]), from_epoch_us(record["started_us"]),
+                       similar_incidents=record["similar_incidents"], metrics=record["metrics"])
+        incident.incident_id = record["incident_id"]
+        incident.status = record["status"]
+        incident.severity = record["severity"]
+        incident.last_seen_at = from_epoch_us(record["last_seen_us"])
+        incident.resolved_at = from_epoch_us(record["resolved_us"]) if record["resolved_us"] else None
+        incident.window_count = record["window_count"]
+        incident.summary_text = record["summary_text"] or ""
+        incident.resolution = record["resolution"] or ""
+        incident.reasoning = record["reasoning"]
+        incident.confidence = record["confidence"]
+        incident.approval = record["approval"] or incident.approval
+        incident.remediation = record["remediation"] or incident.remediation
+        incident.publish()
+        return incident
+
 class IncidentManager:
+    """
+    Open incidents, any number at a time, plus the most recently resolved
+    ones.
+
+    Open incidents are indexed by service and by signal, so attributing a
+    new anomaly is a dictionary lookup per affected service. Each open
+    incident has a resolution deadline (last anomaly +
+    INCIDENT_RESOLUTION_TIMEOUT) on one timer wheel; every update first
+    resolves the incidents whose deadline has passed.
+
+    Every change is also handed to IncidentStore, which persists it off
+    the detection thread, and broadcast to /stream/events subscribers.
+
+    Concurrency: update() runs on the detection thread while the API
+    handlers run in the threadpool.
+    - _lock serialises changes to the set of incidents: the indexes, the
+      timer wheel, which incident is current. update(), restore() and
+      reset hold it.
+    - Each incident's own lock guards its fields. Approve, reject and
+      reasoning take only that lock, so they never wait for a detection
+      tick (lock order: manager, then incident).
+    - Readers take no lock at all: they read the views published after
+      each change (Incident.publish and _publish here, copy-on-write).
+    """
     _instance = None
+    _instance_lock = threading.Lock()
     
     def __init__(self):
-        self.active_incident: Optional[Incident] = None
+        self._init_state()
         
+        # Imported here: memory.embedder loads the embedding model on import,
+        # which subclasses without vector memory (detection/replay.py) never use
+        from memory.embedder import Embedder
+        from memory.vector_store import VectorStore
+
         # Initialize Embedder and VectorStore
         self.embedder = Embedder()
         self.vector_store = VectorStore(dim=self.embedder.dim)
 
+    def _init_state(self):
+        self._lock = threading.Lock()
+        self._published = None
+        self._reset_state()
+
+    def _reset_state(self):
+        # Open incidents by id, and the open incident each service belongs to
+        self.incidents: Dict[str, Incident] = {}
+        self._by_service: Dict[str, str] = {}
+        self._by_signal: Dict[str, Set[str]] = {}
+        # Resolved incidents by id, oldest first (bounded)
+        self.resolved: "OrderedDict[str, Incident]" = OrderedDict()
+        self._timers = TimerWheel(slots=INCIDENT_RESOLUTION_TIMEOUT * 2)
+        # Incident most recently opened or updated by an anomaly
+        self._current_id: Optional[str] = None
+        self._publish()
+
+    def _latest_open(self) -> Optional[Incident]:
+        current = self.incidents.get(self._current_id)
+        if current is None and self.incidents:
+            current = max(self.incidents.values(), key=lambda incident: incident.last_seen_at)
+        return current
+
+    def _publish(self):
+        """
+        Replaces the readers' view of the incident set. Called under _lock
+        after changes; the published dicts and lists are never modified.
+        """
+        current = self._latest_open()
+        if current is None:
+            current = self.resolved.get(self._current_id)
+        previous = self._published["current"] if self._published else None
+        if current is not previous:
+            body, _ = encode_json({"incident_id": current.incident_id if current else None})
+            EventHub.get_instance().publish("current", body)
+        by_id = dict(self.resolved)
+        by_id.update(self.incidents)
+        self._published = {
+            "current": current,
+            "open": sorted(self.incidents.values(), key=lambda incident: incident.started_at),
+            "by_id": by_id,
+        }
+
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            cls._instance = IncidentManager()
+            with cls._instance_lock:
+                # Another thread may have created it while this one waited
+                if cls._instance is None:
+                    cls._instance = IncidentManager()
         return cls._instance
 
+    @property
+    def active_incident(self) -> Optional[Incident]:
+        """
+        The incident most recently opened or updated by an anomaly; once it
+        resolves, the latest open incident if any is left, else itself.
+        """
+        return self._published["current"]
+
+    def get_incident(self, incident_id: str) -> Optional[Incident]:
+        """An open or recently resolved incident by id."""
+        return self._published["by_id"].get(incident_id)
+
     def get_current(self) -> Optional[Dict[str, Any]]:
         """Returns the active incident if it exists."""
-        if self.active_incident:
-            return self.active_incident.to_dict()
+        current = self.active_incident
+        if current:
+            return current.to_dict()
         return None
 
+    @property
+    def open_incidents(self) -> List[Incident]:
+        """Every open incident, oldest first. The published list: don't modify it."""
+        return self._published["open"]
+
+    def get_open(self) -> List[Dict[str, Any]]:
+        """Every open incident, oldest first."""
+        return [incident.to_dict() for incident in self.open_incidents]
+
+    def restore(self, records: List[Dict[str, Any]]):
+        """
+        Reopens incidents persisted as open (e.g. before a restart). Those
+        past their deadline resolve on the next update.
+        """
+        with self._lock:
+            for record in records:
+                self._open(Incident.from_record(record))
+            self._publish()
+        print(f"Restored {len(records)} open incidents")
+
     def reset_demo_state(self):
         """
         DEMO ONLY:
-        Explicitly clears active incident and internal state.
+        Explicitly clears all incidents and internal state.
         Does NOT write to vector memory.
         """
-        self.active_incident = None
-        # If we had other stateful timers like 'last_anomaly_seen_at' in the manager, 
-        # we would reset them here. Currently state is encapsulated in active_incident.
+        with self._lock:
+            self._reset_state()
+        # Stream clients reload everything
+        EventHub.get_instance().resync_all()
 
 
     def update_reasoning(self, incident_id: str, reasoning: Dict):
-        """Attaches reasoning to the active incident."""
-        if self.active_incident and self.active_incident.incident_id == incident_id:
+        """Attaches reasoning to an open or recently resolved incident."""
+        incident = self.get_incident(incident_id)
+        if incident:
             # Add timestamp to reasoning
             if "created_at" not in reasoning:
                 reasoning["created_at"] = datetime.utcnow().isoformat()
             
-            self.active_incident.reasoning = reasoning
-            self.active_incident.confidence = reasoning.get("confidence", 0.0)
+            with incident.lock:
+                incident.reasoning = reasoning
+                incident.confidence = reasoning.get("confidence", 0.0)
+                incident.publish()
+                self._persist(incident)
             # If we wanted to auto-reject low confidence, we could do it here
             # But per rules, we just store it.
 
     def approve_incident(self, incident_id: str, actor: str, comment: Optional[str] = None):
         """Approves the incident if validation passes."""
-        if not self.active_incident or self.active_incident.incident_id != incident_id:
+        incident = self.get_incident(incident_id)
+        if not incident:
              raise ValueError(f"Incident {incident_id} not found or not active")
         
-        # Lock Check
-        if self.active_incident.approval["status"] != ApprovalStatus.PENDING.value:
-            raise ApprovalLockError("Approval already decided")
+        # Checks and decision are one step: a concurrent approve / reject sees the decision
+        with incident.lock:
+            # Lock Check
+            if incident.approval["status"] != ApprovalStatus.PENDING.value:
+                raise ApprovalLockError("Approval already decided")
 
-        # Validation Rules
-        if not self.active_incident.reasoning:
-            raise ValueError("Cannot approve incident without reasoning")
+            # Validation Rules
+            if not incident.reasoning:
+                raise ValueError("Cannot approve incident without reasoning")
+                
+            # Check Confidence Threshold
+            # Using confidence from incident
+            confidence = incident.confidence
             
-        # Check Confidence Threshold
-        # Using confidence from incident
-        confidence = self.active_incident.confidence
-        
-        if confidence < 0.6:
-             raise ValueError(f"Confidence score {confidence} is below threshold 0.6")
-
-        # Update approval
-        self.active_incident.approval = {
-            "status": ApprovalStatus.APPROVED.value,
-            "actor": actor,
-            "comment": comment,
-            "decided_at": datetime.utcnow().isoformat(),
-            "approved_with_confidence": confidence
-        }
-        
-        # Update remediation (simulated execution)
-        self.active_incident.remediation = {
-            "status": "EXECUTED",
-            "execution_mode": "SIMULATED",
-            "executed_at": datetime.utcnow().isoformat()
-        }
+            if confidence < 0.6:
+                 raise ValueError(f"Confidence score {confidence} is below threshold 0.6")
+
+            # Update approval
+            incident.approval = {
+                "status": ApprovalStatus.APPROVED.value,
+                "actor": actor,
+                "comment": comment,
+                "decided_at": datetime.utcnow().isoformat(),
+                "approved_with_confidence": confidence
+            }
+            
+            # Update remediation (simulated execution)
+            incident.remediation = {
+                "status": "EXECUTED",
+                "execution_mode": "SIMULATED",
+                "executed_at": datetime.utcnow().isoformat()
+            }
+            incident.publish()
+            self._persist(incident)
         
-        return self.active_incident.to_dict()
+        return incident.to_dict()
 
     def reject_incident(self, incident_id: str, actor: str, comment: Optional[str] = None):
         """Rejects the incident."""
-        if not self.active_incident or self.active_incident.incident_id != incident_id:
+        incident = self.get_incident(incident_id)
+        if not incident:
              raise ValueError(f"Incident {incident_id} not found or not active")
         
-        # Lock Check
-        if self.active_incident.approval["status"] != ApprovalStatus.PENDING.value:
-            raise ApprovalLockError("Approval already decided")
-        
-        # We can reject even without reasoning? Probably yes, explicitly rejecting garbage.
-        # But prompt said "Approval is allowed only if reasoning has already been generated"
-        # It didn't explicitly restrict rejection. But safe to assume we are rejecting a PROPOSAL.
-        # If there is no reasoning/proposal, there is nothing to reject.
-        if not self.active_incident.reasoning:
-             raise ValueError("Cannot reject incident without reasoning (nothing to reject)")
-
-        self.active_incident.approval = {
-            "status": ApprovalStatus.REJECTED.value,
-            "actor": actor,
-            "comment": comment,
-            "decided_at": datetime.utcnow().isoformat()
-        }
-        return self.active_incident.to_dict()
+        with incident.lock:
+            # Lock Check
+            if incident.approval["status"] != ApprovalStatus.PENDING.value:
+                raise ApprovalLockError("Approval already decided")
+            
+            # We can reject even without reasoning? Probably yes, explicitly rejecting garbage.
+            # But prompt said "Approval is allowed only if reasoning has already been generated"
+            # It didn't explicitly restrict rejection. But safe to assume we are rejecting a PROPOSAL.
+            # If there is no reasoning/proposal, there is nothing to reject.
+            if not incident.reasoning:
+                 raise ValueError("Cannot reject incident without reasoning (nothing to reject)")
 
-    def update(self, anomaly_result: Dict[str, Any], affected_services: List[str], now: datetime):
+            incident.approval = {
+                "status": ApprovalStatus.REJECTED.value,
+                "actor": actor,
+                "comment": comment,
+                "decided_at": datetime.utcnow().isoformat()
+            }
+            incident.publish()
+            self._persist(incident)
+        return incident.to_dict()
+
+    def update(self, anomaly_result: Dict[str, Any], affected_services: List[str], now: datetime) -> List[Incident]:
         """
         Updates the incident state based on anomaly detection results.
+
+        Incidents without an anomaly for INCIDENT_RESOLUTION_TIMEOUT are
+        resolved first. An anomaly then updates the open incident of each
+        affected service. The affected services no open incident holds
+        join the updated incident sharing most of the anomaly's signals if
+        it already has all of them (the same problem spreading); otherwise
+        they open one new incident together. An anomaly naming no service
+        updates the open incidents sharing one of its signals, else the
+        latest open incident. Detection signals are global to a tick, so
+        every incident the anomaly reaches gets all of them.
+        Returns the incidents the anomaly was attributed to.
         """
         update_state(last_incident_update_at=datetime.utcnow().isoformat())
 
-        is_anomaly = anomaly_result.get("anomaly", False)
-        current_signals = set(anomaly_result.get("signals", []))
-        affected_services_set = set(affected_services)
+        with self._lock:
+            # 1. Resolve incidents whose deadline passed (Timeout Check)
+            for incident_id in self._timers.advance(now.timestamp()):
+                self._resolve(self.incidents[incident_id], now)
 
-        # 1. Manage existing incident (Timeout Check)
-        if self.active_incident:
-             pass
+            # 2. Logic Flow
+            touched: Dict[str, Incident] = {}
+            if anomaly_result.get("anomaly", False):
+                current_signals = set(anomaly_result.get("signals", []))
+                metrics = anomaly_result.get("metrics", {})
 
-        # 2. Logic Flow
-        if is_anomaly:
-            metrics = anomaly_result.get("metrics", {})
-            if self.active_incident:
-                # Check correlation
-                if is_correlated(self.active_incident.last_seen_at, now):
-                    # ONGOING Update
-                    if self.active_incident.status == "RESOLVED":
-                        # Resolved -> New anomaly -> New Incident
-                        self._create_new_incident(affected_services_set, current_signals, now, metrics)
+                unowned = set()
+                for svc in affected_services:
+                    incident = self.incidents.get(self._by_service.get(svc))
+                    if incident is not None and is_correlated(incident.last_seen_at, now):
+                        touched[incident.incident_id] = incident
                     else:
-                        # Truly ONGOING
-                        self.active_incident.status = "ONGOING"
-                        self.active_incident.last_seen_at = now
-                        self.active_incident.services.update(affected_services_set)
-                        self.active_incident.signals.update(current_signals)
-                        self.active_incident.severity = calculate_severity(self.active_incident.signals)
-                        self.active_incident.window_count += 1
-                        # Update metrics with latest data
-                        self.active_incident.metrics = metrics
-                else:
-                    # Too much time passed -> New Incident
-                    self._create_new_incident(affected_services_set, current_signals, now, metrics)
-            else:
-                # No active incident -> Create NEW
-                self._create_new_incident(affected_services_set, current_signals, now, metrics)
-        
-        else:
-            # NO Anomaly detected
-            if self.active_incident and self.active_incident.status != "RESOLVED":
-                # Check timeout
-                time_since_last = (now - self.active_incident.last_seen_at).total_seconds()
-                if time_since_last > INCIDENT_RESOLUTION_TIMEOUT:
-                    self.active_incident.status = "RESOLVED"
-                    self.active_incident.resolved_at = now
-                    self.active_incident.resolution = "Traffic subsided automatically" # Default resolution for now
-                    self.active_incident.summary_text = self._generate_summary(self.active_incident)
-                    
-                    # STORE IN VECTOR MEMORY
-                    self._store_incident(self.active_incident)
-                    
-                    # We keep it as active_incident so it can be returned by API, 
-                    # but next anomaly will trigger a NEW one.
+                        unowned.add(svc)
+                if not affected_services:
+                    for signal in current_signals:
+                        for incident_id in self._by_signal.get(signal, ()):
+                            touched[incident_id] = self.incidents[incident_id]
+                    latest = self._latest_open()
+                    if not touched and latest is not None:
+                        touched[latest.incident_id] = latest
+
+                joined: Dict[str, Set[str]] = {}
+                if unowned and touched:
+                    target = max(touched.values(), key=lambda incident: (
+                        len(current_signals & incident.signals), incident.last_seen_at))
+                    if current_signals <= target.signals:
+                        joined[target.incident_id] = unowned
+                        unowned = set()
+
+                for incident in touched.values():
+                    # ONGOING Update
+                    self._extend(incident, current_signals, now, metrics, joined.get(incident.incident_id))
+                if unowned or not touched:
+                    # No open incident for these services -> Create NEW
+                    incident = self._create_new_incident(unowned, current_signals, now, metrics)
+                    touched[incident.incident_id] = incident
+
+            self._publish()
+            open_count = len(self.incidents)
+
+        update_state(open_incidents=open_count)
+        return list(touched.values())
+
+    def _extend(self, incident: Incident, signals: Set[str], now: datetime, metrics: Dict,
+                services: Optional[Set[str]] = None):
+        """Records another anomalous window on an open incident, merging newly affected services."""
+        for signal in signals - incident.signals:
+            self._by_signal.setdefault(signal, set()).add(incident.incident_id)
+        new_services = (services or set()) - incident.services
+        for svc in new_services:
+            self._by_service[svc] = incident.incident_id
+        self._timers.schedule(incident.incident_id, now.timestamp() + INCIDENT_RESOLUTION_TIMEOUT)
+        self._current_id = incident.incident_id
+        with incident.lock:
+            incident.status = "ONGOING"
+            incident.last_seen_at = now
+            if new_services:
+                incident.services = incident.services | new_services
+            incident.signals = incident.signals | signals
+            incident.severity = calculate_severity(incident.signals)
+            incident.window_count += 1
+            # Update metrics with latest data
+            incident.metrics = metrics
+            incident.publish()
+            self._persist(incident, signals)
+
+    def _persist(self, incident: Incident, window_signals: Optional[Set[str]] = None):
+        """
+        Queues the incident's state for IncidentStore, plus a snapshot of
+        the detection window that just updated it (window_signals) when it
+        differs from the last one stored or INCIDENT_SNAPSHOT_INTERVAL_SECONDS
+        passed, and broadcasts it. Called under the incident's lock, which
+        keeps the events of one incident in version order.
+        """
+        snapshot = None
+        if window_signals is not None:
+            ts_us = to_epoch_us(incident.last_seen_at)
+            key = (frozenset(incident.services), frozenset(window_signals), incident.severity)
+            if (key != incident._snapshot_key or incident._snapshot_us is None
+                    or ts_us - incident._snapshot_us >= INCIDENT_SNAPSHOT_INTERVAL_SECONDS * 1_000_000):
+                incident._snapshot_key = key
+                incident._snapshot_us = ts_us
+                snapshot = {
+                    "incident_id": incident.incident_id,
+                    "ts_us": ts_us,
+                    "window_count": incident.window_count,
+                    "services": sorted(incident.services),
+                    "signals": sorted(window_signals),
+                    "metrics": incident.metrics,
+                }
+        IncidentStore.get_instance().submit(incident.to_record(), snapshot)
+        hub = EventHub.get_instance()
+        if hub.has_subscribers():
+            hub.publish("incident", incident.to_json()[0])
+
+    def _open(self, incident: Incident):
+        self.incidents[incident.incident_id] = incident
+        for svc in incident.services:
+            self._by_service[svc] = incident.incident_id
+        for signal in incident.signals:
+            self._by_signal.setdefault(signal, set()).add(incident.incident_id)
+        self._timers.schedule(incident.incident_id, incident.last_seen_at.timestamp() + INCIDENT_RESOLUTION_TIMEOUT)
+        self._current_id = incident.incident_id
+
+    def _resolve(self, incident: Incident, now: datetime):
+        del self.incidents[incident.incident_id]
+        for svc in incident.services:
+            if self._by_service.get(svc) == incident.incident_id:
+                del self._by_service[svc]
+        for signal in incident.signals:
+            holders = self._by_signal.get(signal)
+            if holders is not None:
+                holders.discard(incident.incident_id)
+                if not holders:
+                    del self._by_signal[signal]
+
+        with incident.lock:
+            incident.status = "RESOLVED"
+            incident.resolved_at = now
+            incident.resolution = "Traffic subsided automatically" # Default resolution for now
+            incident.summary_text = self._generate_summary(incident)
+            incident.publish()
+            self._persist(incident)
+
+        # STORE IN VECTOR MEMORY
+        self._store_incident(incident)
+
+        # Kept so it can still be returned by API; the service's next anomaly opens a NEW one
+        self.resolved[incident.incident_id] = incident
+        while len(self.resolved) > INCIDENTS_RESOLVED_KEPT:
+            self.resolved.popitem(last=False)
 
     def _generate_summary(self, incident: Incident) -> str:
         """Simple template-based summary generator."""
@@ -271,7 +589,7 @@ class IncidentManager:
         except Exception as e:
             print(f"Failed to store incident: {e}")
 
-    def _create_new_incident(self, services: Set[str], signals: Set[str], now: datetime, metrics: Dict = None):
+    def _find_similar(self, services: Set[str], signals: Set[str]) -> List[Dict]:
         # 1. Draft the potential new incident to generate a query summary
         temp_services_str = ", ".join(services)
         temp_signals_str = ", ".join(signals)
@@ -288,6 +606,14 @@ class IncidentManager:
         except Exception as e:
             print(f"Vector search failed: {e}")
             similar = []
+        return similar
+
+    def _create_new_incident(self, services: Set[str], signals: Set[str], now: datetime, metrics: Dict = None) -> Incident:
+        similar = self._find_similar(services, signals)
 
         # 3. Create Incident with cached similarity and metrics
-        self.active_incident = Incident(services, signals, now, similar_incidents=similar, metrics=metrics)
+        incident = Incident(services, signals, now, similar_incidents=similar, metrics=metrics)
+        self._open(incident)
+        with incident.lock:
+            self._persist(incident, signals)
+        return incident
@@ -0,0 +1,121 @@
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from storage.database import SessionLocal
+from storage.incident_repository import save_incidents
+from debug.pipeline_state import update_state
+
+# Incidents (and, separately, window snapshots) waiting for the store thread; beyond this writes are dropped
+INCIDENT_STORE_QUEUE_MAX = int(os.getenv("INCIDENT_STORE_QUEUE_MAX", "10000"))
+# How often queued incident writes are committed
+INCIDENT_STORE_FLUSH_SECONDS = float(os.getenv("INCIDENT_STORE_FLUSH_SECONDS", "1"))
+
+class IncidentStore:
+    """
+    Background writer persisting incident states and per-window snapshots.
+
+    IncidentManager submits plain row dicts and returns immediately, so
+    no database work happens on the detection tick (or under an incident
+    lock). Submissions are coalesced as they arrive: only the latest state
+    of each incident is kept, so a burst of updates to one incident takes
+    one slot. The store thread commits everything pending every
+    INCIDENT_STORE_FLUSH_SECONDS in one transaction. A full queue drops
+    the write (counted) rather than block the caller; a newer state of an
+    incident already pending is never dropped, and snapshots have their
+    own bound so they can't crowd out incident states.
+    """
+    _instance = None
+
+    def __init__(self, max_queue: int = INCIDENT_STORE_QUEUE_MAX,
+                 flush_seconds: float = INCIDENT_STORE_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self.max_queue = max_queue
+        # incident_id -> latest record, in first-submitted order
+        self._pending: Dict[str, dict] = {}
+        self._snapshots: List[dict] = []
+        self._lock = threading.Lock()
+        # One flush at a time: flush() returns once everything submitted before it is committed
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.written_total = 0
+        self.dropped_total = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = IncidentStore()
+        return cls._instance
+
+    def depth(self) -> int:
+        return len(self._pending) + len(self._snapshots)
+
+    def submit(self, record: dict, snapshot: Optional[dict] = None):
+        """Queues an incident's current state (and the window that updated it) without blocking."""
+        incident_id = record["incident_id"]
+        with self._lock:
+            if incident_id not in self._pending and len(self._pending) >= self.max_queue:
+                self.dropped_total += 1
+                return
+            self._pending[incident_id] = record
+            if snapshot is not None:
+                if len(self._snapshots) < self.max_queue:
+                    self._snapshots.append(snapshot)
+                else:
+                    self.dropped_total += 1
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="incident-store", daemon=True)
+        self._thread.start()
+        print(f"Incident store started (flush every {self.flush_seconds:g}s)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stops the flush cycle and writes whatever is still queued."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        print(f"Incident store stopped ({self.depth()} writes left in queue)")
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+        # Graceful drain on shutdown
+        self.flush()
+
+    def flush(self):
+        """Commits everything pending (after a flush already in progress on another thread)."""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            records, self._pending = self._pending, {}
+            snapshots, self._snapshots = self._snapshots, []
+        if not records:
+            return
+
+        db = SessionLocal()
+        try:
+            save_incidents(db, list(records.values()), snapshots)
+            self.written_total += len(records)
+        except Exception as e:
+            db.rollback()
+            self.dropped_total += len(records)
+            print(f"Incident store flush failed ({len(records)} incidents not written): {e}")
+            update_state(last_error=f"incident store flush failed: {e}")
+        finally:
+            db.close()
+
+        update_state(
+            incident_store_queue_depth=self.depth(),
+            last_incident_store_flush_at=datetime.utcnow().isoformat(),
+            incidents_written_total=self.written_total,
+            incident_writes_dropped_total=self.dropped_total,
+        )
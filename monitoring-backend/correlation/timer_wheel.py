@@ -0,0 +1,64 @@
+from typing import Dict, Hashable, List, Set
+
+class TimerWheel:
+    """
+    Hashed timer wheel: deadlines (epoch seconds) are kept in `slots`
+    buckets of `resolution` seconds each, so scheduling, rescheduling and
+    cancelling are O(1) and advance() only visits the buckets that time
+    has passed since the previous call, however many timers are pending.
+
+    A key holds at most one deadline; scheduling it again moves it.
+    Deadlines further out than one turn of the wheel simply stay in their
+    bucket until a later turn reaches them.
+    """
+
+    def __init__(self, slots: int = 256, resolution: float = 1.0):
+        self.resolution = resolution
+        self._slots: List[Set[Hashable]] = [set() for _ in range(slots)]
+        self._deadlines: Dict[Hashable, float] = {}
+        self._slot_of: Dict[Hashable, int] = {}
+        # Bucket number (deadline // resolution) advance() has reached
+        self._cursor = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts // self.resolution)
+
+    def schedule(self, key: Hashable, deadline: float):
+        self.cancel(key)
+        bucket = self._bucket(deadline)
+        if self._cursor is not None:
+            # Already overdue: due on the next advance()
+            bucket = max(bucket, self._cursor)
+        slot = bucket % len(self._slots)
+        self._deadlines[key] = deadline
+        self._slot_of[key] = slot
+        self._slots[slot].add(key)
+
+    def cancel(self, key: Hashable):
+        if key in self._deadlines:
+            del self._deadlines[key]
+            self._slots[self._slot_of.pop(key)].discard(key)
+
+    def deadline(self, key: Hashable):
+        return self._deadlines.get(key)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Removes and returns the keys whose deadline is before now, earliest first."""
+        current = self._bucket(now)
+        first = current - len(self._slots) + 1 if self._cursor is None else self._cursor
+        # A gap longer than one turn visits every bucket once
+        first = max(first, current - len(self._slots) + 1)
+
+        expired = []
+        for bucket in range(first, current + 1):
+            slot = self._slots[bucket % len(self._slots)]
+            expired.extend((self._deadlines[key], key) for key in slot if self._deadlines[key] < now)
+        for _, key in expired:
+            self.cancel(key)
+        # The current bucket is visited again next time: it may fill up until then
+        self._cursor = current
+        expired.sort(key=lambda entry: entry[0])
+        return [key for _, key in expired]
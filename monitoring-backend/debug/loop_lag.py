@@ -0,0 +1,68 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+from debug.pipeline_state import set_untracked, update_state
+
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+# Samples kept for the rolling max / p99 (600 x 100 ms = last minute)
+LOOP_LAG_SAMPLES = int(os.getenv("LOOP_LAG_SAMPLES", "600"))
+# Lag is pushed to /stream/events subscribers at most this often, and only
+# when a figure moved by at least LOOP_LAG_PUBLISH_DELTA_MS since the last push
+LOOP_LAG_PUBLISH_SECONDS = float(os.getenv("LOOP_LAG_PUBLISH_SECONDS", "10"))
+LOOP_LAG_PUBLISH_DELTA_MS = float(os.getenv("LOOP_LAG_PUBLISH_DELTA_MS", "5"))
+
+class LoopLagMonitor:
+    """
+    Measures event loop responsiveness: a task asks to wake up every
+    LOOP_LAG_INTERVAL_MS and records how late it actually ran. Anything
+    blocking the loop (sync I/O, CPU work in a coroutine) shows up as lag.
+    """
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, samples: int = LOOP_LAG_SAMPLES):
+        self.interval = interval_ms / 1000.0
+        self.samples = deque(maxlen=samples)
+        self.published = None
+        self.published_at = 0.0
+
+    def snapshot(self) -> dict:
+        if not self.samples:
+            return {"event_loop_lag_ms": None, "event_loop_lag_p99_ms": None, "event_loop_lag_max_ms": None}
+        ordered = sorted(self.samples)
+        return {
+            "event_loop_lag_ms": self.samples[-1],
+            "event_loop_lag_p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+            "event_loop_lag_max_ms": ordered[-1],
+        }
+
+    async def run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, (time.perf_counter() - expected) * 1000))
+            self.publish(self.snapshot())
+
+    def publish(self, snapshot: dict):
+        """
+        Every sample goes to the pipeline state untracked; it is only marked
+        changed (and streamed) on the coarse schedule above, so an idle
+        pipeline produces no deltas.
+        """
+        now = time.monotonic()
+        if now - self.published_at < LOOP_LAG_PUBLISH_SECONDS or not self._moved(snapshot):
+            set_untracked(**snapshot)
+            return
+        update_state(**snapshot)
+        self.published, self.published_at = snapshot, now
+
+    def _moved(self, snapshot: dict) -> bool:
+        if self.published is None:
+            return True
+        for key, value in snapshot.items():
+            previous = self.published[key]
+            if (value is None) != (previous is None):
+                return True
+            if value is not None and abs(value - previous) >= LOOP_LAG_PUBLISH_DELTA_MS:
+                return True
+        return False
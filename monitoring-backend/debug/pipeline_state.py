@@ -1,3 +1,4 @@
+import threading
 from datetime import datetime
 
 PIPELINE_STATE = {
@@ -8,8 +9,89 @@ PIPELINE_STATE = {
     "last_detection_result": None,
     "last_metrics": None,
     "last_error": None,
+    # Group-commit ingest writer
+    "ingest_queue_depth": 0,
+    "last_flush_at": None,
+    "last_flush_rows": 0,
+    "last_flush_commit_ms": None,
+    "last_flush_latency_ms": None,
+    "ingest_flushed_total": 0,
+    "ingest_dropped_total": 0,
+    "ingest_flush_retries_total": 0,
+    # Ingest admission control
+    "ingest_shed_total": 0,
+    "ingest_shed_by_service": {},
+    "last_shed_at": None,
+    # Detector inputs
+    "hot_buffer_rows": 0,
+    "aggregator_future_rows_total": 0,
+    "last_window_sources": None,
+    # Detection scheduling
+    "detection_runs_total": 0,
+    "detection_requests_total": 0,
+    "last_detection_reason": None,
+    "last_detection_tick_ms": None,
+    "detection_triggers_total": 0,
+    "last_detection_trigger": None,
+    # Per-detector runs / hits / errors / timings (detection/registry.py)
+    "detector_stats": {},
+    # Incident correlation
+    "open_incidents": 0,
+    # Incident persistence (correlation/incident_store.py)
+    "incident_store_queue_depth": 0,
+    "last_incident_store_flush_at": None,
+    "incidents_written_total": 0,
+    "incident_writes_dropped_total": 0,
+    # Server-push streams (streaming/event_hub.py)
+    "stream_clients": 0,
+    "stream_resyncs_total": 0,
+    # Event loop responsiveness (debug/loop_lag.py)
+    "event_loop_lag_ms": None,
+    "event_loop_lag_p99_ms": None,
+    "event_loop_lag_max_ms": None,
+    # Storage maintenance
+    "last_rollup_compaction_at": None,
+    "last_rollup_compaction": None,
+    "last_partition_drop_at": None,
+    "last_partitions_dropped": [],
 }
 
+# Keys updated since the last take_changes() (pushed to /stream/events subscribers)
+_changed = set()
+# Guards PIPELINE_STATE and _changed: readers serialize a copy (get_state)
+# while the writer, detection and loop-lag threads keep adding keys
+_lock = threading.Lock()
+
 def update_state(**kwargs):
-    PIPELINE_STATE.update(kwargs)
-    PIPELINE_STATE["updated_at"] = datetime.utcnow().isoformat()
+    with _lock:
+        PIPELINE_STATE.update(kwargs)
+        PIPELINE_STATE["updated_at"] = datetime.utcnow().isoformat()
+        _changed.update(kwargs)
+
+def set_untracked(**kwargs):
+    """
+    Like update_state, but not reported by take_changes(): for values sampled
+    too often to push on every change (e.g. event loop lag). They still show
+    in get_state().
+    """
+    with _lock:
+        PIPELINE_STATE.update(kwargs)
+
+def get_state() -> dict:
+    """
+    Copy of PIPELINE_STATE that is safe to serialize. A shallow copy is
+    enough: update_state replaces values, callers never mutate them in place.
+    """
+    with _lock:
+        return dict(PIPELINE_STATE)
+
+def take_changes() -> dict:
+    """Current values of the keys updated since the previous call (empty if none)."""
+    global _changed
+    with _lock:
+        keys, _changed = _changed, set()
+        if not keys:
+            return {}
+        changes = {key: PIPELINE_STATE[key] for key in keys}
+        changes["updated_at"] = PIPELINE_STATE["updated_at"]
+    return changes
@@ -1,25 +1,73 @@
-from typing import List
-from models.log import Log
+from typing import Dict, List
+import numpy as np
 
-def compute_error_rate(logs: List[Log]) -> float:
-    if not logs:
+# Additive per-window counters. Every source (SQL aggregate, in-memory
+# buckets, ...) produces one of these per service so they can be summed.
+STAT_FIELDS = (
+    "row_count",
+    "error_count",        # status_code >= 400 or level == ERROR
+    "level_error_count",  # level == ERROR only (per-service dominance rule)
+    "latency_sum",
+    "latency_count",
+    "retry_sum",
+    "retry_count",
+)
+
+def empty_stats() -> Dict[str, float]:
+    return {field: 0 for field in STAT_FIELDS}
+
+def combine_stats(per_service: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Sums per-service stats into global window stats."""
+    total = empty_stats()
+    for stats in per_service.values():
+        for field in STAT_FIELDS:
+            total[field] += stats[field]
+    return total
+
+def stats_from_columns(columns: Dict[str, np.ndarray], service_names: List[str]) -> Dict[str, Dict[str, float]]:
+    """
+    Per-service stats from window column arrays (see HotLogBuffer.window_columns)
+    using one bincount per field over the service codes, so the cost is
+    O(rows + services) whatever the number of services.
+    """
+    service = columns["service"]
+    size = len(service_names)
+    latency, retry = columns["latency"], columns["retry"]
+    has_latency = ~np.isnan(latency)
+    has_retry = ~np.isnan(retry)
+
+    sums = {
+        "row_count": np.bincount(service, minlength=size),
+        "error_count": np.bincount(service[columns["is_error"]], minlength=size),
+        "level_error_count": np.bincount(service[columns["is_level_error"]], minlength=size),
+        "latency_sum": np.bincount(service[has_latency], weights=latency[has_latency], minlength=size),
+        "latency_count": np.bincount(service[has_latency], minlength=size),
+        "retry_sum": np.bincount(service[has_retry], weights=retry[has_retry], minlength=size),
+        "retry_count": np.bincount(service[has_retry], minlength=size),
+    }
+    per_service = {}
+    for code in np.flatnonzero(sums["row_count"]):
+        per_service[service_names[code]] = {field: sums[field][code].item() for field in STAT_FIELDS}
+    return per_service
+
+def compute_error_rate(stats: Dict[str, float]) -> float:
+    if not stats["row_count"]:
         return 0.0
-    error_count = sum(1 for log in logs if (log.status_code is not None and log.status_code >= 400) or log.level == 'ERROR')
-    return error_count / len(logs)
+    return stats["error_count"] / stats["row_count"]
 
-def compute_avg_latency(logs: List[Log]) -> float:
-    valid_logs = [log.latency_ms for log in logs if log.latency_ms is not None]
-    if not valid_logs:
+def compute_avg_latency(stats: Dict[str, float]) -> float:
+    if not stats["latency_count"]:
         return 0.0
-    return sum(valid_logs) / len(valid_logs)
+    return stats["latency_sum"] / stats["latency_count"]
 
-def compute_log_rate(logs: List[Log], window_seconds: float) -> float:
+def compute_log_rate(stats: Dict[str, float], window_seconds: float, shed_count: int = 0) -> float:
+    # Logs shed by ingest admission control still happened; count them so
+    # overload does not look like a traffic drop.
     if window_seconds <= 0:
         return 0.0
-    return len(logs) / window_seconds
+    return (stats["row_count"] + shed_count) / window_seconds
 
-def compute_avg_retry(logs: List[Log]) -> float:
-    valid_logs = [log.retry_count for log in logs if log.retry_count is not None]
-    if not valid_logs:
+def compute_avg_retry(stats: Dict[str, float]) -> float:
+    if not stats["retry_count"]:
         return 0.0
-    return sum(valid_logs) / len(valid_logs)
+    return stats["retry_sum"] / stats["retry_count"]
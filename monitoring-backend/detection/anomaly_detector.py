@@ -1,17 +1,101 @@
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
-from storage.log_repository import get_logs_between
+from storage.log_repository import aggregate_logs_by_service
+from storage.rollups import rollup_stats_by_service, second_rollups_cover
+from storage.timestamps import to_epoch_us
 from debug.pipeline_state import update_state
 from detection.aggregation import (
+    combine_stats,
     compute_error_rate,
     compute_avg_latency,
     compute_log_rate,
     compute_avg_retry
 )
+from detection import clock
 from detection.reset import get_detection_reset_time, DETECTION_RESET_AT, RESET_COOLDOWN_SECONDS
+from detection.window_aggregator import SlidingWindowAggregator
+from detection.hot_buffer import HotLogBuffer
+from detection.sketches import merge_sketches
+from detection.traffic_sketches import TrafficSketches
+from detection.baselines import BaselineStore, METRICS as BASELINE_METRICS
+from detection.detectors import DETECTION_WINDOWS
+from detection.registry import DetectorRegistry
+from ingestion.admission import AdmissionController
+
+def _window_stats(db: Session, start_us: int, end_us: int):
+    """
+    Per-service window stats and where they came from: the hot log buffer,
+    else the per-second buckets, else the per-second rollups (e.g. while
+    the in-memory sources warm up after a restart), else a GROUP BY over
+    the raw log partitions for windows older than the per-second rollups
+    keep (e.g. the baselines catching up on history).
+    """
+    buffer = HotLogBuffer.get_instance()
+    if buffer.covers(start_us):
+        return buffer.window_stats(start_us, end_us), "hot_buffer"
+    aggregator = SlidingWindowAggregator.get_instance()
+    if aggregator.covers(start_us):
+        return aggregator.window_stats(start_us, end_us), "aggregator"
+    if second_rollups_cover(start_us):
+        return rollup_stats_by_service(db, start_us, end_us), "rollups"
+    return aggregate_logs_by_service(db, start_us, end_us), "logs"
+
+def _latency_quantiles(start_us: int, end_us: int):
+    """
+    Window latency p50/p95/p99 from the per-second sketches, or None for
+    each while the sketches do not cover the window yet (after a restart).
+    """
+    aggregator = SlidingWindowAggregator.get_instance()
+    if not aggregator.sketches_cover(start_us):
+        return {0.5: None, 0.95: None, 0.99: None}
+    sketch = merge_sketches(aggregator.window_latency_sketches(start_us, end_us).values())
+    return sketch.quantiles((0.5, 0.95, 0.99))
+
+def _multi_window_stats(db: Session, now_us: int, reset_us=None):
+    """
+    Current and reference per-service stats of every DETECTION_WINDOWS
+    entry, all from the aggregator's shared buckets. Windows it cannot
+    cover yet (not rebuilt) fall back to _window_stats per window. A
+    window whose reference reaches back before a demo reset is None.
+    """
+    windows = SlidingWindowAggregator.get_instance().multi_window_stats(now_us, DETECTION_WINDOWS)
+    for window in DETECTION_WINDOWS:
+        current_start_us = now_us - window["seconds"] * 1_000_000
+        reference_start_us = current_start_us - window["reference_seconds"] * 1_000_000
+        if reset_us is not None and reference_start_us < reset_us:
+            windows[window["name"]] = None
+        elif windows.get(window["name"]) is None:
+            windows[window["name"]] = {
+                "current": _window_stats(db, current_start_us, now_us)[0],
+                "reference": _window_stats(db, reference_start_us, current_start_us)[0],
+            }
+    return windows
+
+def _window_summary(stats):
+    """Pooled error rate and average latency of a window and its reference."""
+    if stats is None:
+        return None
+    current = combine_stats(stats["current"])
+    reference = combine_stats(stats["reference"])
+    return {
+        "rows": current["row_count"],
+        "error_rate": compute_error_rate(current),
+        "avg_latency": compute_avg_latency(current),
+        "reference_error_rate": compute_error_rate(reference),
+        "reference_avg_latency": compute_avg_latency(reference),
+    }
+
+def _max_zscores(z_scores):
+    """Highest z per metric across services, and the service it came from."""
+    highest = {metric: (None, None) for metric in BASELINE_METRICS}
+    for service, scores in z_scores.items():
+        for metric, z in scores.items():
+            if highest[metric][0] is None or z > highest[metric][0]:
+                highest[metric] = (z, service)
+    return highest
 
 def detect_anomaly(db: Session):
-    now = datetime.now(timezone.utc)
+    now = datetime.fromtimestamp(clock.now(), tz=timezone.utc)
     
     # Check for cooldown
     reset_at_for_check = get_detection_reset_time()
@@ -63,116 +147,101 @@ def detect_anomaly(db: Session):
     if baseline_duration_seconds < 0:
         baseline_duration_seconds = 0
 
-    # Format timestamps for DB query (ISO format)
-    # Assuming DB stores as ISO string, we format as such.
-    # Adjust format if DB assumes something else, but standard ISO is safe for string compare usually.
-    fmt = "%Y-%m-%dT%H:%M:%S.%f" # Matches typical ISO format
-    
-    # Actually, the DB strings might just be str(datetime). 
-    # Let's stick to str(datetime.isoformat()) which adds the 'T' and timezone if present.
-    # The generated logs likely have ISO format. 
-    
-    # Fix: DB stores timestamps with 'Z' suffix (Node.js style), but Python isoformat() uses '+00:00'.
-    # Since 'Z' > '+', the check 'log < end' fails because log ends with Z and end ends with +.
-    # We must format query timestamps to match DB format (or standard ISO with Z).
-    
-    def to_db_format(dt):
-        return dt.isoformat().replace("+00:00", "Z")
-        
-    short_logs = get_logs_between(db, to_db_format(short_start), to_db_format(now))
-    baseline_logs = get_logs_between(db, to_db_format(baseline_start), to_db_format(baseline_end))
+    # Window bounds as epoch microseconds (Log.ts_us is parsed once at ingest,
+    # so every ISO variant an emitter sends compares correctly here).
+    now_us = to_epoch_us(now)
+    short_start_us = to_epoch_us(short_start)
+    baseline_start_us = to_epoch_us(baseline_start)
+    baseline_end_us = to_epoch_us(baseline_end)
+
+    # Per-service counters; no rows are hydrated
+    short_by_service, short_source = _window_stats(db, short_start_us, now_us)
+    baseline_by_service, baseline_source = _window_stats(db, baseline_start_us, baseline_end_us)
+    short_stats = combine_stats(short_by_service)
+    baseline_stats = combine_stats(baseline_by_service)
+
+    # Logs shed under overload never reach the DB but still count towards volume
+    admission = AdmissionController.get_instance()
+    shed_short = admission.shed_between(short_start, now)
+    shed_baseline = admission.shed_between(baseline_start, baseline_end)
     
     # Compute Metrics
     metrics = {}
     
     # Short window metrics
-    metrics["error_rate_short"] = compute_error_rate(short_logs)
-    metrics["avg_latency_short"] = compute_avg_latency(short_logs)
-    metrics["log_rate_short"] = compute_log_rate(short_logs, short_window_seconds)
-    metrics["avg_retry_short"] = compute_avg_retry(short_logs)
+    metrics["error_rate_short"] = compute_error_rate(short_stats)
+    metrics["avg_latency_short"] = compute_avg_latency(short_stats)
+    metrics["log_rate_short"] = compute_log_rate(short_stats, short_window_seconds, shed_short)
+    metrics["avg_retry_short"] = compute_avg_retry(short_stats)
     
     # Baseline window metrics
-    metrics["error_rate_baseline"] = compute_error_rate(baseline_logs)
-    metrics["avg_latency_baseline"] = compute_avg_latency(baseline_logs)
-    metrics["log_rate_baseline"] = compute_log_rate(baseline_logs, baseline_duration_seconds)
-    metrics["avg_retry_baseline"] = compute_avg_retry(baseline_logs) # Note: this is density, not rate, so avg per log is fine
+    metrics["error_rate_baseline"] = compute_error_rate(baseline_stats)
+    metrics["avg_latency_baseline"] = compute_avg_latency(baseline_stats)
+    metrics["log_rate_baseline"] = compute_log_rate(baseline_stats, baseline_duration_seconds, shed_baseline)
+    metrics["avg_retry_baseline"] = compute_avg_retry(baseline_stats) # Note: this is density, not rate, so avg per log is fine
+    metrics["shed_short"] = shed_short
+    metrics["shed_baseline"] = shed_baseline
+
+    # Tail latency (mergeable per-second sketches, no raw latencies kept)
+    for window, (start_us, end_us) in (("short", (short_start_us, now_us)), ("baseline", (baseline_start_us, baseline_end_us))):
+        quantiles = _latency_quantiles(start_us, end_us)
+        metrics[f"p50_latency_{window}"] = quantiles[0.5]
+        metrics[f"p95_latency_{window}"] = quantiles[0.95]
+        metrics[f"p99_latency_{window}"] = quantiles[0.99]
     
+    # Top IPs, /24 prefixes, endpoints, error types and status codes with
+    # distinct counts, from the per-second traffic sketches (None until they
+    # cover the window after a restart)
+    traffic = TrafficSketches.get_instance()
+    metrics["traffic_short"] = traffic.window_profile(short_start_us, now_us) if traffic.covers(short_start_us) else None
+
+    # Per-service z-scores against the learned baselines. Folding the
+    # minutes completed since the last tick is O(services) per minute.
+    now_s = int(now.timestamp())
+    baselines = BaselineStore.get_instance()
+    baselines.advance(db, now_s, lambda start_us, end_us: _window_stats(db, start_us, end_us)[0])
+    short_seconds = (now - short_start).total_seconds()
+    z_scores = baselines.zscores(short_by_service, short_seconds, now_s) if short_seconds > 0 else {}
+    highest_z = _max_zscores(z_scores)
+    metrics["baseline_model"] = "ewma" if z_scores else "window"
+    for metric, (z, service) in highest_z.items():
+        metrics[f"z_{metric}_max"] = z
+        metrics[f"z_{metric}_service"] = service
+
     # Aggregation Debug State
     # We use utcnow() for internal debug timestamps
     update_state(
         last_aggregation_at=datetime.utcnow().isoformat(),
-        last_metrics=metrics
+        last_metrics=metrics,
+        last_window_sources={"short": short_source, "baseline": baseline_source}
     )
     
-    signals = []
-    
-    # 1. Error Rate Spike
-    # error_rate_short > max(0.1, 2 * error_rate_baseline)
-    if metrics["error_rate_short"] > max(0.05, 1.5 * metrics["error_rate_baseline"]):
-        signals.append("error_rate_spike")
-        
-    # 2. Latency Degradation
-    # avg_latency_short > avg_latency_baseline * 1.8
-    if metrics["avg_latency_short"] > metrics["avg_latency_baseline"] * 1.8:
-        signals.append("latency_degradation")
-        
-    # 3. Traffic Volume Spike
-    # log_rate_short > log_rate_baseline * 5
-    if metrics["log_rate_short"] > metrics["log_rate_baseline"] * 5:
-        signals.append("traffic_volume_spike")
-        
-    # 4. Retry Storm
-    # avg_retry_short > 2
-    if metrics["avg_retry_short"] > 2:
-        signals.append("retry_storm")
-        
-    # extract affected services (Fix 2: Dominant Services)
-    all_seen_services = list(set(log.service for log in short_logs))
-    affected_services = []
-    
-    # Calculate per-service stats for dominance check
-    service_stats = {}
-    for svc in all_seen_services:
-        svc_logs = [l for l in short_logs if l.service == svc]
-        if not svc_logs:
-            continue
-            
-        # Service Error Rate
-        err_count = sum(1 for l in svc_logs if l.level == "ERROR")
-        svc_error_rate = err_count / len(svc_logs)
-        
-        # Service Latency
-        latencies = [l.latency_ms for l in svc_logs if l.latency_ms is not None]
-        svc_avg_latency = sum(latencies) / len(latencies) if latencies else 0
-        
-        # Check Dominance Rules
-        # 1. High Error Rate (> 10%)
-        # 2. High Latency (> 1.5x GLOBAL baseline - simplified proxy)
-        if svc == "auth":
-            # Fix 4: Add debug visibility
-            levels = set(l.level for l in svc_logs)
-            print(f"[DETECTOR] auth_error_rate={svc_error_rate:.2f}, latency={svc_avg_latency:.2f}, count={len(svc_logs)}, errs={err_count}, levels={levels}")
-            
-            # Fix 1: Lower error-rate threshold for auth only
-            if svc_error_rate > 0.05:
-                affected_services.append(svc)
-                # Fix 2: Make auth failure a direct anomaly trigger
-                if "error_rate_spike" not in signals:
-                    signals.append("error_rate_spike")
-        else:
-            if svc_error_rate > 0.10:
-                affected_services.append(svc)
-            elif svc_avg_latency > metrics["avg_latency_baseline"] * 1.5:
-                affected_services.append(svc)
-            
-    # Fallback: If no dominant service found but anomaly exists, take all
-    if not affected_services:
-        affected_services = all_seen_services
-        
+    # All evaluation windows (10 s .. 1 h) with their reference windows
+    windows = _multi_window_stats(db, now_us, to_epoch_us(reset_at) if reset_at else None)
+    metrics["windows"] = {name: _window_summary(stats) for name, stats in windows.items()}
+
+    # Every detector reads this one snapshot; none of them queries storage
+    snapshot = {
+        "metrics": metrics,
+        "short_by_service": short_by_service,
+        "baseline_by_service": baseline_by_service,
+        "windows": windows,
+        "short_seconds": short_seconds,
+        "baseline_seconds": baseline_duration_seconds,
+        "z_scores": z_scores,
+    }
+    outcome = DetectorRegistry.get_instance().evaluate(snapshot)
+    signals = outcome["signals"]
+    # Empty when no detector names a service: IncidentManager then attributes
+    # the anomaly by signal (or to the latest open incident) rather than to
+    # every service seen in the window
+    affected_services = outcome["affected_services"]
+
     result = {
         "anomaly": len(signals) > 0,
         "window": "last_60s",
         "signals": signals,
+        "signal_windows": outcome["signal_windows"],
         "metrics": metrics,
         "affected_services": affected_services
     }
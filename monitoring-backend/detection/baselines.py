@@ -0,0 +1,178 @@
+import math
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from detection.aggregation import compute_avg_latency, compute_avg_retry, compute_error_rate
+from storage.baseline_repository import load_baseline_models, save_baseline_models
+
+# Weight of each new 1-minute bucket (0.05 ~ the last 20 minutes dominate)
+BASELINE_ALPHA = float(os.getenv("BASELINE_ALPHA", "0.05"))
+# Hour-of-week models see 60 buckets a week, so they learn faster per bucket
+BASELINE_SEASONAL = os.getenv("BASELINE_SEASONAL", "true").lower() in ("1", "true", "yes")
+BASELINE_SEASONAL_ALPHA = float(os.getenv("BASELINE_SEASONAL_ALPHA", "0.2"))
+# Buckets a model needs before detection trusts it
+BASELINE_MIN_SAMPLES = int(os.getenv("BASELINE_MIN_SAMPLES", "15"))
+BASELINE_SEASONAL_MIN_SAMPLES = int(os.getenv("BASELINE_SEASONAL_MIN_SAMPLES", "120"))
+BASELINE_Z_THRESHOLD = float(os.getenv("BASELINE_Z_THRESHOLD", "3"))
+# Values are clipped to mean +/- this many std before updating, so a long
+# incident shifts the baseline slowly instead of becoming the new normal
+BASELINE_UPDATE_CLIP_Z = float(os.getenv("BASELINE_UPDATE_CLIP_Z", "4"))
+# History replayed on first start, and the most a restart catches up
+BASELINE_MAX_CATCHUP_MINUTES = int(os.getenv("BASELINE_MAX_CATCHUP_MINUTES", "60"))
+# A minute is folded once it ended this long ago (late rows)
+BASELINE_SETTLE_SECONDS = int(os.getenv("BASELINE_SETTLE_SECONDS", "5"))
+
+BUCKET_SECONDS = 60
+ALL_HOURS = -1
+METRICS = ("error_rate", "avg_latency", "log_rate", "avg_retry")
+# Lower bound on the std used for z-scores, so a perfectly flat history
+# does not turn every small wobble into a huge z
+MIN_STD = {"error_rate": 0.01, "avg_latency": 5.0, "log_rate": 0.2, "avg_retry": 0.1}
+MIN_STD_RATIO = 0.1
+
+def hour_of_week(epoch_s: int) -> int:
+    """UTC hour of week, 0 = Monday 00:00 (the epoch was a Thursday)."""
+    return (epoch_s // 3600 + 3 * 24) % 168
+
+def window_metrics(stats: Dict[str, float], window_seconds: float) -> Dict[str, Optional[float]]:
+    """Baseline metrics of one service's window stats; None where the window has no samples."""
+    return {
+        "error_rate": compute_error_rate(stats) if stats["row_count"] else None,
+        "avg_latency": compute_avg_latency(stats) if stats["latency_count"] else None,
+        "log_rate": stats["row_count"] / window_seconds if window_seconds > 0 else None,
+        "avg_retry": compute_avg_retry(stats) if stats["retry_count"] else None,
+    }
+
+class EwmaModel:
+    """Exponentially weighted mean and variance, O(1) per update."""
+    __slots__ = ("mean", "var", "samples")
+
+    def __init__(self, mean: float = 0.0, var: float = 0.0, samples: int = 0):
+        self.mean = mean
+        self.var = var
+        self.samples = samples
+
+    def std(self, metric: str) -> float:
+        return max(math.sqrt(self.var), MIN_STD[metric], MIN_STD_RATIO * abs(self.mean))
+
+    def update(self, value: float, alpha: float, metric: str, min_samples: int):
+        if self.samples == 0:
+            self.mean = value
+        else:
+            if self.samples >= min_samples:
+                limit = BASELINE_UPDATE_CLIP_Z * self.std(metric)
+                value = min(max(value, self.mean - limit), self.mean + limit)
+            diff = value - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.var = (1 - alpha) * (self.var + diff * increment)
+        self.samples += 1
+
+class BaselineStore:
+    """
+    Per-service, per-metric baselines learned one 1-minute bucket at a time.
+
+    Every service has an all-hours EWMA model per metric and, with
+    BASELINE_SEASONAL, one per UTC hour of week. advance() folds each
+    completed minute exactly once, so the cost is O(services) per minute
+    and never a rescan. Models are persisted to baseline_models and
+    reloaded on startup, so a restart or /demo/reset keeps them.
+    """
+    _instance = None
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str, int], EwmaModel] = {}
+        self._dirty = set()
+        # Epoch minute of the newest folded bucket
+        self.last_minute: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = BaselineStore()
+        return cls._instance
+
+    def load(self, db: Session):
+        rows = load_baseline_models(db)
+        with self._lock:
+            for row in rows:
+                key = (row["service"], row["metric"], row["season"])
+                self._models[key] = EwmaModel(row["mean"], row["var"], row["samples"])
+                if row["last_minute"] is not None:
+                    self.last_minute = max(self.last_minute or row["last_minute"], row["last_minute"])
+        print(f"Baselines loaded: {len(rows)} models")
+
+    def _fold(self, service: str, metrics: Dict[str, Optional[float]], season: int):
+        for metric, value in metrics.items():
+            if value is None:
+                continue
+            keys = [((service, metric, ALL_HOURS), BASELINE_ALPHA, BASELINE_MIN_SAMPLES)]
+            if BASELINE_SEASONAL:
+                keys.append(((service, metric, season), BASELINE_SEASONAL_ALPHA, BASELINE_SEASONAL_MIN_SAMPLES))
+            for key, alpha, min_samples in keys:
+                model = self._models.get(key)
+                if model is None:
+                    model = self._models[key] = EwmaModel()
+                model.update(value, alpha, metric, min_samples)
+                self._dirty.add(key)
+
+    def advance(self, db: Session, now_s: int, fetch_stats: Callable[[int, int], Dict[str, Dict[str, float]]]) -> int:
+        """
+        Folds every minute completed since the last call. fetch_stats(start_us, end_us)
+        returns per-service window stats. Returns the number of minutes folded.
+        """
+        target = (now_s - BASELINE_SETTLE_SECONDS) // BUCKET_SECONDS - 1
+        with self._lock:
+            if self.last_minute is not None and self.last_minute >= target:
+                return 0
+            # First run learns from whatever history the stats source still holds
+            first = target - BASELINE_MAX_CATCHUP_MINUTES + 1
+            if self.last_minute is not None:
+                first = max(first, self.last_minute + 1)
+            services = {service for service, metric, _ in self._models if metric == "log_rate"}
+            for minute in range(first, target + 1):
+                start_s = minute * BUCKET_SECONDS
+                per_service = fetch_stats(start_s * 1_000_000, (start_s + BUCKET_SECONDS) * 1_000_000)
+                season = hour_of_week(start_s)
+                for service, stats in per_service.items():
+                    self._fold(service, window_metrics(stats, BUCKET_SECONDS), season)
+                # Known services that went quiet still had a rate of zero
+                for service in services - per_service.keys():
+                    self._fold(service, {"log_rate": 0.0}, season)
+                services.update(per_service)
+            self.last_minute = target
+            rows = [
+                {"service": key[0], "metric": key[1], "season": key[2], "mean": model.mean,
+                 "var": model.var, "samples": model.samples, "last_minute": target}
+                for key, model in ((key, self._models[key]) for key in self._dirty)
+            ]
+            self._dirty.clear()
+        save_baseline_models(db, rows)
+        return target - first + 1
+
+    def _model_for(self, service: str, metric: str, now_s: int) -> Optional[EwmaModel]:
+        if BASELINE_SEASONAL:
+            seasonal = self._models.get((service, metric, hour_of_week(now_s)))
+            if seasonal is not None and seasonal.samples >= BASELINE_SEASONAL_MIN_SAMPLES:
+                return seasonal
+        model = self._models.get((service, metric, ALL_HOURS))
+        if model is not None and model.samples >= BASELINE_MIN_SAMPLES:
+            return model
+        return None
+
+    def zscores(self, per_service: Dict[str, Dict[str, float]], window_seconds: float, now_s: int) -> Dict[str, Dict[str, float]]:
+        """z-score of each service's window metrics against its baseline; services without a trained model are left out."""
+        scores = {}
+        with self._lock:
+            for service, stats in per_service.items():
+                service_scores = {}
+                for metric, value in window_metrics(stats, window_seconds).items():
+                    model = self._model_for(service, metric, now_s)
+                    if value is not None and model is not None:
+                        service_scores[metric] = (value - model.mean) / model.std(metric)
+                if service_scores:
+                    scores[service] = service_scores
+        return scores
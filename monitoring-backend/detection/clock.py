@@ -0,0 +1,14 @@
+import time
+from typing import Optional
+
+# Epoch seconds the detection pipeline treats as "now" while replaying
+# stored logs (detection/replay.py); None means the wall clock.
+_simulated: Optional[float] = None
+
+def now() -> float:
+    """Current epoch seconds: the wall clock, or the replay's simulated time."""
+    return time.time() if _simulated is None else _simulated
+
+def set_simulated_time(epoch_s: Optional[float]):
+    global _simulated
+    _simulated = epoch_s
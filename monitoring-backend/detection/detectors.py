@@ -0,0 +1,228 @@
+import os
+from typing import Any, Dict, List
+
+from detection.aggregation import combine_stats, compute_avg_latency, compute_error_rate, compute_log_rate
+from detection.baselines import BASELINE_Z_THRESHOLD
+
+# Windows evaluated every tick, each against the reference window just before
+# it. The 60 s window (against the 9 minutes before it) is the primary one
+# the threshold, dominance and zscore detectors read; rate_of_change flags
+# per-service jumps in the others. A short window catches a spike before it
+# is diluted over 60 s; a long one catches a slow burn the 9-minute baseline
+# drifts along with. factor / min_error_rate are the rate_of_change thresholds.
+PRIMARY_WINDOW = "60s"
+DETECTION_WINDOWS = (
+    {"name": "10s", "seconds": 10, "reference_seconds": 50, "factor": 3.0, "min_error_rate": 0.2},
+    {"name": "60s", "seconds": 60, "reference_seconds": 540, "factor": 1.5, "min_error_rate": 0.05},
+    {"name": "5m", "seconds": 300, "reference_seconds": 1800, "factor": 2.0, "min_error_rate": 0.1},
+    {"name": "1h", "seconds": 3600, "reference_seconds": 3600, "factor": 1.5, "min_error_rate": 0.05},
+)
+# Rows a service needs in both the window and its reference before a jump counts
+ROC_MIN_ROWS = int(os.getenv("ROC_MIN_ROWS", "20"))
+
+# A z-score alone does not make an error spike: the service must also be failing noticeably
+BASELINE_MIN_ERROR_RATE = 0.05
+
+class Detector:
+    """
+    One detection rule set. detect() reads the window snapshot built once
+    per tick by detect_anomaly and never queries storage, so
+    any number of detectors share the same aggregation work.
+
+    Snapshot keys:
+      metrics              - global short / baseline window metrics
+      short_by_service     - per-service stats of the short window
+      baseline_by_service  - per-service stats of the baseline window
+      windows              - DETECTION_WINDOWS name -> {"current": per_service,
+                             "reference": per_service}, or None while the
+                             in-memory buckets do not cover the window
+      short_seconds
+      baseline_seconds
+      z_scores             - per-service z-scores against learned baselines
+                             (services without a trained baseline are left out)
+
+    detect() returns {"signals": [...], "affected_services": [...]} and
+    optionally "windows": {signal: [window names]}; signals it does not
+    map there are attributed to the detector's `window`. Detectors marked
+    expensive run on the registry's thread pool, the others inline. Mark
+    only detectors doing I/O or NumPy work that releases the GIL: a loop
+    over the snapshot's dicts gains nothing from a thread and pays the
+    submit / future overhead every tick.
+    """
+    name = "detector"
+    expensive = False
+    window = PRIMARY_WINDOW
+
+    def detect(self, snapshot: Dict[str, Any]) -> Dict[str, List[str]]:
+        raise NotImplementedError
+
+class ThresholdDetector(Detector):
+    """
+    Fixed rules over the pooled windows: cold-start multipliers, tail
+    latency and retry storms. The cold-start multipliers cover the services
+    without a trained baseline (all of them until the first is trained);
+    the zscore detector covers the others.
+    """
+    name = "threshold"
+
+    def _cold_start_metrics(self, snapshot):
+        """Pooled short / baseline metrics of the services without a z-score (None if there are none)."""
+        z_scores = snapshot["z_scores"]
+        if not z_scores:
+            return snapshot["metrics"]
+        short = {svc: stats for svc, stats in snapshot["short_by_service"].items() if svc not in z_scores}
+        baseline = {svc: stats for svc, stats in snapshot["baseline_by_service"].items() if svc not in z_scores}
+        if not short:
+            return None
+        # Shed logs are not attributed to services, so they only count in the all-services pool
+        short_stats, baseline_stats = combine_stats(short), combine_stats(baseline)
+        return {
+            "error_rate_short": compute_error_rate(short_stats),
+            "avg_latency_short": compute_avg_latency(short_stats),
+            "log_rate_short": compute_log_rate(short_stats, snapshot["short_seconds"]),
+            "error_rate_baseline": compute_error_rate(baseline_stats),
+            "avg_latency_baseline": compute_avg_latency(baseline_stats),
+            "log_rate_baseline": compute_log_rate(baseline_stats, snapshot["baseline_seconds"]),
+        }
+
+    def detect(self, snapshot):
+        metrics = snapshot["metrics"]
+        signals = []
+
+        # Tail latency: p95_short > p95_baseline * 1.8 (a slow tail the mean hides)
+        tail_degraded = (
+            metrics["p95_latency_short"] is not None
+            and metrics["p95_latency_baseline"]
+            and metrics["p95_latency_short"] > metrics["p95_latency_baseline"] * 1.8
+        )
+        if tail_degraded:
+            signals.append("latency_degradation")
+
+        cold = self._cold_start_metrics(snapshot)
+        if cold is not None:
+            # Cold start (no trained baseline yet): fixed multipliers over the pooled 9-minute window
+
+            # 1. Error Rate Spike
+            # error_rate_short > max(0.1, 2 * error_rate_baseline)
+            if cold["error_rate_short"] > max(0.05, 1.5 * cold["error_rate_baseline"]):
+                signals.append("error_rate_spike")
+
+            # 2. Latency Degradation
+            # avg_latency_short > avg_latency_baseline * 1.8
+            if cold["avg_latency_short"] > cold["avg_latency_baseline"] * 1.8:
+                signals.append("latency_degradation")
+
+            # 3. Traffic Volume Spike
+            # log_rate_short > log_rate_baseline * 5
+            if cold["log_rate_short"] > cold["log_rate_baseline"] * 5:
+                signals.append("traffic_volume_spike")
+
+        # 4. Retry Storm
+        # avg_retry_short > 2
+        if metrics["avg_retry_short"] > 2:
+            signals.append("retry_storm")
+
+        return {"signals": signals, "affected_services": []}
+
+class ZScoreDetector(Detector):
+    """Services whose short window is BASELINE_Z_THRESHOLD std above their own learned baseline."""
+    name = "zscore"
+
+    SIGNALS = {
+        "error_rate": "error_rate_spike",
+        "avg_latency": "latency_degradation",
+        "log_rate": "traffic_volume_spike",
+    }
+
+    def detect(self, snapshot):
+        short_by_service = snapshot["short_by_service"]
+        signals = set()
+        flagged = set()
+        for svc, scores in snapshot["z_scores"].items():
+            for metric, z in scores.items():
+                if z <= BASELINE_Z_THRESHOLD:
+                    continue
+                if metric == "error_rate" and compute_error_rate(short_by_service[svc]) < BASELINE_MIN_ERROR_RATE:
+                    continue
+                flagged.add(svc)
+                if metric in self.SIGNALS:
+                    signals.add(self.SIGNALS[metric])
+        return {"signals": sorted(signals), "affected_services": sorted(flagged)}
+
+class RateOfChangeDetector(Detector):
+    """
+    Per-service jumps in every non-primary window against the reference
+    window before it: error rate or average latency up by the window's
+    factor. A sudden outage shows in the 10 s window long before it
+    dominates 60 s; a slow burn shows in 1 h against the hour before.
+    """
+    name = "rate_of_change"
+
+    def detect(self, snapshot):
+        signal_windows = {}
+        affected = []
+        for window in DETECTION_WINDOWS:
+            stats = snapshot["windows"].get(window["name"])
+            if window["name"] == PRIMARY_WINDOW or stats is None:
+                continue
+            for svc, current in stats["current"].items():
+                reference = stats["reference"].get(svc)
+                if current["row_count"] < ROC_MIN_ROWS or reference is None or reference["row_count"] < ROC_MIN_ROWS:
+                    continue
+
+                error_rate = compute_error_rate(current)
+                error_jump = error_rate >= window["min_error_rate"] and (
+                    error_rate > window["factor"] * compute_error_rate(reference)
+                )
+                latency_jump = (
+                    current["latency_count"] and reference["latency_count"]
+                    and compute_avg_latency(current) > window["factor"] * compute_avg_latency(reference)
+                )
+                for signal, fired in (("error_rate_spike", error_jump), ("latency_degradation", latency_jump)):
+                    if fired:
+                        signal_windows.setdefault(signal, []).append(window["name"])
+                if (error_jump or latency_jump) and svc not in affected:
+                    affected.append(svc)
+        windows = {signal: list(dict.fromkeys(names)) for signal, names in signal_windows.items()}
+        return {"signals": sorted(windows), "affected_services": affected, "windows": windows}
+
+class DominanceDetector(Detector):
+    """Services that dominate the short window's errors or latency (with the auth special case)."""
+    name = "dominance"
+
+    def detect(self, snapshot):
+        metrics = snapshot["metrics"]
+        signals = []
+        affected_services = []
+
+        # Calculate per-service stats for dominance check
+        for svc, svc_stats in snapshot["short_by_service"].items():
+            if not svc_stats["row_count"]:
+                continue
+
+            # Service Error Rate
+            err_count = svc_stats["level_error_count"]
+            svc_error_rate = err_count / svc_stats["row_count"]
+
+            # Service Latency
+            svc_avg_latency = compute_avg_latency(svc_stats)
+
+            # Check Dominance Rules
+            # 1. High Error Rate (> 10%)
+            # 2. High Latency (> 1.5x GLOBAL baseline - simplified proxy)
+            if svc == "auth":
+                # Fix 1: Lower error-rate threshold for auth only
+                if svc_error_rate > 0.05:
+                    affected_services.append(svc)
+                    # Fix 2: Make auth failure a direct anomaly trigger
+                    signals.append("error_rate_spike")
+            else:
+                if svc_error_rate > 0.10:
+                    affected_services.append(svc)
+                elif svc_avg_latency > metrics["avg_latency_baseline"] * 1.5:
+                    affected_services.append(svc)
+
+        return {"signals": signals, "affected_services": affected_services}
+
+# Registration order is the order affected services are reported in
+DEFAULT_DETECTORS = (ThresholdDetector, DominanceDetector, ZScoreDetector, RateOfChangeDetector)
@@ -0,0 +1,145 @@
+import os
+import threading
+from typing import Dict, List, Tuple
+import numpy as np
+
+from detection import clock
+from detection.aggregation import stats_from_columns
+from debug.pipeline_state import update_state
+
+# Seconds of raw logs kept in memory. Must cover the detection horizon (10 minutes).
+HOT_BUFFER_SECONDS = int(os.getenv("HOT_BUFFER_SECONDS", "660"))
+# Memory cap: rows beyond this overwrite the oldest ones (~30 bytes per row)
+HOT_BUFFER_MAX_ROWS = int(os.getenv("HOT_BUFFER_MAX_ROWS", "500000"))
+
+US_PER_SECOND = 1_000_000
+
+COLUMNS = ("ts_us", "service", "is_error", "is_level_error", "latency", "retry")
+
+class HotLogBuffer:
+    """
+    Columnar ring buffer of recently committed logs.
+
+    Each field is a preallocated NumPy array indexed by ring slot, so
+    storing a log costs a few array writes instead of an object, and a
+    window read is a handful of vectorised masks. Rows are evicted once
+    they are older than HOT_BUFFER_SECONDS or overwritten when the buffer
+    holds HOT_BUFFER_MAX_ROWS.
+
+    The buffer only knows about logs committed since the process started
+    (complete_from_us). covers() tells the detector when a window can be
+    answered from memory; until then it falls back to the database.
+    """
+    _instance = None
+
+    def __init__(self, max_rows: int = HOT_BUFFER_MAX_ROWS, horizon_seconds: int = HOT_BUFFER_SECONDS):
+        self.max_rows = max_rows
+        self.horizon_us = horizon_seconds * US_PER_SECOND
+        self.ts_us = np.zeros(max_rows, dtype=np.int64)
+        self.service = np.zeros(max_rows, dtype=np.int32)
+        self.is_error = np.zeros(max_rows, dtype=np.bool_)        # status >= 400 or level ERROR
+        self.is_level_error = np.zeros(max_rows, dtype=np.bool_)  # level ERROR only
+        self.latency = np.zeros(max_rows, dtype=np.float64)       # NaN when missing
+        self.retry = np.zeros(max_rows, dtype=np.float64)         # NaN when missing
+
+        # Services are stored as small integer codes
+        self.service_codes: Dict[str, int] = {}
+        self.service_names: List[str] = []
+
+        # Live rows are the absolute positions [_head, _tail); slot = position % max_rows
+        self._head = 0
+        self._tail = 0
+        self._last_evict_at = 0.0
+        self._lock = threading.Lock()
+        # Every log with ts_us >= complete_from_us committed from now on is held here
+        self.complete_from_us = int(clock.now() * US_PER_SECOND)
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = HotLogBuffer()
+        return cls._instance
+
+    def _code_for(self, service: str) -> int:
+        code = self.service_codes.get(service)
+        if code is None:
+            code = self.service_codes[service] = len(self.service_names)
+            self.service_names.append(service)
+        return code
+
+    def add_rows(self, rows: List[dict]):
+        """Appends committed log rows (storage dicts with ts_us). Used as a LogWriter flush listener."""
+        if not rows:
+            return
+        nan = float("nan")
+        with self._lock:
+            if len(rows) > self.max_rows:
+                # More rows than fit: only the newest ones would survive anyway
+                dropped_us = max(row["ts_us"] for row in rows[:-self.max_rows])
+                self.complete_from_us = max(self.complete_from_us, dropped_us + 1)
+                rows = rows[-self.max_rows:]
+            count = len(rows)
+            columns = {
+                "ts_us": np.fromiter((row["ts_us"] for row in rows), dtype=np.int64, count=count),
+                "service": np.fromiter((self._code_for(row["service"]) for row in rows), dtype=np.int32, count=count),
+                "is_level_error": np.fromiter((row.get("level") == "ERROR" for row in rows), dtype=np.bool_, count=count),
+                "is_error": np.fromiter(
+                    (row.get("level") == "ERROR" or (row.get("status_code") is not None and row["status_code"] >= 400) for row in rows),
+                    dtype=np.bool_, count=count),
+                "latency": np.fromiter((nan if row.get("latency_ms") is None else row["latency_ms"] for row in rows), dtype=np.float64, count=count),
+                "retry": np.fromiter((nan if row.get("retry_count") is None else row["retry_count"] for row in rows), dtype=np.float64, count=count),
+            }
+
+            # Make room: rows overwritten before aging out leave a gap in coverage
+            overflow = (self._tail + count) - (self._head + self.max_rows)
+            if overflow > 0:
+                evicted = self._slots(self._head, self._head + overflow)
+                self.complete_from_us = max(self.complete_from_us, int(self.ts_us[evicted].max()) + 1)
+                self._head += overflow
+
+            slots = self._slots(self._tail, self._tail + count)
+            for name, values in columns.items():
+                getattr(self, name)[slots] = values
+            self._tail += count
+
+            now = clock.now()
+            if now - self._last_evict_at >= 1.0:
+                self._evict_older_than(int(now * US_PER_SECOND) - self.horizon_us)
+                self._last_evict_at = now
+            live_rows = self._tail - self._head
+
+        update_state(hot_buffer_rows=live_rows)
+
+    def _slots(self, start: int, end: int) -> np.ndarray:
+        return np.arange(start, end) % self.max_rows
+
+    def _evict_older_than(self, cutoff_us: int):
+        """Drops the leading run of rows older than cutoff_us (rows arrive roughly in time order)."""
+        if self._tail == self._head:
+            return
+        fresh = self.ts_us[self._slots(self._head, self._tail)] >= cutoff_us
+        first_fresh = int(np.argmax(fresh)) if fresh.any() else len(fresh)
+        self._head += first_fresh
+
+    def covers(self, start_us: int) -> bool:
+        """True if every committed log from start_us onwards is held in memory."""
+        horizon_start = int(clock.now() * US_PER_SECOND) - self.horizon_us
+        return start_us >= max(self.complete_from_us, horizon_start)
+
+    def window_columns(self, start_us: int, end_us: int) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """Column arrays of the rows with start_us <= ts_us < end_us, plus the service code -> name table."""
+        with self._lock:
+            slots = self._slots(self._head, self._tail)
+            ts_us = self.ts_us[slots]
+            selected = slots[(ts_us >= start_us) & (ts_us < end_us)]
+            columns = {name: getattr(self, name)[selected] for name in COLUMNS}
+            names = list(self.service_names)
+        return columns, names
+
+    def window_stats(self, start_us: int, end_us: int) -> Dict[str, Dict[str, float]]:
+        """Per-service stats (detection.aggregation.STAT_FIELDS) for start_us <= ts_us < end_us."""
+        columns, names = self.window_columns(start_us, end_us)
+        return stats_from_columns(columns, names)
+
+    def memory_bytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from debug.pipeline_state import update_state
+from detection.detectors import DEFAULT_DETECTORS, DETECTION_WINDOWS, Detector
+
+# Threads for detectors marked expensive (0 = run everything inline)
+DETECTOR_WORKERS = int(os.getenv("DETECTOR_WORKERS", "4"))
+# Comma-separated detector names to leave out, e.g. "rate_of_change"
+DETECTORS_DISABLED = {
+    name.strip() for name in os.getenv("DETECTORS_DISABLED", "").split(",") if name.strip()
+}
+
+# Signals are reported in this order whatever detector raised them
+SIGNAL_ORDER = ("error_rate_spike", "latency_degradation", "traffic_volume_spike", "retry_storm")
+
+class DetectorRegistry:
+    """
+    The detectors detect_anomaly evaluates on every tick.
+
+    evaluate() hands the same window snapshot to every registered
+    detector: the ones marked expensive are submitted to a thread pool
+    first, the cheap ones run inline meanwhile. A failing detector is
+    logged and counted but does not fail the tick. Per-detector runs,
+    hits (ticks where it raised a signal or a service), errors and
+    timings are published as detector_stats in the pipeline state.
+    """
+    _instance = None
+
+    def __init__(self, workers: int = DETECTOR_WORKERS):
+        self._detectors: List[Detector] = []
+        self._workers = workers
+        # Started with the first expensive detector
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            registry = DetectorRegistry()
+            for detector_cls in DEFAULT_DETECTORS:
+                if detector_cls.name not in DETECTORS_DISABLED:
+                    registry.register(detector_cls())
+            cls._instance = registry
+        return cls._instance
+
+    def register(self, detector: Detector):
+        if any(existing.name == detector.name for existing in self._detectors):
+            raise ValueError(f"Detector {detector.name!r} is already registered")
+        self._detectors.append(detector)
+        if detector.expensive and self._workers > 0 and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="detector")
+        self.stats[detector.name] = {"runs": 0, "hits": 0, "errors": 0, "last_ms": None, "total_ms": 0.0}
+
+    def unregister(self, name: str):
+        self._detectors = [detector for detector in self._detectors if detector.name != name]
+        self.stats.pop(name, None)
+
+    @property
+    def detectors(self) -> List[Detector]:
+        return list(self._detectors)
+
+    def _run(self, detector: Detector, snapshot: Dict[str, Any]):
+        started = time.perf_counter()
+        try:
+            return detector.detect(snapshot), None, (time.perf_counter() - started) * 1000
+        except Exception as e:
+            return None, e, (time.perf_counter() - started) * 1000
+
+    def evaluate(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Runs every detector on the snapshot. Returns the union of their
+        signals (in SIGNAL_ORDER), affected services (in registration
+        order, first occurrence wins) and, per signal, the windows that
+        fired it.
+        """
+        detectors = self._detectors
+        futures = {}
+        if self._executor is not None:
+            for detector in detectors:
+                if detector.expensive:
+                    futures[detector.name] = self._executor.submit(self._run, detector, snapshot)
+        outcomes = {
+            detector.name: futures[detector.name].result() if detector.name in futures else self._run(detector, snapshot)
+            for detector in detectors
+        }
+
+        signal_windows: Dict[str, set] = {}
+        affected_services = []
+        with self._lock:
+            for detector in detectors:
+                result, error, elapsed_ms = outcomes[detector.name]
+                stats = self.stats[detector.name]
+                stats["runs"] += 1
+                stats["last_ms"] = elapsed_ms
+                stats["total_ms"] += elapsed_ms
+                if error is not None:
+                    stats["errors"] += 1
+                    print(f"Detector {detector.name} failed: {error}")
+                    continue
+                if result["signals"] or result["affected_services"]:
+                    stats["hits"] += 1
+                explicit = result.get("windows", {})
+                for signal in result["signals"]:
+                    signal_windows.setdefault(signal, set()).update(explicit.get(signal, [detector.window]))
+                for svc in result["affected_services"]:
+                    if svc not in affected_services:
+                        affected_services.append(svc)
+            update_state(detector_stats={name: dict(stats) for name, stats in self.stats.items()})
+
+        ordered = [signal for signal in SIGNAL_ORDER if signal in signal_windows]
+        ordered += sorted(set(signal_windows) - set(SIGNAL_ORDER))
+        rank = {window["name"]: i for i, window in enumerate(DETECTION_WINDOWS)}
+        return {
+            "signals": ordered,
+            "affected_services": affected_services,
+            "signal_windows": {
+                signal: sorted(signal_windows[signal], key=lambda name: rank.get(name, len(rank)))
+                for signal in ordered
+            },
+        }
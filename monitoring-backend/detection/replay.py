@@ -0,0 +1,448 @@
+"""
+Offline replay of stored logs through detection and incident correlation.
+
+Historical rows (from a logs database or an exported NDJSON / JSON file)
+are fed to the same in-memory sources the LogWriter feeds live, and
+detect_anomaly + incident updates run every tick_seconds of simulated
+time (detection.clock), as fast as the CPU allows. The requested span
+is split into independent ranges replayed in parallel processes; each
+range starts with warmup_seconds of history so its windows and
+baselines are populated before the first tick counts.
+
+Each worker points the app's own storage (DATABASE_URL) at a scratch
+SQLite file before importing it, so learned baselines and incidents of a
+replay never touch the live database or the incident vector memory.
+Storage modules are therefore imported inside functions here.
+"""
+
+import bisect
+import contextlib
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from detection import clock
+
+REPLAY_TICK_SECONDS = float(os.getenv("REPLAY_TICK_SECONDS", os.getenv("DETECTION_INTERVAL_SECONDS", "5")))
+# History fed before a range's first tick (the detector looks 10 minutes back)
+REPLAY_WARMUP_SECONDS = int(os.getenv("REPLAY_WARMUP_SECONDS", "660"))
+# Source rows are read this many seconds at a time
+REPLAY_FETCH_SECONDS = int(os.getenv("REPLAY_FETCH_SECONDS", "60"))
+
+US_PER_SECOND = 1_000_000
+
+def _iso(ts_us: Optional[int]) -> Optional[str]:
+    if ts_us is None:
+        return None
+    return datetime.fromtimestamp(ts_us / US_PER_SECOND, tz=timezone.utc).isoformat()
+
+def _is_file_source(source: str) -> bool:
+    return "://" not in source
+
+# --- Sources -----------------------------------------------------------------
+
+def _iter_file_rows(path: str) -> Iterator[dict]:
+    """
+    Storage rows from an export, in file order: NDJSON (read line by line)
+    or a JSON array of ingest-format log entries.
+    """
+    from pydantic import ValidationError
+    from schemas.log_schema import LogEntry
+    from storage.timestamps import parse_timestamp_us
+
+    with open(path) as f:
+        head = f.read(4096).lstrip()
+        f.seek(0)
+        if head.startswith("["):
+            entries = iter(json.load(f))
+        else:
+            entries = (json.loads(line) for line in f if line.strip())
+        for index, entry in enumerate(entries):
+            try:
+                row = LogEntry(**entry).dict()
+                row["ts_us"] = parse_timestamp_us(row["timestamp"])
+            except (ValidationError, ValueError) as e:
+                raise ValueError(f"{path}: entry {index} is not a valid log: {e}")
+            yield row
+
+def source_time_range(source: str) -> Optional[tuple]:
+    """(oldest ts_us, newest ts_us) of a source, or None if it holds no logs."""
+    if _is_file_source(source):
+        # One pass without keeping the rows; the workers load their own
+        oldest = newest = None
+        for row in _iter_file_rows(source):
+            oldest = row["ts_us"] if oldest is None else min(oldest, row["ts_us"])
+            newest = row["ts_us"] if newest is None else max(newest, row["ts_us"])
+        return (oldest, newest) if oldest is not None else None
+
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+    from storage.database import create_storage_engine
+    from storage.partitions import list_partitions, partition_table
+
+    engine = create_storage_engine(source)
+    try:
+        with Session(engine) as db:
+            oldest = newest = None
+            for name in list_partitions(db):
+                table = partition_table(name)
+                low, high = db.execute(select(func.min(table.c.ts_us), func.max(table.c.ts_us))).one()
+                if low is not None:
+                    oldest = low if oldest is None else min(oldest, low)
+                    newest = high if newest is None else max(newest, high)
+            return (oldest, newest) if oldest is not None else None
+    finally:
+        engine.dispose()
+
+def _iter_chunks(source: str, start_us: int, end_us: int) -> Iterator[List[dict]]:
+    """Rows with start_us <= ts_us < end_us, oldest first, REPLAY_FETCH_SECONDS at a time."""
+    step_us = REPLAY_FETCH_SECONDS * US_PER_SECOND
+    if _is_file_source(source):
+        rows = [row for row in _iter_file_rows(source) if start_us <= row["ts_us"] < end_us]
+        rows.sort(key=lambda row: row["ts_us"])
+        # One cursor through the sorted rows
+        lo = 0
+        for chunk_start in range(start_us, end_us, step_us):
+            hi = bisect.bisect_left(rows, min(chunk_start + step_us, end_us), lo, key=lambda row: row["ts_us"])
+            yield rows[lo:hi]
+            lo = hi
+        return
+
+    from sqlalchemy.orm import Session
+    from storage.database import create_storage_engine
+    from storage.log_repository import get_logs_between
+
+    engine = create_storage_engine(source)
+    try:
+        with Session(engine) as db:
+            for chunk_start in range(start_us, end_us, step_us):
+                yield get_logs_between(db, chunk_start, min(chunk_start + step_us, end_us))
+    finally:
+        engine.dispose()
+
+# --- One range (runs in a worker process) -------------------------------------
+
+def _replay_incident_manager():
+    from correlation.incident_manager import IncidentManager
+
+    class ReplayIncidentManager(IncidentManager):
+        """IncidentManager without vector memory or the incident store: replayed incidents are only recorded."""
+
+        def __init__(self):
+            self._init_state()
+            # Every incident opened during the replay, resolved or not
+            self.timeline: Dict[str, Any] = {}
+
+        def _find_similar(self, services, signals):
+            return []
+
+        def _store_incident(self, incident):
+            pass
+
+        def _persist(self, incident, window_signals=None):
+            pass
+
+        def _create_new_incident(self, services, signals, now, metrics=None):
+            incident = super()._create_new_incident(services, signals, now, metrics)
+            self.timeline[incident.incident_id] = incident
+            return incident
+
+    return ReplayIncidentManager()
+
+def replay_range(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replays [task["start_us"], task["end_us"]) of task["source"] with
+    ticks every task["tick_seconds"]. Returns the anomalous ticks and the
+    incidents opened in the range. Must run in a fresh process, once.
+    """
+    with tempfile.TemporaryDirectory(prefix="replay-") as scratch:
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}/replay.db"
+        quiet = open(os.devnull, "w") if not task.get("verbose") else None
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            try:
+                return _replay_range(task)
+            finally:
+                if quiet:
+                    quiet.close()
+
+def _replay_range(task: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    start_us, end_us = task["start_us"], task["end_us"]
+    tick_us = int(task["tick_seconds"] * US_PER_SECOND)
+    warmup_start_us = start_us - task["warmup_seconds"] * US_PER_SECOND
+
+    # The in-memory sources take their horizon from the clock on creation
+    clock.set_simulated_time(warmup_start_us / US_PER_SECOND)
+
+    from storage.database import Base, SessionLocal, engine
+    from storage.migrations import run_migrations
+    from detection.anomaly_detector import detect_anomaly
+    from detection.hot_buffer import HotLogBuffer
+    from detection.traffic_sketches import TrafficSketches
+    from detection.window_aggregator import SlidingWindowAggregator
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    aggregator = SlidingWindowAggregator.get_instance()
+    aggregator.rebuild(db)
+    listeners = [aggregator.add_rows, HotLogBuffer.get_instance().add_rows, TrafficSketches.get_instance().add_rows]
+    manager = _replay_incident_manager()
+
+    def feed(rows: List[dict]):
+        for listener in listeners:
+            listener(rows)
+
+    chunks = _iter_chunks(task["source"], warmup_start_us, end_us)
+    pending: List[dict] = []
+    rows_replayed = ticks = 0
+    anomalous_ticks = []
+
+    try:
+        tick_at = start_us + tick_us
+        cursor_us = warmup_start_us
+        while tick_at <= end_us:
+            # Feed everything before this tick, advancing the clock with the rows
+            while True:
+                due = [row for row in pending if row["ts_us"] < tick_at]
+                if due:
+                    pending = pending[len(due):]
+                    clock.set_simulated_time(max(clock.now(), due[-1]["ts_us"] / US_PER_SECOND))
+                    feed(due)
+                    # Warm-up rows are counted by the range before this one
+                    rows_replayed += sum(1 for row in due if row["ts_us"] >= start_us)
+                if pending or cursor_us >= tick_at:
+                    break
+                chunk = next(chunks, None)
+                cursor_us += REPLAY_FETCH_SECONDS * US_PER_SECOND
+                if chunk is None:
+                    cursor_us = end_us
+                    break
+                pending = chunk
+
+            clock.set_simulated_time(tick_at / US_PER_SECOND)
+            now = datetime.fromtimestamp(tick_at / US_PER_SECOND, tz=timezone.utc)
+            result = detect_anomaly(db)
+            incidents = manager.update(anomaly_result=result, affected_services=result.get("affected_services", []), now=now)
+            ticks += 1
+            if result["anomaly"]:
+                anomalous_ticks.append({
+                    "ts_us": tick_at,
+                    "signals": result["signals"],
+                    "signal_windows": result.get("signal_windows", {}),
+                    "affected_services": result["affected_services"],
+                    "incident_ids": [incident.incident_id for incident in incidents],
+                })
+            tick_at += tick_us
+    finally:
+        db.close()
+        engine.dispose()
+        clock.set_simulated_time(None)
+
+    incidents = [
+        {
+            "incident_id": incident.incident_id,
+            "started_us": int(incident.started_at.timestamp() * US_PER_SECOND),
+            "last_seen_us": int(incident.last_seen_at.timestamp() * US_PER_SECOND),
+            "resolved_us": int(incident.resolved_at.timestamp() * US_PER_SECOND) if incident.resolved_at else None,
+            "services": sorted(incident.services),
+            "signals": sorted(incident.signals),
+            "severity": incident.severity,
+            "window_count": incident.window_count,
+        }
+        for incident in manager.timeline.values()
+    ]
+    return {
+        "start_us": start_us,
+        "end_us": end_us,
+        "rows": rows_replayed,
+        "ticks": ticks,
+        "anomalous_ticks": anomalous_ticks,
+        "incidents": incidents,
+        "wall_seconds": time.perf_counter() - started,
+    }
+
+# --- Whole replay ---------------------------------------------------------------
+
+def _stitch(ranges: List[Dict[str, Any]], tick_us: int, timeout_s: float) -> List[Dict[str, Any]]:
+    """
+    Joins incidents cut by a range boundary with their continuation in
+    the next range: an incident opened on a range's first tick continues
+    the still-open incident of the range before that shares most of its
+    services. (The next range starts with no open incidents, so
+    concurrent incidents spanning a boundary can come back as one.)
+    """
+    incidents = []
+    open_at_boundary: List[dict] = []
+    for replayed in ranges:
+        for incident in sorted(replayed["incidents"], key=lambda i: i["started_us"]):
+            target = None
+            if incident["started_us"] <= replayed["start_us"] + tick_us:
+                services = set(incident["services"])
+                overlapping = [
+                    candidate for candidate in open_at_boundary
+                    if services & set(candidate["services"]) or not (services or candidate["services"])
+                ]
+                if overlapping:
+                    target = max(overlapping, key=lambda candidate: len(services & set(candidate["services"])))
+            if target is not None:
+                target["last_seen_us"] = incident["last_seen_us"]
+                target["resolved_us"] = incident["resolved_us"]
+                target["services"] = sorted(set(target["services"]) | set(incident["services"]))
+                target["signals"] = sorted(set(target["signals"]) | set(incident["signals"]))
+                target["window_count"] += incident["window_count"]
+                target.setdefault("merged_ids", []).append(incident["incident_id"])
+            else:
+                incidents.append(dict(incident))
+        open_at_boundary = [
+            incident for incident in incidents
+            if incident["resolved_us"] is None
+            and replayed["end_us"] - incident["last_seen_us"] <= timeout_s * US_PER_SECOND
+        ]
+    return incidents
+
+def load_labels(path: str) -> List[Dict[str, Any]]:
+    """
+    Labelled scenario periods: a JSON list of {"scenario", "start", "end"}
+    with ISO-8601 times and an optional "services" list the detection
+    must name.
+    """
+    from storage.timestamps import parse_timestamp_us
+
+    with open(path) as f:
+        labels = json.load(f)
+    for label in labels:
+        label["start_us"] = parse_timestamp_us(label["start"])
+        label["end_us"] = parse_timestamp_us(label["end"])
+    return labels
+
+def score(incidents: List[dict], anomalous_ticks: List[dict], labels: List[dict], grace_us: int) -> Dict[str, Any]:
+    """
+    Precision: share of incidents overlapping a labelled period (extended
+    by grace_us). Recall: share of periods with an anomalous tick naming
+    one of the label's services (any service if it names none).
+    Latency: period start to that first tick.
+    """
+    def in_label(label, start_us, end_us):
+        return start_us <= label["end_us"] + grace_us and end_us >= label["start_us"]
+
+    true_incidents = sum(
+        1 for incident in incidents
+        if any(in_label(label, incident["started_us"], incident["last_seen_us"]) for label in labels)
+    )
+    false_positive_ticks = sum(
+        1 for tick in anomalous_ticks
+        if not any(in_label(label, tick["ts_us"], tick["ts_us"]) for label in labels)
+    )
+
+    per_label = []
+    latencies = []
+    for label in labels:
+        services = set(label.get("services") or [])
+        first = next((
+            tick for tick in anomalous_ticks
+            if label["start_us"] <= tick["ts_us"] <= label["end_us"] + grace_us
+            and (not services or services & set(tick["affected_services"]))
+        ), None)
+        latency = (first["ts_us"] - label["start_us"]) / US_PER_SECOND if first else None
+        if latency is not None:
+            latencies.append(latency)
+        per_label.append({
+            "scenario": label.get("scenario"),
+            "start": label["start"],
+            "end": label["end"],
+            "detected": first is not None,
+            "latency_seconds": latency,
+            "incidents": [
+                incident["incident_id"] for incident in incidents
+                if in_label(label, incident["started_us"], incident["last_seen_us"])
+            ],
+        })
+
+    ordered = sorted(latencies)
+    return {
+        "labels": per_label,
+        "precision": true_incidents / len(incidents) if incidents else None,
+        "recall": len(latencies) / len(labels) if labels else None,
+        "false_positive_ticks": false_positive_ticks,
+        "latency_seconds": {
+            "mean": statistics.mean(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "max": ordered[-1],
+        } if ordered else None,
+    }
+
+def replay(source: str, start_us: Optional[int] = None, end_us: Optional[int] = None,
+           labels: Optional[List[dict]] = None, workers: int = 1,
+           tick_seconds: float = REPLAY_TICK_SECONDS, warmup_seconds: int = REPLAY_WARMUP_SECONDS,
+           verbose: bool = False) -> Dict[str, Any]:
+    """
+    Replays [start_us, end_us) of a source (database URL or export file;
+    defaults to everything it holds) over `workers` processes and returns
+    the incident timeline, replay speed and, given labels, detection
+    precision / recall / latency.
+    """
+    from correlation.incident_rules import INCIDENT_RESOLUTION_TIMEOUT
+
+    if start_us is None or end_us is None:
+        bounds = source_time_range(source)
+        if bounds is None:
+            raise ValueError(f"No logs in {source}")
+        start_us = bounds[0] + warmup_seconds * US_PER_SECOND if start_us is None else start_us
+        end_us = bounds[1] + 1 if end_us is None else end_us
+    tick_us = int(tick_seconds * US_PER_SECOND)
+    span_ticks = max(1, (end_us - start_us) // tick_us)
+    workers = max(1, min(workers, span_ticks))
+
+    # Equal ranges on tick boundaries; each one replays its own warm-up
+    edges = [start_us + (span_ticks * i // workers) * tick_us for i in range(workers)] + [start_us + span_ticks * tick_us]
+    tasks = [
+        {"source": source, "start_us": lo, "end_us": hi, "tick_seconds": tick_seconds,
+         "warmup_seconds": warmup_seconds, "verbose": verbose}
+        for lo, hi in zip(edges, edges[1:])
+    ]
+
+    started = time.perf_counter()
+    # A fresh spawned process per range: storage binds to its scratch DB on import
+    # and the detection singletons start empty
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             max_tasks_per_child=1) as pool:
+        ranges = list(pool.map(replay_range, tasks))
+    wall_seconds = time.perf_counter() - started
+
+    incidents = _stitch(ranges, tick_us, INCIDENT_RESOLUTION_TIMEOUT)
+    anomalous_ticks = [tick for replayed in ranges for tick in replayed["anomalous_ticks"]]
+    simulated_seconds = (edges[-1] - start_us) / US_PER_SECOND
+    report = {
+        "source": source,
+        "start": _iso(start_us),
+        "end": _iso(edges[-1]),
+        "workers": workers,
+        "tick_seconds": tick_seconds,
+        "warmup_seconds": warmup_seconds,
+        "rows": sum(replayed["rows"] for replayed in ranges),
+        "ticks": sum(replayed["ticks"] for replayed in ranges),
+        "anomalous_ticks": len(anomalous_ticks),
+        "simulated_seconds": simulated_seconds,
+        "wall_seconds": wall_seconds,
+        "speedup": simulated_seconds / wall_seconds if wall_seconds else None,
+        "incidents": [
+            {
+                **{key: value for key, value in incident.items() if not key.endswith("_us")},
+                "started_at": _iso(incident["started_us"]),
+                "last_seen_at": _iso(incident["last_seen_us"]),
+                "resolved_at": _iso(incident["resolved_us"]),
+            }
+            for incident in incidents
+        ],
+    }
+    if labels is not None:
+        report.update(score(incidents, anomalous_ticks, labels, grace_us=int(INCIDENT_RESOLUTION_TIMEOUT * US_PER_SECOND)))
+    return report
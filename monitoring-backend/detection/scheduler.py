@@ -0,0 +1,100 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from debug.pipeline_state import update_state
+
+# Periodic sweep (also drives incident resolution when nothing triggers)
+DETECTION_INTERVAL_SECONDS = float(os.getenv("DETECTION_INTERVAL_SECONDS", "5"))
+# Debounce: triggered runs are coalesced to at most this many per second
+DETECTION_MAX_PER_SECOND = float(os.getenv("DETECTION_MAX_PER_SECOND", "2"))
+DETECTION_ERROR_BACKOFF_SECONDS = float(os.getenv("DETECTION_ERROR_BACKOFF_SECONDS", "5"))
+
+class DetectionScheduler:
+    """
+    Runs a detection tick every DETECTION_INTERVAL_SECONDS, or earlier when
+    request() is called (e.g. by DetectionTrigger from the writer thread).
+
+    Requests arriving while a run is pending or within the debounce gap
+    are coalesced into one run, so no more than DETECTION_MAX_PER_SECOND
+    ticks happen per second however often the ingest path asks.
+
+    Ticks are synchronous (SQL, aggregation, incident updates that may
+    embed text and write FAISS files), so they run on a dedicated
+    single-thread executor: the event loop only awaits them, and ticks
+    never overlap. Each tick's return value is handed back on the loop
+    as last_result and to on_result.
+    """
+
+    def __init__(self, run_tick: Callable[[str], Any],
+                 interval_seconds: float = DETECTION_INTERVAL_SECONDS,
+                 max_per_second: float = DETECTION_MAX_PER_SECOND,
+                 error_backoff_seconds: float = DETECTION_ERROR_BACKOFF_SECONDS,
+                 on_result: Optional[Callable[[Any], None]] = None):
+        self.run_tick = run_tick
+        self.on_result = on_result
+        self.last_result: Any = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detection")
+        self.interval_seconds = interval_seconds
+        self.min_gap_seconds = 1.0 / max_per_second
+        self.error_backoff_seconds = error_backoff_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+        self._pending_reason: Optional[str] = None
+        self.runs_total = 0
+        self.requests_total = 0
+
+    def request(self, reason: str):
+        """Asks for an early run. Safe to call from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake, reason)
+
+    def _wake(self, reason: str):
+        self.requests_total += 1
+        if self._pending_reason is None:
+            self._pending_reason = reason
+        self._event.set()
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        last_run = 0.0
+        print("Starting background anomaly detection loop...")
+        while True:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+            # Debounce: requests that arrive meanwhile join this run
+            gap = last_run + self.min_gap_seconds - time.monotonic()
+            if gap > 0:
+                await asyncio.sleep(gap)
+            reason = self._pending_reason or "periodic"
+            self._pending_reason = None
+            self._event.clear()
+
+            last_run = time.monotonic()
+            self.runs_total += 1
+            try:
+                result = await self._loop.run_in_executor(self._executor, self.run_tick, reason)
+                self.last_result = result
+                if self.on_result is not None:
+                    self.on_result(result)
+                update_state(
+                    detection_runs_total=self.runs_total,
+                    detection_requests_total=self.requests_total,
+                    last_detection_reason=reason,
+                    last_detection_tick_ms=(time.monotonic() - last_run) * 1000,
+                )
+            except Exception as e:
+                print(f"Error in detection loop: {e}")
+                update_state(last_error=f"detection failed: {e}")
+                # Don't crash the loop
+                await asyncio.sleep(self.error_backoff_seconds)
+
+    def shutdown(self):
+        """Waits for a running tick to finish."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,195 @@
+import hashlib
+import heapq
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Relative accuracy of latency quantiles (0.01 = reported value within 1% of the true one)
+LATENCY_SKETCH_ACCURACY = float(os.getenv("LATENCY_SKETCH_ACCURACY", "0.01"))
+
+class DDSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees (DDSketch,
+    Masson et al. 2019).
+
+    Values are counted in logarithmic bins of ratio gamma = (1+a)/(1-a), so
+    any quantile is answered within a relative error of a without keeping
+    the values themselves. Two sketches with the same accuracy merge by
+    adding bin counts, which is what lets per-second sketches be combined
+    into arbitrary windows.
+    """
+    # Values at or below this are counted as zero (latencies are >= 0)
+    MIN_VALUE = 1e-9
+
+    __slots__ = ("accuracy", "gamma", "_log_gamma", "bins", "zero_count", "count")
+
+    def __init__(self, accuracy: float = LATENCY_SKETCH_ACCURACY):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, weight: int = 1):
+        if value <= self.MIN_VALUE:
+            self.zero_count += weight
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + weight
+        self.count += weight
+
+    def merge(self, other: "DDSketch"):
+        if other.accuracy != self.accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, weight in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + weight
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q in [0, 1], or None for an empty sketch."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Bin midpoint (in relative terms) of (gamma^(i-1), gamma^i]
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[float, Optional[float]]:
+        return {q: self.quantile(q) for q in qs}
+
+def merge_sketches(sketches: Iterable[DDSketch]) -> DDSketch:
+    merged = DDSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+_MASK64 = (1 << 64) - 1
+
+def _hash64(value) -> int:
+    """
+    Stable 64-bit hash of the value's str(). hash() of str is salted per
+    process, which would make sketches disagree across restarts and
+    replay worker processes.
+    """
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "little")
+
+class SpaceSaving:
+    """
+    Top-k heavy hitters in bounded memory (Space-Saving, Metwally et al. 2005).
+
+    At most `capacity` counters are kept. An unseen item evicts the smallest
+    counter and inherits its count, recorded as the item's error, so a
+    reported count overestimates the true one by at most its error. Every
+    item more frequent than total / capacity is guaranteed to be kept.
+    Summaries merge by adding counters and keeping the largest `capacity`
+    (Agarwal et al. 2012), which is how per-second summaries become windows.
+    """
+    __slots__ = ("capacity", "counts", "errors", "total")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+        self.errors: Dict[Any, int] = {}
+        self.total = 0
+
+    def add(self, item, weight: int = 1):
+        self.total += weight
+        counts = self.counts
+        if item in counts:
+            counts[item] += weight
+        elif len(counts) < self.capacity:
+            counts[item] = weight
+            self.errors[item] = 0
+        else:
+            victim = min(counts, key=counts.get)
+            floor = counts.pop(victim)
+            del self.errors[victim]
+            counts[item] = floor + weight
+            self.errors[item] = floor
+
+    def merge(self, other: "SpaceSaving"):
+        counts, errors = self.counts, self.errors
+        for item, count in other.counts.items():
+            counts[item] = counts.get(item, 0) + count
+            errors[item] = errors.get(item, 0) + other.errors[item]
+        self.total += other.total
+        self._truncate()
+
+    def update(self, weights: Dict[Any, int]):
+        """Adds exact counts of many items at once (e.g. a Counter of one batch), merged as an exact summary."""
+        counts, errors = self.counts, self.errors
+        for item, count in weights.items():
+            if item in counts:
+                counts[item] += count
+            else:
+                counts[item] = count
+                errors[item] = 0
+            self.total += count
+        self._truncate()
+
+    def _truncate(self):
+        counts, errors = self.counts, self.errors
+        if len(counts) > self.capacity:
+            keep = heapq.nlargest(self.capacity, counts.items(), key=lambda entry: entry[1])
+            self.counts = dict(keep)
+            self.errors = {item: errors[item] for item in self.counts}
+
+    def top(self, k: int) -> List[Tuple[Any, int, int]]:
+        """The k largest (item, count, error), largest first."""
+        return heapq.nlargest(k, ((item, count, self.errors[item]) for item, count in self.counts.items()),
+                              key=lambda entry: entry[1])
+
+class HyperLogLog:
+    """
+    Distinct count estimate in 2^precision bytes (HyperLogLog, Flajolet et
+    al. 2007, with linear counting for small cardinalities). The standard
+    error is about 1.04 / sqrt(2^precision). Sketches of the same precision
+    merge by taking the register-wise max.
+    """
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 10):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item):
+        h = _hash64(item)
+        index = h >> (64 - self.precision)
+        rest = (h << self.precision) & _MASK64
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        merged = np.maximum(np.frombuffer(self.registers, dtype=np.uint8), np.frombuffer(other.registers, dtype=np.uint8))
+        self.registers = bytearray(merged.tobytes())
+
+    def count(self) -> int:
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+def merge_hyperloglogs(sketches: Iterable[HyperLogLog], precision: int) -> HyperLogLog:
+    """Register-wise max over many sketches in one NumPy pass."""
+    merged = HyperLogLog(precision)
+    stacked = [np.frombuffer(sketch.registers, dtype=np.uint8) for sketch in sketches]
+    if stacked:
+        merged.registers = bytearray(np.maximum.reduce(stacked).tobytes())
+    return merged
@@ -0,0 +1,142 @@
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from detection import clock
+from detection.sketches import HyperLogLog, SpaceSaving, merge_hyperloglogs
+
+# Seconds of per-second sketches kept (the detector reads the last 60 s)
+TRAFFIC_SKETCH_SECONDS = int(os.getenv("TRAFFIC_SKETCH_SECONDS", "120"))
+# Counters per Space-Saving summary: anything above 1/capacity of a dimension's rows is always kept
+TRAFFIC_TOPK_CAPACITY = int(os.getenv("TRAFFIC_TOPK_CAPACITY", "64"))
+# Entries reported per dimension
+TRAFFIC_TOPK = int(os.getenv("TRAFFIC_TOPK", "5"))
+# HyperLogLog registers = 2^precision bytes (10 -> ~3% error on distinct counts)
+TRAFFIC_HLL_PRECISION = int(os.getenv("TRAFFIC_HLL_PRECISION", "10"))
+
+US_PER_SECOND = 1_000_000
+
+def _ip_prefix(ip: str) -> Optional[str]:
+    """IPv4 /24 network of an address, e.g. 192.168.1.0/24."""
+    network, dot, _ = ip.rpartition(".")
+    if not dot or network.count(".") != 2:
+        return None
+    return f"{network}.0/24"
+
+# Dimensions sketched; all but ip_prefix are row fields
+DIMENSIONS = ("ip", "ip_prefix", "endpoint", "error_type", "status_code")
+ROW_FIELDS = ("ip", "endpoint", "error_type", "status_code")
+
+def _count_values(rows: List[dict]) -> Dict[str, Counter]:
+    """Exact per-dimension value counts of some rows (None values are not counted)."""
+    counters = {}
+    for field in ROW_FIELDS:
+        counter = Counter(row.get(field) for row in rows)
+        counter.pop(None, None)
+        counters[field] = counter
+    # Prefixes from distinct IPs, not from every row
+    prefixes = Counter()
+    for ip, count in counters["ip"].items():
+        prefix = _ip_prefix(ip)
+        if prefix is not None:
+            prefixes[prefix] += count
+    counters["ip_prefix"] = prefixes
+    return counters
+
+class _SecondSketches:
+    """Top-k and distinct-count sketches of every dimension for one second."""
+    __slots__ = ("second", "top", "distinct")
+
+    def __init__(self, second: int):
+        self.second = second
+        self.top = {name: SpaceSaving(TRAFFIC_TOPK_CAPACITY) for name in DIMENSIONS}
+        self.distinct = {name: HyperLogLog(TRAFFIC_HLL_PRECISION) for name in DIMENSIONS}
+
+class TrafficSketches:
+    """
+    Streaming traffic profile of committed logs: heavy hitters
+    (Space-Saving) and distinct counts (HyperLogLog) of client IPs, /24
+    prefixes, endpoints, error types and status codes.
+
+    Sketches are kept per second in a ring fed by the LogWriter flush
+    listener, so memory is bounded by TRAFFIC_SKETCH_SECONDS however
+    many distinct IPs an attack uses, and a window is answered by merging
+    its seconds. Each batch is counted exactly first, so a sketch sees
+    one weighted update per distinct value per second. Like the latency
+    sketches, nothing is rebuilt after a restart: the profile covers
+    seconds since the process started (complete_from).
+    """
+    _instance = None
+
+    def __init__(self, horizon_seconds: int = TRAFFIC_SKETCH_SECONDS):
+        self.horizon_seconds = horizon_seconds
+        self._slots: List[Optional[_SecondSketches]] = [None] * horizon_seconds
+        self._lock = threading.Lock()
+        self.complete_from = int(clock.now())
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = TrafficSketches()
+        return cls._instance
+
+    def _oldest_second(self) -> int:
+        return int(clock.now()) - self.horizon_seconds + 1
+
+    def add_rows(self, rows: List[dict]):
+        """Adds committed log rows (storage dicts with ts_us) to their seconds."""
+        oldest = self._oldest_second()
+        by_second: Dict[int, List[dict]] = {}
+        for row in rows:
+            second = row["ts_us"] // US_PER_SECOND
+            if second >= oldest:
+                by_second.setdefault(second, []).append(row)
+        per_second = {second: _count_values(second_rows) for second, second_rows in by_second.items()}
+
+        with self._lock:
+            for second, counters in per_second.items():
+                index = second % self.horizon_seconds
+                slot = self._slots[index]
+                if slot is None or slot.second != second:
+                    # Slot still holds an expired second: recycle it
+                    slot = self._slots[index] = _SecondSketches(second)
+                for name, counter in counters.items():
+                    slot.top[name].update(counter)
+                    distinct = slot.distinct[name]
+                    for value in counter:
+                        distinct.add(value)
+
+    def covers(self, start_us: int) -> bool:
+        """True if sketches exist for every second from start_us onwards."""
+        return -(-start_us // US_PER_SECOND) >= max(self.complete_from, self._oldest_second())
+
+    def window_profile(self, start_us: int, end_us: int, k: int = TRAFFIC_TOPK) -> Dict[str, dict]:
+        """
+        Per dimension: rows carrying a value, estimated distinct values and the
+        top k values with their count, maximum overcount and share of rows,
+        for seconds starting in [start_us, end_us).
+        """
+        first_second = -(-start_us // US_PER_SECOND)
+        last_second = -(-end_us // US_PER_SECOND) - 1
+        with self._lock:
+            slots = [
+                slot for slot in self._slots
+                if slot is not None and first_second <= slot.second <= last_second
+            ]
+            profile = {}
+            for name in DIMENSIONS:
+                top = SpaceSaving(TRAFFIC_TOPK_CAPACITY)
+                for slot in slots:
+                    top.merge(slot.top[name])
+                distinct = merge_hyperloglogs((slot.distinct[name] for slot in slots), TRAFFIC_HLL_PRECISION)
+                profile[name] = {
+                    "rows": top.total,
+                    # Never fewer than the values the counters saw
+                    "distinct": max(distinct.count(), len(top.counts)) if top.total else 0,
+                    "top": [
+                        {"value": value, "count": count, "error": error, "share": count / top.total}
+                        for value, count, error in top.top(k)
+                    ],
+                }
+        return profile
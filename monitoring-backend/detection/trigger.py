@@ -0,0 +1,107 @@
+import os
+import threading
+from typing import Callable, List, Optional
+
+from debug.pipeline_state import update_state
+from detection import clock
+
+# Pre-thresholds checked on every committed batch. They only decide when
+# to run detect_anomaly early; the detector's own rules decide anomalies.
+TRIGGER_WINDOW_SECONDS = int(os.getenv("TRIGGER_WINDOW_SECONDS", "5"))
+TRIGGER_HISTORY_SECONDS = int(os.getenv("TRIGGER_HISTORY_SECONDS", "60"))
+TRIGGER_MIN_ERRORS = int(os.getenv("TRIGGER_MIN_ERRORS", "5"))
+TRIGGER_ERROR_RATIO = float(os.getenv("TRIGGER_ERROR_RATIO", "0.05"))
+TRIGGER_RATE_FACTOR = float(os.getenv("TRIGGER_RATE_FACTOR", "3"))
+TRIGGER_MIN_ROWS = int(os.getenv("TRIGGER_MIN_ROWS", "50"))
+
+US_PER_SECOND = 1_000_000
+
+class DetectionTrigger:
+    """
+    Cheap running counters on the ingest path that request an early
+    detection run.
+
+    Per-second row and error counts are kept for the last
+    TRIGGER_HISTORY_SECONDS. After each committed batch, the most recent
+    TRIGGER_WINDOW_SECONDS are compared against the rest of the history:
+    an error burst (error ratio above TRIGGER_ERROR_RATIO and 1.5x the
+    prior ratio) or a rate jump (TRIGGER_RATE_FACTOR x the prior rate)
+    calls the registered callback with the reason.
+    """
+    _instance = None
+
+    def __init__(self, history_seconds: int = TRIGGER_HISTORY_SECONDS, window_seconds: int = TRIGGER_WINDOW_SECONDS):
+        self.history_seconds = history_seconds
+        self.window_seconds = window_seconds
+        self._seconds = [-1] * history_seconds
+        self._rows = [0] * history_seconds
+        self._errors = [0] * history_seconds
+        self._lock = threading.Lock()
+        self._callback: Optional[Callable[[str], None]] = None
+        self.fired_total = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = DetectionTrigger()
+        return cls._instance
+
+    def set_callback(self, callback: Callable[[str], None]):
+        self._callback = callback
+
+    def _slot_for(self, second: int) -> int:
+        slot = second % self.history_seconds
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._rows[slot] = 0
+            self._errors[slot] = 0
+        return slot
+
+    def observe(self, rows: List[dict]):
+        """Counts committed rows (LogWriter flush listener) and fires the callback on a pre-threshold."""
+        now_s = int(clock.now())
+        oldest = now_s - self.history_seconds + 1
+        with self._lock:
+            for row in rows:
+                second = row["ts_us"] // US_PER_SECOND
+                if second < oldest or second > now_s:
+                    continue
+                slot = self._slot_for(second)
+                self._rows[slot] += 1
+                status_code = row.get("status_code")
+                if row.get("level") == "ERROR" or (status_code is not None and status_code >= 400):
+                    self._errors[slot] += 1
+            reason = self._check(now_s)
+
+        if reason and self._callback is not None:
+            self.fired_total += 1
+            update_state(detection_triggers_total=self.fired_total, last_detection_trigger=reason)
+            self._callback(reason)
+
+    def _check(self, now_s: int) -> Optional[str]:
+        recent_rows = recent_errors = prior_rows = prior_errors = 0
+        recent_from = now_s - self.window_seconds + 1
+        for second in range(now_s - self.history_seconds + 1, now_s + 1):
+            slot = second % self.history_seconds
+            if self._seconds[slot] != second:
+                continue
+            if second >= recent_from:
+                recent_rows += self._rows[slot]
+                recent_errors += self._errors[slot]
+            else:
+                prior_rows += self._rows[slot]
+                prior_errors += self._errors[slot]
+        if not recent_rows:
+            return None
+
+        recent_ratio = recent_errors / recent_rows
+        prior_ratio = prior_errors / prior_rows if prior_rows else 0.0
+        if recent_errors >= TRIGGER_MIN_ERRORS and recent_ratio > max(TRIGGER_ERROR_RATIO, 1.5 * prior_ratio):
+            return "error_burst"
+
+        prior_seconds = self.history_seconds - self.window_seconds
+        recent_rate = recent_rows / self.window_seconds
+        prior_rate = prior_rows / prior_seconds
+        if recent_rows >= TRIGGER_MIN_ROWS and recent_rate > TRIGGER_RATE_FACTOR * max(prior_rate, 1.0):
+            return "rate_jump"
+        return None
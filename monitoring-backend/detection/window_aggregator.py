@@ -0,0 +1,344 @@
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from debug.pipeline_state import update_state
+from detection import clock
+from detection.aggregation import STAT_FIELDS
+from detection.sketches import DDSketch
+from storage.rollups import rollup_stats_by_service_minute, rollup_stats_by_service_second
+
+# Seconds of per-second buckets kept per service. Must cover the detection
+# horizon (10 minutes) with some slack for late rows.
+WINDOW_AGGREGATOR_SECONDS = int(os.getenv("WINDOW_AGGREGATOR_SECONDS", "660"))
+# Minutes of per-minute buckets kept per service, for windows longer than the
+# per-second horizon (1 h compared with the hour before it, plus slack)
+WINDOW_AGGREGATOR_MINUTES = int(os.getenv("WINDOW_AGGREGATOR_MINUTES", "125"))
+# Rows stamped further than this ahead of now (clock skew, client bugs) are
+# skipped: their bucket would recycle a live slot of the ring
+WINDOW_AGGREGATOR_FUTURE_SLACK_SECONDS = int(os.getenv("WINDOW_AGGREGATOR_FUTURE_SLACK_SECONDS", "5"))
+
+# Windows longer than this merge the latency sketches of their whole minutes
+# instead of every second, so a tick costs at most a few minutes' worth of
+# per-second merges per service however long the window is
+SKETCH_MINUTE_MERGE_SECONDS = 120
+
+US_PER_SECOND = 1_000_000
+# Sums stay floats, counters are reported as ints (like the other stats sources)
+FLOAT_FIELDS = {"latency_sum", "retry_sum"}
+
+def _ceil_second(ts_us: int) -> int:
+    return -(-ts_us // US_PER_SECOND)
+
+class _Tier:
+    """
+    Ring of `size` buckets of `width` seconds shared by every service:
+    values[service, field, slot]. A slot is recycled for all services at
+    once when time reaches it again, so summing any range of buckets for
+    every service is a single NumPy reduction.
+    """
+
+    def __init__(self, size: int, width: int):
+        self.size = size
+        self.width = width
+        # Bucket number (epoch seconds // width) each slot holds (-1 = empty)
+        self.buckets = np.full(size, -1, dtype=np.int64)
+        self.values = np.zeros((0, len(STAT_FIELDS), size))
+
+    def grow(self, services: int):
+        if services > self.values.shape[0]:
+            extra = max(services - self.values.shape[0], self.values.shape[0])
+            self.values = np.concatenate([self.values, np.zeros((extra, len(STAT_FIELDS), self.size))])
+
+    def slot_for(self, bucket: int) -> int:
+        slot = bucket % self.size
+        if self.buckets[slot] != bucket:
+            # Slot still holds an expired bucket: recycle it
+            self.buckets[slot] = bucket
+            self.values[:, :, slot] = 0
+        return slot
+
+    def columns(self, first_bucket: int, last_bucket: int) -> np.ndarray:
+        """values[service, field, i] for buckets first..last in time order (0 where not held)."""
+        wanted = np.arange(first_bucket, last_bucket + 1)
+        slots = wanted % self.size
+        return self.values[:, :, slots] * (self.buckets[slots] == wanted)
+
+class SlidingWindowAggregator:
+    """
+    Per-service counters maintained as logs are committed, kept at two
+    resolutions: per-second buckets over WINDOW_AGGREGATOR_SECONDS and
+    per-minute buckets over WINDOW_AGGREGATOR_MINUTES.
+
+    detect_anomaly reads window stats from here instead of re-aggregating
+    every log. A bucket belongs to a window if the bucket's start falls
+    inside it, so windows are resolved at one-second granularity (one
+    minute for windows beyond the per-second horizon). All services share
+    one array per resolution, so multi_window_stats answers any number of
+    windows from one cumulative sum. Both rings are rebuilt from the
+    rollup tables on startup.
+
+    Each per-second and per-minute bucket also holds a DDSketch of its
+    latencies, so window percentiles are a merge of the sketches of the
+    window's whole minutes and its remaining seconds. Rollups keep no
+    sketches; they are complete only for seconds since the process
+    started (sketches_from).
+    """
+    _instance = None
+
+    def __init__(self, horizon_seconds: int = WINDOW_AGGREGATOR_SECONDS,
+                 horizon_minutes: int = WINDOW_AGGREGATOR_MINUTES):
+        self.horizon_seconds = horizon_seconds
+        self.horizon_minutes = horizon_minutes
+        self._seconds = _Tier(horizon_seconds, 1)
+        self._minutes = _Tier(horizon_minutes, 60)
+        self._services: List[str] = []
+        self._service_index: Dict[str, int] = {}
+        # Latency sketch per service and second / minute slot (None until a latency is recorded)
+        self._sketches: List[List[Optional[DDSketch]]] = []
+        self._minute_sketches: List[List[Optional[DDSketch]]] = []
+        self._lock = threading.Lock()
+        # Epoch second / minute from which the buckets are complete (None until rebuilt)
+        self.complete_from: Optional[int] = None
+        self.minutes_complete_from: Optional[int] = None
+        self.sketches_from = int(clock.now())
+        self.future_rows_total = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = SlidingWindowAggregator()
+        return cls._instance
+
+    def _oldest_second(self) -> int:
+        return int(clock.now()) - self.horizon_seconds + 1
+
+    def _newest_second(self) -> int:
+        return int(clock.now()) + WINDOW_AGGREGATOR_FUTURE_SLACK_SECONDS
+
+    def _oldest_minute(self) -> int:
+        return int(clock.now()) // 60 - self.horizon_minutes + 1
+
+    def _index(self, service: str) -> int:
+        index = self._service_index.get(service)
+        if index is None:
+            index = self._service_index[service] = len(self._services)
+            self._services.append(service)
+            self._sketches.append([None] * self.horizon_seconds)
+            self._minute_sketches.append([None] * self.horizon_minutes)
+            self._seconds.grow(len(self._services))
+            self._minutes.grow(len(self._services))
+        return index
+
+    def _second_slot(self, second: int) -> int:
+        if self._seconds.buckets[second % self.horizon_seconds] != second:
+            for sketches in self._sketches:
+                sketches[second % self.horizon_seconds] = None
+        return self._seconds.slot_for(second)
+
+    def _minute_slot(self, minute: int) -> int:
+        if self._minutes.buckets[minute % self.horizon_minutes] != minute:
+            for sketches in self._minute_sketches:
+                sketches[minute % self.horizon_minutes] = None
+        return self._minutes.slot_for(minute)
+
+    def add_rows(self, rows: List[dict]):
+        """Adds committed log rows (storage dicts with ts_us) to their buckets."""
+        oldest = self._oldest_second()
+        newest = self._newest_second()
+        future = 0
+        # Sum the batch per (service, second) first; the arrays are touched once per
+        # bucket. sums[] follows STAT_FIELDS.
+        buckets: Dict[tuple, list] = {}
+        latencies: Dict[tuple, list] = {}
+        for row in rows:
+            second = row["ts_us"] // US_PER_SECOND
+            if second < oldest:
+                continue
+            if second > newest:
+                future += 1
+                continue
+            key = (row["service"], second)
+            sums = buckets.get(key)
+            if sums is None:
+                sums = buckets[key] = [0] * len(STAT_FIELDS)
+
+            status_code = row.get("status_code")
+            is_level_error = row.get("level") == "ERROR"
+            sums[0] += 1
+            if is_level_error or (status_code is not None and status_code >= 400):
+                sums[1] += 1
+            if is_level_error:
+                sums[2] += 1
+            if row.get("latency_ms") is not None:
+                sums[3] += row["latency_ms"]
+                sums[4] += 1
+                latencies.setdefault(key, []).append(row["latency_ms"])
+            if row.get("retry_count") is not None:
+                sums[5] += row["retry_count"]
+                sums[6] += 1
+
+        # One sketch per (service, second) of the batch, merged into both tiers
+        batch_sketches: Dict[tuple, DDSketch] = {}
+        for key, values in latencies.items():
+            sketch = batch_sketches[key] = DDSketch()
+            for latency in values:
+                sketch.add(latency)
+
+        with self._lock:
+            for (service, second), sums in buckets.items():
+                index = self._index(service)
+                slot = self._second_slot(second)
+                minute_slot = self._minute_slot(second // 60)
+                self._seconds.values[index, :, slot] += sums
+                self._minutes.values[index, :, minute_slot] += sums
+                batch = batch_sketches.get((service, second))
+                if batch is None:
+                    continue
+                for sketches, sketch_slot in ((self._sketches[index], slot), (self._minute_sketches[index], minute_slot)):
+                    if sketches[sketch_slot] is None:
+                        sketches[sketch_slot] = DDSketch()
+                    sketches[sketch_slot].merge(batch)
+
+        if future:
+            self.future_rows_total += future
+            update_state(aggregator_future_rows_total=self.future_rows_total)
+            print(f"[AGGREGATOR] Skipped {future} rows stamped more than "
+                  f"{WINDOW_AGGREGATOR_FUTURE_SLACK_SECONDS}s in the future")
+
+    def rebuild(self, db: Session):
+        """Reloads both horizons from the rollup tables."""
+        oldest = self._oldest_second()
+        oldest_minute = self._oldest_minute()
+        # Future buckets in the rollups are left out, as in add_rows
+        newest = self._newest_second()
+        seconds = rollup_stats_by_service_second(db, oldest, newest + 1)
+        minutes = rollup_stats_by_service_minute(db, oldest_minute * 60, (newest // 60 + 1) * 60)
+        with self._lock:
+            self._seconds = _Tier(self.horizon_seconds, 1)
+            self._minutes = _Tier(self.horizon_minutes, 60)
+            self._services = []
+            self._service_index = {}
+            # Dropped rings took their sketches with them
+            self._sketches = []
+            self._minute_sketches = []
+            self.sketches_from = max(self.sketches_from, int(clock.now()))
+            for tier, rows, key in ((self._seconds, seconds, "second"), (self._minutes, minutes, "minute")):
+                for bucket in rows:
+                    index = self._index(bucket["service"])
+                    slot = tier.slot_for(bucket[key] // tier.width)
+                    tier.values[index, :, slot] = [bucket[field] or 0 for field in STAT_FIELDS]
+            self.complete_from = oldest
+            self.minutes_complete_from = oldest_minute
+        print(f"Window aggregator rebuilt: {len(seconds)} second and {len(minutes)} minute buckets "
+              f"across {len(self._services)} services")
+
+    def _per_service(self, sums: np.ndarray) -> Dict[str, Dict[str, float]]:
+        """{service: stats} from a [service, field] array, services without rows left out."""
+        per_service = {}
+        for index in np.flatnonzero(sums[:, 0]):
+            per_service[self._services[index]] = {
+                field: float(sums[index, i]) if field in FLOAT_FIELDS else int(sums[index, i])
+                for i, field in enumerate(STAT_FIELDS)
+            }
+        return per_service
+
+    def covers(self, start_us: int) -> bool:
+        """True if every per-second bucket from start_us onwards is held in memory."""
+        if self.complete_from is None:
+            return False
+        return _ceil_second(start_us) >= max(self.complete_from, self._oldest_second())
+
+    def covers_minutes(self, start_s: int) -> bool:
+        """True if every per-minute bucket from the minute of start_s onwards is held in memory."""
+        if self.minutes_complete_from is None:
+            return False
+        return start_s // 60 >= max(self.minutes_complete_from, self._oldest_minute())
+
+    def window_stats(self, start_us: int, end_us: int) -> Dict[str, Dict[str, float]]:
+        """Per-service stats for buckets starting in [start_us, end_us)."""
+        with self._lock:
+            sums = self._seconds.columns(_ceil_second(start_us), _ceil_second(end_us) - 1).sum(axis=2)
+            return self._per_service(sums)
+
+    def multi_window_stats(self, now_us: int, windows: Sequence[dict]) -> Dict[str, Optional[dict]]:
+        """
+        Stats of several windows ending at now_us, each with the reference
+        window just before it: {name: {"current": per_service, "reference":
+        per_service}}, or None for a window the buckets do not cover.
+
+        windows are dicts with name, seconds and reference_seconds. Windows
+        whose span fits the per-second horizon are resolved in seconds, the
+        others in whole minutes (the current minute counting as the newest).
+        One cumulative sum per resolution serves every window, so each window
+        costs two array subtractions.
+        """
+        end_second = _ceil_second(now_us)
+        results = {}
+        with self._lock:
+            by_tier = {}
+            for window in windows:
+                span = window["seconds"] + window["reference_seconds"]
+                if span <= self.horizon_seconds:
+                    covered = self.covers((end_second - span) * US_PER_SECOND)
+                    tier, end_bucket, width = self._seconds, end_second, 1
+                else:
+                    tier, end_bucket, width = self._minutes, (end_second - 1) // 60 + 1, 60
+                    covered = self.covers_minutes((end_bucket - span // 60) * 60)
+                if not covered:
+                    results[window["name"]] = None
+                    continue
+                by_tier.setdefault(id(tier), (tier, end_bucket, width, []))[3].append(window)
+
+            for tier, end_bucket, width, tier_windows in by_tier.values():
+                span = max((w["seconds"] + w["reference_seconds"]) // width for w in tier_windows)
+                columns = tier.columns(end_bucket - span, end_bucket - 1)
+                # cumulative[..., i] = sum of the first i buckets of the span
+                cumulative = np.concatenate([np.zeros(columns.shape[:2] + (1,)), np.cumsum(columns, axis=2)], axis=2)
+                for window in tier_windows:
+                    current_from = span - window["seconds"] // width
+                    reference_from = current_from - window["reference_seconds"] // width
+                    results[window["name"]] = {
+                        "current": self._per_service(cumulative[:, :, span] - cumulative[:, :, current_from]),
+                        "reference": self._per_service(cumulative[:, :, current_from] - cumulative[:, :, reference_from]),
+                    }
+        return results
+
+    def sketches_cover(self, start_us: int) -> bool:
+        """True if latency sketches exist for every second from start_us onwards."""
+        return _ceil_second(start_us) >= max(self.sketches_from, self._oldest_second())
+
+    def window_latency_sketches(self, start_us: int, end_us: int) -> Dict[str, DDSketch]:
+        """
+        Per-service latency sketches merged over buckets starting in
+        [start_us, end_us). Windows over SKETCH_MINUTE_MERGE_SECONDS merge
+        the sketches of their whole minutes plus the seconds at either end.
+        """
+        first_second = _ceil_second(start_us)
+        last_second = _ceil_second(end_us) - 1
+        seconds = range(first_second, last_second + 1)
+        minutes = range(0)
+        if len(seconds) > SKETCH_MINUTE_MERGE_SECONDS:
+            minutes = range(-(-first_second // 60), (last_second + 1) // 60)
+            if minutes:
+                seconds = [*range(first_second, minutes[0] * 60), *range(minutes[-1] * 60 + 60, last_second + 1)]
+        per_service = {}
+        with self._lock:
+            held = [
+                (self._sketches, second % self.horizon_seconds) for second in seconds
+                if self._seconds.buckets[second % self.horizon_seconds] == second
+            ] + [
+                (self._minute_sketches, minute % self.horizon_minutes) for minute in minutes
+                if self._minutes.buckets[minute % self.horizon_minutes] == minute
+            ]
+            for index, service in enumerate(self._services):
+                sketch = DDSketch()
+                for tier, slot in held:
+                    if tier[index][slot] is not None:
+                        sketch.merge(tier[index][slot])
+                if sketch.count:
+                    per_service[service] = sketch
+        return per_service
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from ingestion.writer import LogWriter
+from debug.pipeline_state import update_state
+
+# Pending (queued, not yet flushed) rows above which ingest starts shedding
+INGEST_HIGH_WATER_MARK = int(os.getenv("INGEST_HIGH_WATER_MARK", "20000"))
+# Extra room above the high-water mark reserved for priority levels
+INGEST_PRIORITY_HEADROOM = int(os.getenv("INGEST_PRIORITY_HEADROOM", "10000"))
+# Comma-separated levels admitted into the headroom (empty disables priority)
+INGEST_PRIORITY_LEVELS = [
+    level.strip().upper() for level in os.getenv("INGEST_PRIORITY_LEVELS", "ERROR").split(",") if level.strip()
+]
+INGEST_RETRY_AFTER_SECONDS = int(os.getenv("INGEST_RETRY_AFTER_SECONDS", "1"))
+
+# Per-second shed history kept for the detector (covers the baseline window)
+SHED_HISTORY_SECONDS = 900
+
+class AdmissionController:
+    """
+    Admission control in front of the ingest writer.
+
+    Rows are admitted while the writer's pending depth is under the
+    high-water mark. Above it only priority levels (ERROR by default) are
+    admitted, up to the priority headroom; everything else is shed and
+    counted per service and per second so the detector can account for it.
+    """
+    _instance = None
+
+    def __init__(self, writer: LogWriter = None,
+                 high_water_mark: int = INGEST_HIGH_WATER_MARK,
+                 priority_headroom: int = INGEST_PRIORITY_HEADROOM,
+                 priority_levels: List[str] = None):
+        self.writer = writer if writer else LogWriter.get_instance()
+        self.high_water_mark = high_water_mark
+        self.priority_headroom = priority_headroom
+        self.priority_levels = set(INGEST_PRIORITY_LEVELS if priority_levels is None else priority_levels)
+
+        self._lock = threading.Lock()
+        self.shed_total = 0
+        self.shed_by_service: Dict[str, int] = {}
+        # deque of [epoch_second, shed_count]
+        self._shed_history: deque = deque()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = AdmissionController()
+        return cls._instance
+
+    def _is_priority(self, row: dict) -> bool:
+        return (row.get("level") or "").upper() in self.priority_levels
+
+    def admit(self, rows: List[dict]) -> Tuple[int, List[int]]:
+        """
+        Admits as many rows as capacity allows and hands them to the writer.
+        Priority rows are considered first so they win over INFO within a batch.
+
+        Returns (admitted_count, shed_positions) where shed_positions index into rows.
+        """
+        pending = self.writer.depth()
+        order = sorted(range(len(rows)), key=lambda i: not self._is_priority(rows[i]))
+
+        admitted = []
+        shed = []
+        for i in order:
+            limit = self.high_water_mark
+            if self._is_priority(rows[i]):
+                limit += self.priority_headroom
+            if pending < limit:
+                admitted.append(i)
+                pending += 1
+            else:
+                shed.append(i)
+
+        queued = self.writer.submit([rows[i] for i in admitted])
+        # Anything the writer could not take (hard queue limit) is shed as well
+        shed.extend(admitted[queued:])
+
+        if shed:
+            self._record_shed([rows[i] for i in shed])
+        return queued, sorted(shed)
+
+    def _record_shed(self, rows: List[dict]):
+        now_s = int(time.time())
+        with self._lock:
+            for row in rows:
+                service = row.get("service") or "unknown"
+                self.shed_by_service[service] = self.shed_by_service.get(service, 0) + 1
+            self.shed_total += len(rows)
+
+            if self._shed_history and self._shed_history[-1][0] == now_s:
+                self._shed_history[-1][1] += len(rows)
+            else:
+                self._shed_history.append([now_s, len(rows)])
+            while self._shed_history and self._shed_history[0][0] < now_s - SHED_HISTORY_SECONDS:
+                self._shed_history.popleft()
+
+            update_state(
+                ingest_shed_total=self.shed_total,
+                ingest_shed_by_service=dict(self.shed_by_service),
+                last_shed_at=datetime.utcnow().isoformat()
+            )
+
+    def shed_between(self, start: datetime, end: datetime) -> int:
+        """Number of logs shed with arrival time in [start, end)."""
+        start_s, end_s = start.timestamp(), end.timestamp()
+        with self._lock:
+            return sum(count for second, count in self._shed_history if start_s <= second < end_s)
+
@@ -0,0 +1,187 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+
+from storage.database import SessionLocal
+from storage.log_repository import save_logs
+from debug.pipeline_state import update_state
+
+# Group-commit tuning (overridable from the environment)
+INGEST_QUEUE_MAX_ROWS = int(os.getenv("INGEST_QUEUE_MAX_ROWS", "50000"))
+INGEST_FLUSH_MAX_ROWS = int(os.getenv("INGEST_FLUSH_MAX_ROWS", "500"))
+INGEST_FLUSH_MAX_AGE_MS = float(os.getenv("INGEST_FLUSH_MAX_AGE_MS", "50"))
+# A batch whose commit fails transiently (SQLITE_BUSY, database locked) is
+# retried this many times, the backoff doubling from INGEST_FLUSH_RETRY_BACKOFF_MS,
+# before it is dropped. The queue keeps filling meanwhile, so admission
+# control sheds new rows instead.
+INGEST_FLUSH_RETRIES = int(os.getenv("INGEST_FLUSH_RETRIES", "5"))
+INGEST_FLUSH_RETRY_BACKOFF_MS = float(os.getenv("INGEST_FLUSH_RETRY_BACKOFF_MS", "50"))
+
+class LogWriter:
+    """
+    Background group-commit writer.
+
+    Ingest handlers enqueue validated rows and return immediately. A single
+    writer thread drains the bounded queue and flushes a batch in one
+    transaction once it holds INGEST_FLUSH_MAX_ROWS rows or its oldest row
+    has waited INGEST_FLUSH_MAX_AGE_MS.
+    """
+    _instance = None
+
+    def __init__(self, max_queue_rows: int = INGEST_QUEUE_MAX_ROWS,
+                 flush_max_rows: int = INGEST_FLUSH_MAX_ROWS,
+                 flush_max_age_ms: float = INGEST_FLUSH_MAX_AGE_MS):
+        self.flush_max_rows = flush_max_rows
+        self.flush_max_age = flush_max_age_ms / 1000.0
+        # Items are (enqueued_at, row) so flush latency covers time spent queued
+        self.queue: "queue.Queue[Tuple[float, dict]]" = queue.Queue(maxsize=max_queue_rows)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Called with the rows of every committed batch, on the writer thread
+        self._flush_listeners: List[Callable[[List[dict]], None]] = []
+
+        self.flushed_total = 0
+        self.dropped_total = 0
+        self.retried_total = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = LogWriter()
+        return cls._instance
+
+    def add_flush_listener(self, callback: Callable[[List[dict]], None]):
+        self._flush_listeners.append(callback)
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def submit(self, rows: List[dict]) -> int:
+        """
+        Enqueues rows without blocking. Returns how many were accepted;
+        rows beyond that did not fit in the queue.
+        """
+        now = time.monotonic()
+        accepted = 0
+        for row in rows:
+            try:
+                self.queue.put_nowait((now, row))
+            except queue.Full:
+                break
+            accepted += 1
+        return accepted
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        print(f"Log writer started (flush at {self.flush_max_rows} rows / {self.flush_max_age * 1000:.0f} ms)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stops accepting flush cycles and drains whatever is still queued."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        print(f"Log writer stopped ({self.depth()} rows left in queue)")
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._flush(batch)
+
+        # Graceful drain on shutdown
+        while True:
+            batch = []
+            while len(batch) < self.flush_max_rows:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _collect_batch(self) -> List[Tuple[float, dict]]:
+        try:
+            first = self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = first[0] + self.flush_max_age
+        while len(batch) < self.flush_max_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                # Past the age limit only rows that are already waiting are taken
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _flush(self, batch: List[Tuple[float, dict]]):
+        started = time.monotonic()
+        rows = [row for _, row in batch]
+        committed = self._save(rows)
+        if committed:
+            self.flushed_total += len(batch)
+        finished = time.monotonic()
+
+        if committed:
+            for listener in self._flush_listeners:
+                try:
+                    listener(rows)
+                except Exception as e:
+                    print(f"Log writer flush listener failed: {e}")
+
+        update_state(
+            ingest_queue_depth=self.depth(),
+            last_flush_at=datetime.utcnow().isoformat(),
+            last_flush_rows=len(batch),
+            last_flush_commit_ms=round((finished - started) * 1000, 2),
+            last_flush_latency_ms=round((finished - batch[0][0]) * 1000, 2),
+            ingest_flushed_total=self.flushed_total,
+            ingest_dropped_total=self.dropped_total,
+            ingest_flush_retries_total=self.retried_total
+        )
+
+    def _save(self, rows: List[dict]) -> bool:
+        """
+        Commits rows, retrying transient failures with backoff. Returns
+        False once the rows are dropped (after the retries, or at once for
+        errors a retry would hit again).
+        """
+        delay = INGEST_FLUSH_RETRY_BACKOFF_MS / 1000.0
+        attempt = 0
+        while True:
+            db = SessionLocal()
+            try:
+                save_logs(db, rows)
+                return True
+            except Exception as e:
+                db.rollback()
+                error = e
+            finally:
+                db.close()
+            if not isinstance(error, OperationalError) or attempt >= INGEST_FLUSH_RETRIES:
+                break
+            attempt += 1
+            self.retried_total += 1
+            print(f"Log writer flush failed, retry {attempt}/{INGEST_FLUSH_RETRIES} in {delay * 1000:.0f} ms: {error}")
+            time.sleep(delay)
+            delay *= 2
+
+        self.dropped_total += len(rows)
+        print(f"Log writer flush failed ({len(rows)} rows dropped): {error}")
+        update_state(last_error=f"ingest flush failed: {error}")
+        return False
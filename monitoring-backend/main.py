@@ -6,10 +6,12 @@ import httpx
 import os
 from fastapi.middleware.cors import CORSMiddleware
 from storage.database import engine, Base
+from storage.migrations import run_migrations
 from api.ingest import router as ingest_router
 from api.anomaly import router as anomaly_router
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title="Monitoring Backend")
 
@@ -35,8 +37,13 @@ app.include_router(pipeline_router)
 from api.demo import router as demo_router
 app.include_router(demo_router)
 
-@app.get("/attack/status")
-async def proxy_attack_status():
+from api.metrics import router as metrics_router
+app.include_router(metrics_router)
+
+from api.stream import router as stream_router
+app.include_router(stream_router)
+
+async def fetch_attack_status():
     attack_backend_url = os.getenv("ATTACK_BACKEND_URL", "http://localhost:4000")
     async with httpx.AsyncClient() as client:
         try:
@@ -45,6 +52,10 @@ async def proxy_attack_status():
         except:
             return {"status": "unknown", "error": "Attack backend unreachable"}
 
+@app.get("/attack/status")
+async def proxy_attack_status():
+    return await fetch_attack_status()
+
 
 @app.get("/health")
 def health():
@@ -56,35 +67,151 @@ from datetime import datetime, timezone
 from storage.database import SessionLocal
 from detection.anomaly_detector import detect_anomaly
 from correlation.incident_manager import IncidentManager
+from correlation.incident_store import IncidentStore
+from storage.incident_repository import load_open_incidents
+from ingestion.writer import LogWriter
+from detection.window_aggregator import SlidingWindowAggregator
+from detection.hot_buffer import HotLogBuffer
+from detection.traffic_sketches import TrafficSketches
+from detection.trigger import DetectionTrigger
+from detection.scheduler import DetectionScheduler
+from detection.baselines import BaselineStore
+from storage.rollups import compact_rollups, ROLLUP_COMPACT_INTERVAL_SECONDS
+from storage.partitions import drop_expired_partitions
+from debug.pipeline_state import update_state, take_changes
+from debug.loop_lag import LoopLagMonitor
+from streaming.event_hub import (
+    EventHub, encode_json, STREAM_PIPELINE_INTERVAL_SECONDS, STREAM_ATTACK_INTERVAL_SECONDS
+)
+
+def run_detection_tick(reason: str):
+    # Runs on the detection worker thread, never on the event loop
+    db = SessionLocal()
+    try:
+        # 1. Detect
+        result = detect_anomaly(db)
+
+        # 2. Update Incident State
+        manager = IncidentManager.get_instance()
+        manager.update(
+            anomaly_result=result,
+            affected_services=result.get("affected_services", []),
+            now=datetime.now(timezone.utc)
+        )
+        return result
+    finally:
+        db.close()
+
+# Periodic sweep plus early runs requested by the ingest path, ticks run on a worker thread
+detection_scheduler = DetectionScheduler(run_detection_tick)
+
+@app.on_event("startup")
+async def start_log_writer():
+    # Rebuild the in-memory detection buckets before any new log is flushed
+    aggregator = SlidingWindowAggregator.get_instance()
+    db = SessionLocal()
+    try:
+        aggregator.rebuild(db)
+        # Learned per-service baselines survive restarts
+        BaselineStore.get_instance().load(db)
+        # So do incidents that were still open
+        open_incidents = load_open_incidents(db)
+        if open_incidents:
+            IncidentManager.get_instance().restore(open_incidents)
+    finally:
+        db.close()
+    # Incident states and window snapshots are written from here, off the detection thread
+    IncidentStore.get_instance().start()
+
+    writer = LogWriter.get_instance()
+    writer.add_flush_listener(aggregator.add_rows)
+    # Raw recent logs for the detector; complete from this point on
+    writer.add_flush_listener(HotLogBuffer.get_instance().add_rows)
+    # Heavy hitters and distinct counts (IPs, endpoints, error types) for evidence
+    writer.add_flush_listener(TrafficSketches.get_instance().add_rows)
+    # Error bursts / rate jumps run detection without waiting for the next sweep
+    trigger = DetectionTrigger.get_instance()
+    trigger.set_callback(detection_scheduler.request)
+    writer.add_flush_listener(trigger.observe)
+    writer.start()
+
+@app.on_event("shutdown")
+async def drain_log_writer():
+    # Flush everything still queued before the process exits
+    LogWriter.get_instance().stop()
+    detection_scheduler.shutdown()
+    IncidentStore.get_instance().stop()
 
 @app.on_event("startup")
 async def schedule_periodic_detection():
     loop = asyncio.get_event_loop()
-    loop.create_task(run_detection_loop())
+    loop.create_task(detection_scheduler.run())
+
+@app.on_event("startup")
+async def schedule_loop_lag_monitor():
+    loop = asyncio.get_event_loop()
+    loop.create_task(LoopLagMonitor().run())
+
+@app.on_event("startup")
+async def schedule_event_streams():
+    loop = asyncio.get_event_loop()
+    # Incident events are published from the detection and API threads onto this loop
+    EventHub.get_instance().start(loop)
+    loop.create_task(run_pipeline_stream_loop())
+    loop.create_task(run_attack_stream_loop())
+
+async def run_pipeline_stream_loop():
+    hub = EventHub.get_instance()
+    while True:
+        await asyncio.sleep(STREAM_PIPELINE_INTERVAL_SECONDS)
+        if not hub.has_subscribers():
+            continue
+        try:
+            changes = take_changes()
+            if changes:
+                hub.publish("pipeline", encode_json(changes)[0])
+        except Exception as e:
+            print(f"Error in pipeline stream: {e}")
+
+async def run_attack_stream_loop():
+    # One upstream poll for every connected dashboard
+    hub = EventHub.get_instance()
+    last = None
+    while True:
+        await asyncio.sleep(STREAM_ATTACK_INTERVAL_SECONDS)
+        if not hub.has_subscribers():
+            continue
+        try:
+            body, _ = encode_json(await fetch_attack_status())
+            if body != last:
+                hub.publish("attack", body, retain=True)
+                last = body
+        except Exception as e:
+            print(f"Error in attack stream: {e}")
+
+@app.on_event("startup")
+async def schedule_storage_maintenance():
+    loop = asyncio.get_event_loop()
+    loop.create_task(run_storage_maintenance_loop())
+
+def run_storage_maintenance_once():
+    db = SessionLocal()
+    try:
+        compacted = compact_rollups(db)
+        dropped = drop_expired_partitions(db)
+        return compacted, dropped
+    finally:
+        db.close()
 
-async def run_detection_loop():
-    print("Starting background anomaly detection loop...")
+async def run_storage_maintenance_loop():
     while True:
+        await asyncio.sleep(ROLLUP_COMPACT_INTERVAL_SECONDS)
         try:
-            # Run detection every 5 seconds
-            await asyncio.sleep(5)
-            
-            db = SessionLocal()
-            try:
-                # 1. Detect
-                result = detect_anomaly(db)
-                
-                # 2. Update Incident State
-                manager = IncidentManager.get_instance()
-                manager.update(
-                    anomaly_result=result,
-                    affected_services=result.get("affected_services", []),
-                    now=datetime.now(timezone.utc)
-                )
-            finally:
-                db.close()
-                
+            # Blocking SQL, keep it off the event loop
+            compacted, dropped = await asyncio.to_thread(run_storage_maintenance_once)
+            update_state(last_rollup_compaction_at=datetime.utcnow().isoformat(), last_rollup_compaction=compacted)
+            if dropped:
+                print(f"Dropped expired log partitions: {dropped}")
+                update_state(last_partition_drop_at=datetime.utcnow().isoformat(), last_partitions_dropped=dropped)
         except Exception as e:
-            print(f"Error in detection loop: {e}")
-            # Don't crash the loop
-            await asyncio.sleep(5)
+            print(f"Error in storage maintenance: {e}")
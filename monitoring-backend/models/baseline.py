@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Column, Float, Integer, String
+from storage.database import Base
+
+class BaselineModel(Base):
+    """
+    Persisted EWMA state of one per-service metric (see detection/baselines.py).
+    season is -1 for the all-hours model, otherwise the UTC hour of week (0-167).
+    """
+    __tablename__ = "baseline_models"
+
+    service = Column(String, primary_key=True)
+    metric = Column(String, primary_key=True)
+    season = Column(Integer, primary_key=True, default=-1)
+
+    mean = Column(Float, nullable=False, default=0.0)
+    var = Column(Float, nullable=False, default=0.0)
+    samples = Column(Integer, nullable=False, default=0)
+    # Epoch minute of the newest bucket folded into the model
+    last_minute = Column(BigInteger, nullable=True)
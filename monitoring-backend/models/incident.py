@@ -0,0 +1,47 @@
+from sqlalchemy import JSON, BigInteger, Column, Float, Index, Integer, String
+from storage.database import Base
+
+class IncidentRecord(Base):
+    """
+    Latest persisted state of an incident (see correlation/incident_store.py).
+    Times are epoch microseconds; services and signals are sorted JSON lists.
+    """
+    __tablename__ = "incidents"
+    __table_args__ = (
+        # History pages are keyset-paginated on (started_us, incident_id), newest first
+        Index("ix_incidents_started", "started_us", "incident_id"),
+        Index("ix_incidents_status_started", "status", "started_us"),
+        Index("ix_incidents_severity_started", "severity", "started_us"),
+    )
+
+    incident_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)
+    severity = Column(String, nullable=False)
+    started_us = Column(BigInteger, nullable=False)
+    last_seen_us = Column(BigInteger, nullable=False)
+    resolved_us = Column(BigInteger, nullable=True)
+
+    services = Column(JSON, nullable=False)
+    signals = Column(JSON, nullable=False)
+    window_count = Column(Integer, nullable=False, default=1)
+
+    summary_text = Column(String, nullable=True)
+    resolution = Column(String, nullable=True)
+    similar_incidents = Column(JSON, nullable=True)
+    metrics = Column(JSON, nullable=True)
+
+    reasoning = Column(JSON, nullable=True)
+    confidence = Column(Float, nullable=False, default=0.0)
+    approval = Column(JSON, nullable=True)
+    remediation = Column(JSON, nullable=True)
+
+class IncidentSnapshot(Base):
+    """Signals, services and detector metrics of one detection window attributed to an incident."""
+    __tablename__ = "incident_snapshots"
+
+    incident_id = Column(String, primary_key=True)
+    ts_us = Column(BigInteger, primary_key=True)
+    window_count = Column(Integer, nullable=False)
+    services = Column(JSON, nullable=False)
+    signals = Column(JSON, nullable=False)
+    metrics = Column(JSON, nullable=True)
@@ -1,11 +1,23 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Index
 from storage.database import Base
 
 class Log(Base):
+    """
+    Schema of a stored log. Rows live in the time partitions created from
+    this table (storage/partitions.py); the logs table itself only holds
+    rows from before partitioning until run_migrations moves them.
+    """
     __tablename__ = "logs"
+    __table_args__ = (
+        # Per-service window queries
+        Index("ix_logs_service_ts_us", "service", "ts_us"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(String)
+    # Epoch microseconds, parsed once at ingest. Range-scanned by every detection tick.
+    ts_us = Column(BigInteger, index=True)
+    # Original ISO string as sent by the emitter (informational only)
+    timestamp = Column(String, nullable=True)
     service = Column(String)
     level = Column(String)
     message = Column(String)
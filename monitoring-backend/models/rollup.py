@@ -0,0 +1,36 @@
+from sqlalchemy import BigInteger, Column, Integer, String, Index
+from storage.database import Base
+
+class RollupColumns:
+    """
+    Columns shared by every rollup resolution. A bucket is keyed by
+    (bucket_start, service, endpoint); bucket_start is epoch seconds aligned
+    to the table's resolution and endpoint is "" when the log had none.
+    """
+    bucket_start = Column(BigInteger, primary_key=True)
+    service = Column(String, primary_key=True)
+    endpoint = Column(String, primary_key=True, default="")
+
+    row_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    level_error_count = Column(Integer, nullable=False, default=0)
+
+    latency_sum = Column(BigInteger, nullable=False, default=0)
+    latency_count = Column(Integer, nullable=False, default=0)
+    latency_min = Column(Integer, nullable=True)
+    latency_max = Column(Integer, nullable=True)
+
+    retry_sum = Column(Integer, nullable=False, default=0)
+    retry_count = Column(Integer, nullable=False, default=0)
+
+class LogRollupSecond(RollupColumns, Base):
+    __tablename__ = "log_rollups_1s"
+    __table_args__ = (Index("ix_log_rollups_1s_service_bucket", "service", "bucket_start"),)
+
+class LogRollupMinute(RollupColumns, Base):
+    __tablename__ = "log_rollups_1m"
+    __table_args__ = (Index("ix_log_rollups_1m_service_bucket", "service", "bucket_start"),)
+
+class LogRollupHour(RollupColumns, Base):
+    __tablename__ = "log_rollups_1h"
+    __table_args__ = (Index("ix_log_rollups_1h_service_bucket", "service", "bucket_start"),)
@@ -157,19 +157,19 @@ class OfflineReasoningAgent:
         if scenario == "auth_failure":
             error_rate = metrics.get("error_rate_short", 0)
             evidence.append(f"Authentication error rate: {error_rate*100:.1f}% (baseline: {metrics.get('error_rate_baseline', 0)*100:.1f}%)")
-            evidence.append("Error pattern: JWT_VERIFICATION_FAILED with 401 status codes")
+            evidence.append(self._error_pattern(metrics))
             evidence.append("Request volume stable - attack targets authentication layer specifically")
             
         elif scenario == "db_exhaustion":
             latency = metrics.get("avg_latency_short", 0)
             baseline_latency = metrics.get("avg_latency_baseline", 0)
             evidence.append(f"Database latency: {latency:.0f}ms (baseline: {baseline_latency:.0f}ms, {(latency/baseline_latency if baseline_latency > 0 else 0):.1f}x increase)")
-            evidence.append("Error pattern: CONNECTION_POOL_EXHAUSTED with 503 status codes")
+            evidence.append(self._error_pattern(metrics))
             evidence.append("Memory pressure and CPU utilization correlate with connection count growth")
             
         elif scenario == "cascading_failure":
             evidence.append("Multi-service failure progression detected")
-            evidence.append("Error pattern: UPSTREAM_TIMEOUT with 502 Bad Gateway responses")
+            evidence.append(self._error_pattern(metrics))
             evidence.append("Failure propagation follows service dependency graph")
             if duration > 40:
                 evidence.append("Phase transition observed - failure spreading to secondary services")
@@ -178,13 +178,15 @@ class OfflineReasoningAgent:
             log_rate = metrics.get("log_rate_short", 0)
             baseline_rate = metrics.get("log_rate_baseline", 1)
             evidence.append(f"Traffic rate: {log_rate:.1f} req/s (baseline: {baseline_rate:.1f} req/s, {(log_rate/baseline_rate):.1f}x increase)")
-            evidence.append("IP clustering detected: 80% of traffic from narrow IP range (192.168.1.x)")
+            evidence.append(self._ip_clustering(metrics))
             evidence.append("User-agent patterns suggest automated/bot traffic")
             evidence.append("Error rate remains low - infrastructure handling load but resources stressed")
             
         elif scenario == "latency_degradation":
             latency = metrics.get("avg_latency_short", 0)
             evidence.append(f"Elevated latency: {latency:.0f}ms across all services")
+            if metrics.get("p99_latency_short") is not None:
+                evidence.append(f"Tail latency: p95 {metrics['p95_latency_short']:.0f}ms, p99 {metrics['p99_latency_short']:.0f}ms")
             evidence.append("Error rate within normal bounds - performance issue, not failure")
             evidence.append("Suggests infrastructure-level resource contention")
         
@@ -199,6 +201,47 @@ class OfflineReasoningAgent:
         
         return evidence
 
+    @staticmethod
+    def _top(metrics: Dict, dimension: str, accept=lambda value: True) -> Optional[Dict[str, Any]]:
+        """Heaviest accepted value of a traffic dimension in the short window, if the detector measured it."""
+        profile = (metrics.get("traffic_short") or {}).get(dimension)
+        if not profile:
+            return None
+        return next((entry for entry in profile["top"] if accept(entry["value"])), None)
+
+    # Evidence from the traffic sketches only; they are missing until they cover
+    # the window again after a restart, and nothing is made up meanwhile
+    INSUFFICIENT_TRAFFIC_DATA = "insufficient data (traffic sketches do not cover the last 60s yet)"
+
+    def _ip_clustering(self, metrics: Dict) -> str:
+        if not metrics.get("traffic_short"):
+            return f"IP clustering: {self.INSUFFICIENT_TRAFFIC_DATA}"
+        prefix = self._top(metrics, "ip_prefix")
+        if prefix is None:
+            return "IP clustering: no client IPs recorded in the last 60s"
+        ips = metrics["traffic_short"]["ip"]
+        line = (f"IP clustering: {prefix['share']*100:.0f}% of requests from {prefix['value']} "
+                f"(~{ips['distinct']} distinct client IPs in the last 60s)")
+        top_ip = self._top(metrics, "ip")
+        if top_ip is not None and top_ip["share"] >= 0.05:
+            line += f", top client {top_ip['value']} sent {top_ip['share']*100:.0f}%"
+        return line
+
+    def _error_pattern(self, metrics: Dict) -> str:
+        if not metrics.get("traffic_short"):
+            return f"Error pattern: {self.INSUFFICIENT_TRAFFIC_DATA}"
+        error_type = self._top(metrics, "error_type")
+        status = self._top(metrics, "status_code", lambda code: code >= 400)
+        if error_type is None:
+            line = "Error pattern: no typed errors in the last 60s"
+            if status is not None:
+                line += f", {status['value']} status codes on {status['share']*100:.0f}% of requests"
+            return line
+        line = f"Error pattern: {error_type['value']} ({error_type['share']*100:.0f}% of typed errors)"
+        if status is not None:
+            line += f" with {status['value']} status codes ({status['share']*100:.0f}% of requests)"
+        return line
+
     def _recommend_actions(self, scenario: str, signals: List[str], services: List[str]) -> List[str]:
         """
         Provides targeted, scenario-specific remediation actions.
@@ -232,7 +275,7 @@ class OfflineReasoningAgent:
                 "Scale up failing service or restart stuck pods/containers"
             ],
             "traffic_anomaly": [
-                "IMMEDIATE: Enable aggressive rate limiting on frontend (192.168.1.x range)",
+                "IMMEDIATE: Enable aggressive rate limiting on frontend for the IP ranges in the evidence",
                 "Block or throttle identified IP ranges at CDN/WAF layer",
                 "Analyze traffic patterns for bot signatures and update WAF rules",
                 "Scale frontend service horizontally to handle load",
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta, timezone
 from storage.database import SessionLocal
-from models.log import Log
+from storage.log_repository import save_logs
+from storage.timestamps import to_epoch_us
 import random
 import uuid
 
@@ -22,7 +23,8 @@ def seed_baseline():
     
     while current_time < end_time:
         for _ in range(5): # 5 logs per second
-            log = Log(
+            log = dict(
+                ts_us=to_epoch_us(current_time),
                 timestamp=current_time.isoformat(),
                 service="seed-service",
                 level="INFO",
@@ -41,13 +43,11 @@ def seed_baseline():
         current_time += timedelta(milliseconds=200) # increment to keep order
         
         if len(logs) >= 1000:
-            db.bulk_save_objects(logs)
-            db.commit()
+            save_logs(db, logs)
             logs = []
             
     if logs:
-        db.bulk_save_objects(logs)
-        db.commit()
+        save_logs(db, logs)
         
     db.close()
     print("Seeding complete.")
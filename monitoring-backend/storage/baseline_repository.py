@@ -0,0 +1,22 @@
+from typing import List
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models.baseline import BaselineModel
+from storage.database import dialect_insert
+
+def load_baseline_models(db: Session) -> List[dict]:
+    table = BaselineModel.__table__
+    return [dict(row._mapping) for row in db.execute(select(table))]
+
+def save_baseline_models(db: Session, rows: List[dict]):
+    """Upserts model states (one executemany) and commits."""
+    if not rows:
+        return
+    table = BaselineModel.__table__
+    stmt = dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["service", "metric", "season"],
+        set_={field: stmt.excluded[field] for field in ("mean", "var", "samples", "last_minute")},
+    )
+    db.execute(stmt, rows)
+    db.commit()
@@ -1,11 +1,85 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 
-DATABASE_URL = "sqlite:///./logs.db"
+# Storage engine configuration (point DATABASE_URL at tmpfs for load tests,
+# e.g. sqlite:////dev/shm/logs.db)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./logs.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# SQLite tuning, applied on every new connection.
+# WAL lets the ingest writer and detection reads run concurrently, and
+# synchronous=NORMAL is crash-safe in WAL mode without an fsync per commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Negative cache_size is in KiB rather than pages
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+}
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+# insert() constructs with ON CONFLICT support (rollups, baselines and
+# incidents are upserted); other databases are rejected by create_storage_engine
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+def dialect_insert(db):
+    """insert() construct with ON CONFLICT support for the session's dialect."""
+    return UPSERT_INSERTS[db.get_bind().dialect.name]
+
+def create_storage_engine(url: str, sqlite_pragmas: dict = None):
+    """
+    Creates an engine with pool settings from the environment and SQLite
+    pragmas on connect. Raises ValueError for databases without upsert
+    support (see UPSERT_INSERTS), so a bad DATABASE_URL fails at startup.
+    """
+    backend = make_url(url).get_backend_name()
+    if backend not in UPSERT_INSERTS:
+        raise ValueError(
+            f"Unsupported database {backend!r} in DATABASE_URL: "
+            f"use one of {', '.join(sorted(UPSERT_INSERTS))}"
+        )
+    if backend != "sqlite":
+        return create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True
+        )
+
+    kwargs = {"connect_args": {"check_same_thread": False}}
+    if ":memory:" not in url and url not in ("sqlite://", "sqlite:///"):
+        kwargs.update(
+            poolclass=QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+    sqlite_engine = create_engine(url, **kwargs)
+
+    pragmas = SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas
+    event.listen(sqlite_engine, "connect", lambda conn, record: apply_sqlite_pragmas(conn, pragmas))
+    return sqlite_engine
+
+engine = create_storage_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
 Base = declarative_base()
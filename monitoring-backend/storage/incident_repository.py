@@ -0,0 +1,86 @@
+import json
+from typing import List, Optional, Tuple
+from sqlalchemy import String, and_, cast, or_, select
+from sqlalchemy.orm import Session
+from models.incident import IncidentRecord, IncidentSnapshot
+from storage.database import dialect_insert
+
+def save_incidents(db: Session, incidents: List[dict], snapshots: List[dict]):
+    """Upserts incident states and inserts window snapshots, then commits (one transaction)."""
+    if incidents:
+        table = IncidentRecord.__table__
+        stmt = dialect_insert(db)(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["incident_id"],
+            set_={column.name: stmt.excluded[column.name] for column in table.columns if column.name != "incident_id"},
+        )
+        db.execute(stmt, incidents)
+    if snapshots:
+        stmt = dialect_insert(db)(IncidentSnapshot.__table__).on_conflict_do_nothing(
+            index_elements=["incident_id", "ts_us"]
+        )
+        db.execute(stmt, snapshots)
+    db.commit()
+
+def get_incident_history(db: Session, limit: int, before: Optional[Tuple[int, str]] = None,
+                         status: Optional[str] = None, severity: Optional[str] = None,
+                         service: Optional[str] = None, since_us: Optional[int] = None,
+                         until_us: Optional[int] = None) -> List[dict]:
+    """
+    Incidents newest first (by started_us, then incident_id). `before` is the
+    (started_us, incident_id) of the last incident of the previous page.
+    since_us / until_us bound started_us.
+    """
+    table = IncidentRecord.__table__
+    conditions = []
+    if before is not None:
+        started_us, incident_id = before
+        conditions.append(or_(
+            table.c.started_us < started_us,
+            and_(table.c.started_us == started_us, table.c.incident_id < incident_id),
+        ))
+    if status:
+        conditions.append(table.c.status == status)
+    if severity:
+        conditions.append(table.c.severity == severity)
+    if service:
+        # services is a JSON list of strings: match the encoded element, with
+        # LIKE wildcards in the name taken literally
+        element = json.dumps(service)
+        for char in ("\\", "%", "_"):
+            element = element.replace(char, "\\" + char)
+        conditions.append(cast(table.c.services, String).like(f"%{element}%", escape="\\"))
+    if since_us is not None:
+        conditions.append(table.c.started_us >= since_us)
+    if until_us is not None:
+        conditions.append(table.c.started_us < until_us)
+
+    query = (
+        select(table)
+        .where(*conditions)
+        .order_by(table.c.started_us.desc(), table.c.incident_id.desc())
+        .limit(limit)
+    )
+    return [dict(row._mapping) for row in db.execute(query)]
+
+def get_incident_record(db: Session, incident_id: str) -> Optional[dict]:
+    """A persisted incident with its window snapshots, oldest first."""
+    table = IncidentRecord.__table__
+    row = db.execute(select(table).where(table.c.incident_id == incident_id)).first()
+    if row is None:
+        return None
+    snapshots = IncidentSnapshot.__table__
+    record = dict(row._mapping)
+    record["snapshots"] = [
+        dict(snapshot._mapping)
+        for snapshot in db.execute(
+            select(snapshots).where(snapshots.c.incident_id == incident_id).order_by(snapshots.c.ts_us)
+        )
+    ]
+    return record
+
+def load_open_incidents(db: Session) -> List[dict]:
+    """Incidents not resolved when they were last written, oldest first."""
+    table = IncidentRecord.__table__
+    query = select(table).where(table.c.status != "RESOLVED").order_by(table.c.started_us)
+    return [dict(row._mapping) for row in db.execute(query)]
@@ -1,13 +1,81 @@
+from typing import Dict, List
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 from models.log import Log
+from sqlalchemy.exc import OperationalError
+from storage.partitions import dropped_concurrently, ensure_partition, group_by_partition, partitions_overlapping
+from storage.rollups import record_log_rollups
 
-def save_log(db: Session, log_data: dict):
-    log = Log(**log_data)
-    db.add(log)
+def save_logs(db: Session, logs_data: List[dict]) -> int:
+    """
+    Inserts a batch of logs into their time partitions (one Core
+    executemany per partition) and folds them into the per-second rollups,
+    all in one transaction.
+    Returns the number of rows written.
+    """
+    if not logs_data:
+        return 0
+    for name, rows in group_by_partition(logs_data).items():
+        db.execute(ensure_partition(db, name).insert(), rows)
+    record_log_rollups(db, logs_data)
     db.commit()
+    return len(logs_data)
 
-def get_logs_between(db: Session, start_ts: str, end_ts: str):
-    return db.query(Log).filter(
-        Log.timestamp >= start_ts,
-        Log.timestamp < end_ts
-    ).all()
+def get_logs_between(db: Session, start_us: int, end_us: int) -> List[dict]:
+    """Logs with start_us <= ts_us < end_us (epoch microseconds), oldest first."""
+    logs = []
+    for table in partitions_overlapping(db, start_us, end_us):
+        query = (
+            select(table)
+            .where(table.c.ts_us >= start_us, table.c.ts_us < end_us)
+            .order_by(table.c.ts_us)
+        )
+        try:
+            logs.extend(dict(row._mapping) for row in db.execute(query))
+        except OperationalError as e:
+            if not dropped_concurrently(e):
+                raise
+    return logs
+
+def _stat_columns(table=Log.__table__):
+    """Aggregate columns matching detection.aggregation.STAT_FIELDS."""
+    c = table.c
+    is_error = (c.status_code >= 400) | (c.level == "ERROR")
+    return [
+        func.count().label("row_count"),
+        func.sum(case((is_error, 1), else_=0)).label("error_count"),
+        func.sum(case((c.level == "ERROR", 1), else_=0)).label("level_error_count"),
+        func.coalesce(func.sum(c.latency_ms), 0).label("latency_sum"),
+        func.count(c.latency_ms).label("latency_count"),
+        func.coalesce(func.sum(c.retry_count), 0).label("retry_sum"),
+        func.count(c.retry_count).label("retry_count"),
+    ]
+
+def aggregate_logs_by_service(db: Session, start_us: int, end_us: int) -> Dict[str, Dict[str, float]]:
+    """
+    Per-service window stats (see detection.aggregation.STAT_FIELDS) for
+    start_us <= ts_us < end_us, computed with one GROUP BY per overlapping
+    partition without loading rows.
+    """
+    per_service = {}
+    for table in partitions_overlapping(db, start_us, end_us):
+        query = (
+            select(table.c.service, *_stat_columns(table))
+            .where(table.c.ts_us >= start_us, table.c.ts_us < end_us)
+            .group_by(table.c.service)
+        )
+        try:
+            rows = db.execute(query).fetchall()
+        except OperationalError as e:
+            if not dropped_concurrently(e):
+                raise
+            continue
+        for row in rows:
+            stats = dict(row._mapping)
+            service = stats.pop("service")
+            if service in per_service:
+                for field, value in stats.items():
+                    per_service[service][field] += value
+            else:
+                per_service[service] = stats
+    return per_service
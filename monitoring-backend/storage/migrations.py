@@ -0,0 +1,137 @@
+from sqlalchemy import bindparam, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from storage.database import Base
+from storage.timestamps import parse_timestamp_us
+from storage.partitions import ensure_partition, group_by_partition, list_partitions, partition_table
+from storage.rollups import backfill_second_rollups, compact_rollups
+from models.log import Log
+from models.rollup import LogRollupSecond, LogRollupMinute, LogRollupHour
+from models.baseline import BaselineModel  # noqa: F401 (registers the table)
+from models.incident import IncidentRecord, IncidentSnapshot  # noqa: F401 (registers the tables)
+
+# Indexes from earlier schema versions that are no longer part of the models
+OBSOLETE_INDEXES = ["ix_logs_timestamp", "ix_logs_service_timestamp"]
+
+BACKFILL_CHUNK = 10000
+
+def run_migrations(engine: Engine):
+    """
+    Lightweight schema migration for existing databases.
+
+    create_all() only creates missing tables, so columns and indexes added
+    to a model after its table already exists in logs.db are created here.
+    """
+    # Tables of models the caller had not imported yet when it ran create_all()
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    _backfill_log_ts_us(engine)
+    _drop_obsolete_indexes(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    _backfill_rollups(engine)
+    _move_logs_into_partitions(engine)
+    _create_partition_indexes(engine)
+
+def _add_missing_columns(engine: Engine):
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                    print(f"Migration: added column {table.name}.{column.name}")
+
+def _backfill_log_ts_us(engine: Engine):
+    """Parses legacy ISO string timestamps into the integer ts_us column."""
+    table = Log.__table__
+    update = table.update().where(table.c.id == bindparam("row_id")).values(ts_us=bindparam("parsed_us"))
+
+    total = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            # Walk the primary key so each chunk is a cheap range read
+            rows = conn.execute(
+                select(table.c.id, table.c.timestamp)
+                .where(table.c.id > last_id, table.c.ts_us.is_(None))
+                .order_by(table.c.id)
+                .limit(BACKFILL_CHUNK)
+            ).fetchall()
+            if not rows:
+                break
+            params = []
+            for row_id, timestamp in rows:
+                try:
+                    parsed_us = parse_timestamp_us(timestamp)
+                except (TypeError, ValueError):
+                    # Unparseable: pin to the epoch so it is never retried and never matches a window
+                    parsed_us = 0
+                params.append({"row_id": row_id, "parsed_us": parsed_us})
+            conn.execute(update, params)
+            last_id = rows[-1][0]
+            total += len(params)
+    if total:
+        print(f"Migration: backfilled ts_us for {total} logs")
+
+def _drop_obsolete_indexes(engine: Engine):
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name in inspector.get_table_names():
+            for index in inspector.get_indexes(table_name):
+                if index["name"] in OBSOLETE_INDEXES:
+                    conn.execute(text(f'DROP INDEX {index["name"]}'))
+                    print(f"Migration: dropped index {index['name']}")
+
+def _backfill_rollups(engine: Engine):
+    """Builds rollups for logs that predate the rollup tables."""
+    with Session(bind=engine) as db:
+        for model in (LogRollupSecond, LogRollupMinute, LogRollupHour):
+            if db.execute(select(model.bucket_start).limit(1)).first() is not None:
+                return
+        if db.execute(select(Log.id).limit(1)).first() is None:
+            return
+        buckets = backfill_second_rollups(db)
+        compact_rollups(db)
+    print(f"Migration: backfilled {buckets} per-second rollup buckets from existing logs")
+
+def _move_logs_into_partitions(engine: Engine):
+    """
+    Moves rows of the legacy single logs table into the time partitions.
+    Runs after the rollup backfill, which still reads the legacy table.
+
+    The partitions assign new ids (they may already hold live rows), and
+    each chunk is deleted from the legacy table in the transaction that
+    inserts it, so an interrupted move resumes without duplicates.
+    """
+    table = Log.__table__
+    total = 0
+    with Session(bind=engine) as db:
+        while True:
+            rows = db.execute(
+                select(table).order_by(table.c.id).limit(BACKFILL_CHUNK)
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            rows = [{key: value for key, value in row._mapping.items() if key != "id"} for row in rows]
+            for name, partition_rows in group_by_partition(rows).items():
+                db.execute(ensure_partition(db, name).insert(), partition_rows)
+            db.execute(table.delete().where(table.c.id <= last_id))
+            db.commit()
+            total += len(rows)
+    if total:
+        print(f"Migration: moved {total} logs into time partitions")
+
+def _create_partition_indexes(engine: Engine):
+    with Session(bind=engine) as db:
+        names = list_partitions(db)
+    for name in names:
+        for index in partition_table(name).indexes:
+            index.create(bind=engine, checkfirst=True)
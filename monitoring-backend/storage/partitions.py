@@ -0,0 +1,184 @@
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Index, MetaData, Table, event, func, inspect, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models.log import Log
+from storage.timestamps import from_epoch_us, to_epoch_us
+
+# Raw logs are stored in one table per hour or day (logs_pYYYYMMDD[HH]).
+# Expiry drops whole tables instead of running a large DELETE.
+LOG_PARTITION_GRANULARITY = os.getenv("LOG_PARTITION_GRANULARITY", "day")
+LOG_RETENTION_HOURS = float(os.getenv("LOG_RETENTION_HOURS", str(7 * 24)))
+
+PARTITION_PREFIX = "logs_p"
+_PARTITION_RE = re.compile(r"^logs_p(\d{8}|\d{10})$")
+
+_metadata = MetaData()
+_tables: Dict[str, Table] = {}
+# Committed partition names per database URL (None = not loaded yet)
+_known: Dict[str, Optional[set]] = {}
+_lock = threading.Lock()
+# Session.info key of partitions created in the session's open transaction
+_CREATED_KEY = "created_partitions"
+
+def partition_name_for(ts_us: int, granularity: str = LOG_PARTITION_GRANULARITY) -> str:
+    dt = from_epoch_us(max(ts_us, 0))
+    if granularity == "hour":
+        return f"{PARTITION_PREFIX}{dt:%Y%m%d%H}"
+    return f"{PARTITION_PREFIX}{dt:%Y%m%d}"
+
+def partition_bounds(name: str) -> Tuple[int, int]:
+    """[start_us, end_us) covered by a partition, derived from its name."""
+    suffix = _PARTITION_RE.match(name).group(1)
+    if len(suffix) == 10:
+        start = datetime.strptime(suffix, "%Y%m%d%H").replace(tzinfo=timezone.utc)
+        return to_epoch_us(start), to_epoch_us(start + timedelta(hours=1))
+    start = datetime.strptime(suffix, "%Y%m%d").replace(tzinfo=timezone.utc)
+    return to_epoch_us(start), to_epoch_us(start + timedelta(days=1))
+
+def partition_table(name: str) -> Table:
+    """
+    Table object for a partition, with the same columns as Log. The id and
+    ts_us indexes come with the copied columns (index=True).
+
+    Each partition has its own autoincrement id, so log ids are only unique
+    within a partition: a row is identified by (partition, id).
+    """
+    table = _tables.get(name)
+    if table is None:
+        with _lock:
+            table = _tables.get(name)
+            if table is None:
+                table = Table(name, _metadata, *[column._copy() for column in Log.__table__.columns])
+                Index(f"ix_{name}_service_ts_us", table.c.service, table.c.ts_us)
+                _tables[name] = table
+    return table
+
+def _bind_key(db: Session) -> str:
+    return str(db.get_bind().url)
+
+def list_partitions(db: Session) -> List[str]:
+    """Committed partitions, oldest first. Safe to call from any thread."""
+    key = _bind_key(db)
+    with _lock:
+        known = _known.get(key)
+        if known is not None:
+            return sorted(known)
+    names = inspect(db.connection()).get_table_names()
+    known = {name for name in names if _PARTITION_RE.match(name)}
+    with _lock:
+        _known.setdefault(key, known)
+        return sorted(_known[key])
+
+def ensure_partition(db: Session, name: str) -> Table:
+    """
+    Creates the partition table (and its indexes) on first use. The name
+    is published to list_partitions (and so to readers on other threads)
+    only once the creating transaction commits.
+    """
+    table = partition_table(name)
+    created = db.info.setdefault(_CREATED_KEY, set())
+    if name not in created and name not in list_partitions(db):
+        conn = db.connection()
+        table.create(bind=conn, checkfirst=True)
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+        created.add(name)
+    return table
+
+@event.listens_for(Session, "after_commit")
+def _publish_created_partitions(session: Session):
+    created = session.info.pop(_CREATED_KEY, None)
+    if created:
+        key = _bind_key(session)
+        with _lock:
+            known = _known.get(key)
+            if known is not None:
+                known.update(created)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_created_partitions(session: Session):
+    # Rolled back with the transaction
+    session.info.pop(_CREATED_KEY, None)
+
+def partitions_overlapping(db: Session, start_us: int, end_us: int) -> List[Table]:
+    """Partitions holding any part of [start_us, end_us), oldest first."""
+    tables = []
+    for name in list_partitions(db):
+        part_start, part_end = partition_bounds(name)
+        if part_start < end_us and part_end > start_us:
+            tables.append(partition_table(name))
+    return tables
+
+def dropped_concurrently(error: OperationalError) -> bool:
+    """
+    True if a read failed because its partition was dropped after the
+    reader listed it (drop_expired_partitions does not wait for readers).
+    Such a partition was past retention, so the reader can skip it.
+    """
+    return "no such table" in str(error.orig)
+
+def group_by_partition(rows: List[dict]) -> Dict[str, List[dict]]:
+    grouped: Dict[str, List[dict]] = {}
+    for row in rows:
+        grouped.setdefault(partition_name_for(row["ts_us"]), []).append(row)
+    return grouped
+
+def drop_expired_partitions(db: Session, now_us: Optional[int] = None,
+                            retention_hours: float = LOG_RETENTION_HOURS) -> List[str]:
+    """
+    Drops partitions that end before the retention cutoff. Freed pages are
+    reused by new partitions, so the file stops growing rather than shrinking.
+    Readers that listed a partition before it was dropped skip it (see
+    dropped_concurrently).
+    """
+    now_us = to_epoch_us(datetime.now(timezone.utc)) if now_us is None else now_us
+    cutoff = now_us - int(retention_hours * 3600 * 1_000_000)
+    dropped = []
+    for name in list_partitions(db):
+        if partition_bounds(name)[1] <= cutoff:
+            partition_table(name).drop(bind=db.connection(), checkfirst=True)
+            dropped.append(name)
+    if dropped:
+        db.commit()
+        with _lock:
+            _known[_bind_key(db)].difference_update(dropped)
+            for name in dropped:
+                _metadata.remove(_tables.pop(name))
+    return dropped
+
+def partition_stats(db: Session) -> List[dict]:
+    """Row count, time range and on-disk size (SQLite dbstat, if compiled in) per partition."""
+    sizes: Dict[str, int] = {}
+    if db.get_bind().dialect.name == "sqlite":
+        try:
+            for name, size in db.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")):
+                sizes[name] = size
+        except OperationalError:
+            sizes = {}
+
+    stats = []
+    for name in list_partitions(db):
+        table = partition_table(name)
+        start_us, end_us = partition_bounds(name)
+        try:
+            rows = db.execute(select(func.count()).select_from(table)).scalar()
+        except OperationalError as e:
+            if not dropped_concurrently(e):
+                raise
+            continue
+        index_bytes = sum(sizes.get(index.name, 0) for index in table.indexes)
+        stats.append({
+            "partition": name,
+            "start": from_epoch_us(start_us).isoformat(),
+            "end": from_epoch_us(end_us).isoformat(),
+            "rows": rows,
+            "table_bytes": sizes.get(name) if sizes else None,
+            "index_bytes": index_bytes if sizes else None,
+        })
+    return stats
@@ -0,0 +1,329 @@
+import os
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import BigInteger, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from models.log import Log
+from storage.database import dialect_insert
+from models.rollup import LogRollupSecond, LogRollupMinute, LogRollupHour
+
+# resolution name -> (model, bucket width in seconds)
+RESOLUTIONS = {
+    "second": (LogRollupSecond, 1),
+    "minute": (LogRollupMinute, 60),
+    "hour": (LogRollupHour, 3600),
+}
+
+# How long each finer resolution is kept once it has been compacted upwards
+ROLLUP_SECOND_RETENTION_SECONDS = int(os.getenv("ROLLUP_SECOND_RETENTION_SECONDS", str(2 * 3600)))
+ROLLUP_MINUTE_RETENTION_SECONDS = int(os.getenv("ROLLUP_MINUTE_RETENTION_SECONDS", str(7 * 86400)))
+# Buckets younger than this are not compacted yet (late rows may still arrive)
+ROLLUP_COMPACT_GRACE_SECONDS = int(os.getenv("ROLLUP_COMPACT_GRACE_SECONDS", "120"))
+ROLLUP_COMPACT_INTERVAL_SECONDS = int(os.getenv("ROLLUP_COMPACT_INTERVAL_SECONDS", "60"))
+
+COUNTER_FIELDS = (
+    "row_count", "error_count", "level_error_count",
+    "latency_sum", "latency_count", "retry_sum", "retry_count",
+)
+
+def _upsert(db: Session, model, insert_fn, source):
+    """
+    INSERT ... ON CONFLICT DO UPDATE that adds counters and widens min/max.
+    source is either a list of bucket dicts or a SELECT with matching columns.
+    """
+    table = model.__table__
+    if isinstance(source, list):
+        stmt = insert_fn(table)
+    else:
+        stmt = insert_fn(table).from_select([c.name for c in source.selected_columns], source)
+    excluded = stmt.excluded
+    updates = {field: table.c[field] + excluded[field] for field in COUNTER_FIELDS}
+    # NULL-safe min/max: a NULL on either side keeps the other value
+    current_min, new_min = table.c.latency_min, excluded.latency_min
+    current_max, new_max = table.c.latency_max, excluded.latency_max
+    updates["latency_min"] = case((new_min < current_min, new_min), else_=func.coalesce(current_min, new_min))
+    updates["latency_max"] = case((new_max > current_max, new_max), else_=func.coalesce(current_max, new_max))
+    stmt = stmt.on_conflict_do_update(index_elements=["bucket_start", "service", "endpoint"], set_=updates)
+    if isinstance(source, list):
+        db.execute(stmt, source)
+    else:
+        db.execute(stmt)
+
+def record_log_rollups(db: Session, rows: List[dict]):
+    """
+    Folds a batch of log rows into per-second rollups. Runs inside the
+    caller's transaction so rollups always match the committed logs.
+    """
+    buckets: Dict[tuple, dict] = {}
+    for row in rows:
+        key = (row["ts_us"] // 1_000_000, row["service"], row.get("endpoint") or "")
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {
+                "bucket_start": key[0], "service": key[1], "endpoint": key[2],
+                "row_count": 0, "error_count": 0, "level_error_count": 0,
+                "latency_sum": 0, "latency_count": 0, "latency_min": None, "latency_max": None,
+                "retry_sum": 0, "retry_count": 0,
+            }
+        status_code = row.get("status_code")
+        is_level_error = row.get("level") == "ERROR"
+        bucket["row_count"] += 1
+        if is_level_error or (status_code is not None and status_code >= 400):
+            bucket["error_count"] += 1
+        if is_level_error:
+            bucket["level_error_count"] += 1
+        latency = row.get("latency_ms")
+        if latency is not None:
+            bucket["latency_sum"] += latency
+            bucket["latency_count"] += 1
+            if bucket["latency_min"] is None or latency < bucket["latency_min"]:
+                bucket["latency_min"] = latency
+            if bucket["latency_max"] is None or latency > bucket["latency_max"]:
+                bucket["latency_max"] = latency
+        if row.get("retry_count") is not None:
+            bucket["retry_sum"] += row["retry_count"]
+            bucket["retry_count"] += 1
+
+    if buckets:
+        insert_fn = dialect_insert(db)
+        _upsert(db, LogRollupSecond, insert_fn, list(buckets.values()))
+        _fold_late_buckets(db, insert_fn, list(buckets.values()))
+
+def _rebucket(buckets: List[dict], width: int) -> List[dict]:
+    """Sums buckets into buckets of the given width (in Python; see _rollup_select)."""
+    wider: Dict[tuple, dict] = {}
+    for bucket in buckets:
+        key = ((bucket["bucket_start"] // width) * width, bucket["service"], bucket["endpoint"])
+        target = wider.get(key)
+        if target is None:
+            wider[key] = dict(bucket, bucket_start=key[0])
+            continue
+        for field in COUNTER_FIELDS:
+            target[field] += bucket[field]
+        for field, pick in (("latency_min", min), ("latency_max", max)):
+            values = [value for value in (target[field], bucket[field]) if value is not None]
+            target[field] = pick(values) if values else None
+    return list(wider.values())
+
+def _fold_late_buckets(db: Session, insert_fn, buckets: List[dict]):
+    """
+    Adds second buckets that arrived after compact_rollups already moved
+    past them (late rows) to every coarser table holding them. Compaction
+    never revisits a bucket behind its watermark, and the second rollups
+    are pruned later, so long windows would otherwise miss these rows.
+    Runs in the writer's transaction, after its inserts took the write lock,
+    so the watermarks read here cannot move before the commit.
+    """
+    for target_name in ("minute", "hour"):
+        target_model, width = RESOLUTIONS[target_name]
+        newest = db.execute(select(func.max(target_model.bucket_start))).scalar()
+        if newest is None:
+            return
+        late = [bucket for bucket in buckets if bucket["bucket_start"] < newest + width]
+        if not late:
+            return
+        _upsert(db, target_model, insert_fn, _rebucket(late, width))
+        buckets = late
+
+def _rollup_select(source_model, width: int, start_s: int, end_s: int):
+    """Re-buckets source_model rows in [start_s, end_s) to the given width."""
+    src = source_model.__table__
+    bucket = (cast(src.c.bucket_start / width, BigInteger) * width).label("bucket_start")
+    return (
+        select(
+            bucket,
+            src.c.service,
+            src.c.endpoint,
+            *[func.sum(src.c[field]).label(field) for field in COUNTER_FIELDS],
+            func.min(src.c.latency_min).label("latency_min"),
+            func.max(src.c.latency_max).label("latency_max"),
+        )
+        .where(src.c.bucket_start >= start_s, src.c.bucket_start < end_s)
+        .group_by(bucket, src.c.service, src.c.endpoint)
+    )
+
+def backfill_second_rollups(db: Session) -> int:
+    """
+    Builds per-second rollups for every stored log. Used once when the
+    rollup tables are introduced on a database that already holds logs.
+    """
+    logs = Log.__table__
+    second = cast(logs.c.ts_us / 1_000_000, BigInteger).label("bucket_start")
+    endpoint = func.coalesce(logs.c.endpoint, "").label("endpoint")
+    is_error = (logs.c.status_code >= 400) | (logs.c.level == "ERROR")
+    source = (
+        select(
+            second,
+            logs.c.service,
+            endpoint,
+            func.count().label("row_count"),
+            func.sum(case((is_error, 1), else_=0)).label("error_count"),
+            func.sum(case((logs.c.level == "ERROR", 1), else_=0)).label("level_error_count"),
+            func.coalesce(func.sum(logs.c.latency_ms), 0).label("latency_sum"),
+            func.count(logs.c.latency_ms).label("latency_count"),
+            func.min(logs.c.latency_ms).label("latency_min"),
+            func.max(logs.c.latency_ms).label("latency_max"),
+            func.coalesce(func.sum(logs.c.retry_count), 0).label("retry_sum"),
+            func.count(logs.c.retry_count).label("retry_count"),
+        )
+        .where(logs.c.ts_us.is_not(None), logs.c.service.is_not(None))
+        .group_by(second, logs.c.service, endpoint)
+    )
+    _upsert(db, LogRollupSecond, dialect_insert(db), source)
+    db.commit()
+    return db.execute(select(func.count()).select_from(LogRollupSecond.__table__)).scalar()
+
+def compact_rollups(db: Session, now_s: Optional[int] = None) -> Dict[str, int]:
+    """
+    Compacts seconds into minutes and minutes into hours, then prunes
+    compacted fine-grained buckets past their retention. Only whole,
+    settled buckets (older than the grace period) are compacted, and each
+    target table's newest bucket acts as the watermark, so re-running is safe.
+    Rows arriving behind the watermark are added to the coarser tables as
+    they are written (record_log_rollups).
+    """
+    now_s = int(time.time()) if now_s is None else now_s
+    insert_fn = dialect_insert(db)
+    compacted = {}
+    for source_name, target_name, retention in (
+        ("second", "minute", ROLLUP_SECOND_RETENTION_SECONDS),
+        ("minute", "hour", ROLLUP_MINUTE_RETENTION_SECONDS),
+    ):
+        source_model, _ = RESOLUTIONS[source_name]
+        target_model, width = RESOLUTIONS[target_name]
+
+        newest = db.execute(select(func.max(target_model.bucket_start))).scalar()
+        if newest is not None:
+            start_s = newest + width
+        else:
+            oldest = db.execute(select(func.min(source_model.bucket_start))).scalar()
+            if oldest is None:
+                continue
+            start_s = (oldest // width) * width
+        end_s = ((now_s - ROLLUP_COMPACT_GRACE_SECONDS) // width) * width
+
+        # First source bucket that is not compacted yet
+        watermark = start_s
+        if start_s < end_s:
+            _upsert(db, target_model, insert_fn, _rollup_select(source_model, width, start_s, end_s))
+            compacted[target_name] = (end_s - start_s) // width
+            watermark = end_s
+
+        prune_before = min(now_s - retention, watermark)
+        db.execute(source_model.__table__.delete().where(source_model.bucket_start < prune_before))
+    db.commit()
+    return compacted
+
+def second_rollups_cover(start_us: int, now_s: Optional[int] = None) -> bool:
+    """
+    Whether the per-second rollups still hold every second from start_us:
+    compact_rollups never prunes seconds younger than ROLLUP_SECOND_RETENTION_SECONDS.
+    """
+    now_s = int(time.time()) if now_s is None else now_s
+    return start_us >= (now_s - ROLLUP_SECOND_RETENTION_SECONDS) * 1_000_000
+
+def rollup_stats_by_service(db: Session, start_us: int, end_us: int) -> Dict[str, Dict[str, float]]:
+    """
+    Per-service window stats (detection.aggregation.STAT_FIELDS) from the
+    per-second rollups. A bucket belongs to the window if its start second
+    falls inside [start_us, end_us).
+    """
+    first_second = -(-start_us // 1_000_000)
+    end_second = -(-end_us // 1_000_000)
+    table = LogRollupSecond.__table__
+    query = (
+        select(table.c.service, *[func.sum(table.c[field]).label(field) for field in COUNTER_FIELDS])
+        .where(table.c.bucket_start >= first_second, table.c.bucket_start < end_second)
+        .group_by(table.c.service)
+    )
+    per_service = {}
+    for row in db.execute(query):
+        stats = dict(row._mapping)
+        per_service[stats.pop("service")] = stats
+    return per_service
+
+def rollup_stats_by_service_second(db: Session, start_s: int, end_s: int) -> List[dict]:
+    """Per-second rollups for [start_s, end_s) summed over endpoints, grouped by (service, second)."""
+    table = LogRollupSecond.__table__
+    query = (
+        select(
+            table.c.service,
+            table.c.bucket_start.label("second"),
+            *[func.sum(table.c[field]).label(field) for field in COUNTER_FIELDS],
+        )
+        .where(table.c.bucket_start >= start_s, table.c.bucket_start < end_s)
+        .group_by(table.c.service, table.c.bucket_start)
+    )
+    return [dict(row._mapping) for row in db.execute(query)]
+
+def rollup_stats_by_service_minute(db: Session, start_s: int, end_s: int) -> List[dict]:
+    """
+    Per-minute stats for [start_s, end_s) summed over endpoints, grouped by
+    (service, minute start). Minutes already compacted come from the minute
+    table, the rest are re-bucketed from the second table.
+    """
+    minute_table = LogRollupMinute.__table__
+    newest = db.execute(select(func.max(minute_table.c.bucket_start))).scalar()
+    watermark = start_s if newest is None else max(start_s, min(end_s, newest + 60))
+
+    buckets: Dict[tuple, dict] = {}
+    for model, lo, hi in ((LogRollupMinute, start_s, watermark), (LogRollupSecond, watermark, end_s)):
+        if lo >= hi:
+            continue
+        table = model.__table__
+        minute = (cast(table.c.bucket_start / 60, BigInteger) * 60).label("minute")
+        query = (
+            select(table.c.service, minute, *[func.sum(table.c[field]).label(field) for field in COUNTER_FIELDS])
+            .where(table.c.bucket_start >= lo, table.c.bucket_start < hi)
+            .group_by(table.c.service, minute)
+        )
+        for row in db.execute(query):
+            row = dict(row._mapping)
+            bucket = buckets.setdefault((row["service"], row["minute"]), {
+                "service": row["service"], "minute": row["minute"], **{field: 0 for field in COUNTER_FIELDS}
+            })
+            for field in COUNTER_FIELDS:
+                bucket[field] += row[field] or 0
+    return list(buckets.values())
+
+def query_rollups(db: Session, resolution: str, start_s: int, end_s: int,
+                  service: Optional[str] = None, endpoint: Optional[str] = None) -> List[dict]:
+    """
+    Time series of buckets at the given resolution for [start_s, end_s),
+    summed over whatever is not filtered on (services / endpoints).
+
+    Coarser tables lag behind by the compaction grace period, so the tail
+    after each table's newest bucket is filled from the next finer table.
+    """
+    names = list(RESOLUTIONS)
+    _, width = RESOLUTIONS[resolution]
+    points: Dict[int, dict] = {}
+    cursor = (start_s // width) * width
+    for name in reversed(names[:names.index(resolution) + 1]):
+        model, table_width = RESOLUTIONS[name]
+        query = _rollup_select(model, width, cursor, end_s)
+        if service is not None:
+            query = query.where(model.__table__.c.service == service)
+        if endpoint is not None:
+            query = query.where(model.__table__.c.endpoint == endpoint)
+
+        for row in db.execute(query):
+            row = dict(row._mapping)
+            point = points.get(row["bucket_start"])
+            if point is None:
+                point = points[row["bucket_start"]] = {"bucket_start": row["bucket_start"], "latency_min": None, "latency_max": None}
+                point.update({field: 0 for field in COUNTER_FIELDS})
+            for field in COUNTER_FIELDS:
+                point[field] += row[field] or 0
+            if row["latency_min"] is not None and (point["latency_min"] is None or row["latency_min"] < point["latency_min"]):
+                point["latency_min"] = row["latency_min"]
+            if row["latency_max"] is not None and (point["latency_max"] is None or row["latency_max"] > point["latency_max"]):
+                point["latency_max"] = row["latency_max"]
+
+        newest = db.execute(select(func.max(model.bucket_start))).scalar()
+        if newest is not None:
+            cursor = max(cursor, newest + table_width)
+        if cursor >= end_s:
+            break
+    return [points[bucket] for bucket in sorted(points)]
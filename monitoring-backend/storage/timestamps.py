@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def to_epoch_us(dt: datetime) -> int:
+    """Converts a datetime to integer microseconds since the epoch. Naive datetimes are treated as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+def from_epoch_us(ts_us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=ts_us)
+
+def parse_timestamp_us(value: str) -> int:
+    """
+    Parses an ISO-8601 timestamp ('Z' or '+HH:MM' suffix, any fractional
+    precision) into epoch microseconds. Raises ValueError if unparseable.
+    """
+    return to_epoch_us(datetime.fromisoformat(value.strip()))
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from debug.pipeline_state import update_state
+
+# Events buffered per subscriber; a client that falls this far behind is resynced
+STREAM_CLIENT_QUEUE_MAX = int(os.getenv("STREAM_CLIENT_QUEUE_MAX", "256"))
+STREAM_MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", "100"))
+# Pipeline state changes are coalesced and pushed at most this often
+STREAM_PIPELINE_INTERVAL_SECONDS = float(os.getenv("STREAM_PIPELINE_INTERVAL_SECONDS", "1"))
+# The attack backend is polled once for all clients, this often, while any is connected
+STREAM_ATTACK_INTERVAL_SECONDS = float(os.getenv("STREAM_ATTACK_INTERVAL_SECONDS", "2"))
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+
+def _json_default(value):
+    # NumPy scalars in detector metrics
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def encode_json(value) -> Tuple[bytes, str]:
+    """JSON body and its strong ETag (a hash of the body)."""
+    body = json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+    return body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+class Event:
+    """One event, framed once for every subscriber."""
+    __slots__ = ("id", "type", "frame")
+
+    def __init__(self, event_id: int, event_type: str, body: bytes):
+        self.id = event_id
+        self.type = event_type
+        # Compact JSON never contains a raw newline, so it fits one data: line
+        self.frame = b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event_type.encode(), body)
+
+# Queued in place of a subscriber's backlog when it overflowed
+RESYNC = object()
+
+class Subscriber:
+    def __init__(self, max_queue: int):
+        self.queue: "asyncio.Queue" = asyncio.Queue(maxsize=max_queue)
+        self.resyncs = 0
+
+class EventHub:
+    """
+    Fan-out of server-push events (api/stream.py) to every connected client.
+
+    publish() may be called from any thread (detection worker, API
+    threadpool, event loop). The event is framed once in the caller's
+    thread and handed to the loop with a single call_soon_threadsafe;
+    the loop then appends the same frame to every subscriber's queue.
+    Nothing is done when nobody is subscribed.
+
+    Slow consumers never hold up publishers or other clients: each
+    subscriber has a bounded queue, and when it is full its backlog is
+    discarded and replaced by RESYNC, on which the stream sends a fresh
+    snapshot instead of the missed events.
+    """
+    _instance = None
+
+    def __init__(self, max_queue: int = STREAM_CLIENT_QUEUE_MAX, max_clients: int = STREAM_MAX_CLIENTS):
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        # Latest body of events published with retain=True, for snapshots
+        self.retained: Dict[str, bytes] = {}
+
+        self.published_total = 0
+        self.resyncs_total = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = EventHub()
+        return cls._instance
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Binds the hub to the event loop serving the streams."""
+        self._loop = loop
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self) -> Optional[Subscriber]:
+        """New subscriber, or None at STREAM_MAX_CLIENTS. Call on the event loop."""
+        if len(self._subscribers) >= self.max_clients:
+            return None
+        subscriber = Subscriber(self.max_queue)
+        self._subscribers.add(subscriber)
+        update_state(stream_clients=len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        update_state(stream_clients=len(self._subscribers))
+
+    def event(self, event_type: str, body: bytes) -> Event:
+        """Frames an event (e.g. a per-client snapshot) without publishing it."""
+        return Event(next(self._ids), event_type, body)
+
+    def publish(self, event_type: str, body: bytes, retain: bool = False):
+        """Broadcasts a JSON body as an event. Safe to call from any thread."""
+        if retain:
+            self.retained[event_type] = body
+        if self._loop is None or not self._subscribers:
+            return
+        event = self.event(event_type, body)
+        try:
+            self._loop.call_soon_threadsafe(self._fan_out, event)
+        except RuntimeError:
+            # Loop closed during shutdown
+            pass
+
+    def resync_all(self):
+        """Makes every subscriber reload a snapshot (e.g. after a state reset). Safe from any thread."""
+        if self._loop is not None and self._subscribers:
+            self._loop.call_soon_threadsafe(self._fan_out, RESYNC)
+
+    def _fan_out(self, event):
+        if event is RESYNC:
+            for subscriber in self._subscribers:
+                self._resync(subscriber)
+            return
+        self.published_total += 1
+        for subscriber in self._subscribers:
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: skip what it missed
+                self._resync(subscriber)
+                subscriber.resyncs += 1
+                self.resyncs_total += 1
+                update_state(stream_resyncs_total=self.resyncs_total)
+
+    def _resync(self, subscriber: Subscriber):
+        # Whatever is queued is superseded by the snapshot RESYNC triggers
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(RESYNC)
@@ -0,0 +1,117 @@
+"""
+Checks of the detector rules on hand-built window snapshots (no storage).
+
+  - a service without a trained baseline that fails is still flagged by
+    the cold-start rules while other services already have z-scores
+  - services with z-scores are left to the zscore detector
+  - with no trained baseline at all, the pooled cold-start rules run
+
+Usage:
+    python verify_detectors.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from detection.aggregation import combine_stats, compute_avg_latency, compute_error_rate, compute_log_rate
+from detection.registry import DetectorRegistry
+
+SHORT_SECONDS = 60
+BASELINE_SECONDS = 540
+
+def log(msg):
+    print(f"[TEST] {msg}")
+
+def stats(rows: int, errors: int = 0, latency: float = 50.0) -> dict:
+    return {
+        "row_count": rows,
+        "error_count": errors,
+        "level_error_count": errors,
+        "latency_sum": latency * rows,
+        "latency_count": rows,
+        "retry_sum": 0,
+        "retry_count": rows,
+    }
+
+def snapshot(short_by_service: dict, baseline_by_service: dict, z_scores: dict) -> dict:
+    short, baseline = combine_stats(short_by_service), combine_stats(baseline_by_service)
+    metrics = {
+        "error_rate_short": compute_error_rate(short),
+        "avg_latency_short": compute_avg_latency(short),
+        "log_rate_short": compute_log_rate(short, SHORT_SECONDS),
+        "avg_retry_short": 0.0,
+        "error_rate_baseline": compute_error_rate(baseline),
+        "avg_latency_baseline": compute_avg_latency(baseline),
+        "log_rate_baseline": compute_log_rate(baseline, BASELINE_SECONDS),
+        "avg_retry_baseline": 0.0,
+        "p95_latency_short": None,
+        "p95_latency_baseline": None,
+    }
+    return {
+        "metrics": metrics,
+        "short_by_service": short_by_service,
+        "baseline_by_service": baseline_by_service,
+        "windows": {},
+        "short_seconds": SHORT_SECONDS,
+        "baseline_seconds": BASELINE_SECONDS,
+        "z_scores": z_scores,
+    }
+
+# A healthy, high-volume trained service next to a small failing one
+HEALTHY_Z = {"error_rate": 0.1, "avg_latency": -0.2, "log_rate": 0.3}
+CASES = [
+    (
+        "untrained service failing next to a trained one",
+        snapshot({"api": stats(6000), "payments": stats(60, errors=60)},
+                 {"api": stats(54000), "payments": stats(540)},
+                 {"api": HEALTHY_Z}),
+        {"error_rate_spike"},
+    ),
+    (
+        "every service trained and healthy",
+        snapshot({"api": stats(6000), "payments": stats(60, errors=60)},
+                 {"api": stats(54000), "payments": stats(540)},
+                 {"api": HEALTHY_Z, "payments": HEALTHY_Z}),
+        set(),
+    ),
+    (
+        "untrained services healthy next to a trained one",
+        snapshot({"api": stats(6000, errors=3000), "payments": stats(60)},
+                 {"api": stats(54000), "payments": stats(540)},
+                 {"api": HEALTHY_Z}),
+        set(),
+    ),
+    (
+        "no trained baseline (pooled cold start)",
+        snapshot({"api": stats(6000), "payments": stats(600, errors=600)},
+                 {"api": stats(54000), "payments": stats(5400)},
+                 {}),
+        {"error_rate_spike"},
+    ),
+]
+
+def main():
+    registry = DetectorRegistry.get_instance()
+    threshold = next(detector for detector in registry.detectors if detector.name == "threshold")
+    ok = True
+    for name, case, expected in CASES:
+        signals = set(threshold.detect(case)["signals"])
+        if signals != expected:
+            log(f"FAILURE: {name}: threshold signals {sorted(signals)}, expected {sorted(expected)}")
+            ok = False
+        else:
+            log(f"ok: {name}: {sorted(signals)}")
+        # The whole registry must agree on the signal
+        outcome = registry.evaluate(case)
+        if not expected <= set(outcome["signals"]):
+            log(f"FAILURE: {name}: registry signals {outcome['signals']} miss {sorted(expected)}")
+            ok = False
+    if ok:
+        log("SUCCESS: detector rules behave as expected")
+    else:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Stress test for IncidentManager's concurrency model.
+
+One thread plays the detection loop (update() with random anomalies on a
+fast simulated clock, so incidents keep opening and resolving) while
+others hammer the API paths at the same time: reason (offline agent +
+update_reasoning), approve / reject, and readers of /incident/current and
+/incident/active. Runs against a scratch database and vector store.
+
+Checks:
+  - no unexpected exception in any thread
+  - every incident is decided (approved or rejected) at most once, and
+    the decision that won is the one the incident and the store hold
+  - published views are coherent (severity matches signals, approved
+    incidents carry the executed remediation)
+  - the manager's indexes and timers match its open incidents
+  - reads don't wait for the manager lock (a detection tick)
+
+Usage:
+    python verify_incident_concurrency.py [seconds]
+"""
+
+import os
+import sys
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="incident-stress-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch}/stress.db"
+
+import random
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from storage.database import Base, SessionLocal, engine
+from storage.migrations import run_migrations
+from storage.incident_repository import get_incident_record
+from correlation.incident_manager import ApprovalLockError, IncidentManager
+from correlation.incident_rules import calculate_severity
+from correlation.incident_store import IncidentStore
+from memory.vector_store import VectorStore
+from reasoning.agent import OfflineReasoningAgent
+
+SERVICES = [f"svc-{i}" for i in range(20)]
+SIGNALS = ["error_rate_spike", "latency_degradation", "traffic_volume_spike", "retry_storm"]
+READERS = 4
+DECIDERS = 4
+REASONERS = 2
+
+def log(msg):
+    print(f"[TEST] {msg}")
+
+class Stress:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.stop = threading.Event()
+        self.errors = []
+        self.lock = threading.Lock()
+        # incident_id -> decisions that succeeded
+        self.decisions = {}
+        self.counts = {"updates": 0, "reads": 0, "reasons": 0, "approved": 0, "rejected": 0, "refused": 0}
+        self.manager = IncidentManager.get_instance()
+        # Keep resolved stress incidents out of the real vector memory
+        self.manager.vector_store = VectorStore(
+            dim=self.manager.embedder.dim,
+            index_path=os.path.join(_scratch, "index.faiss"),
+            meta_path=os.path.join(_scratch, "meta.json"),
+        )
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counts[key] += n
+
+    def guarded(self, target):
+        def run():
+            try:
+                while not self.stop.is_set():
+                    target()
+            except Exception:
+                self.errors.append(traceback.format_exc())
+                self.stop.set()
+        return run
+
+    def detection_tick(self):
+        self.now += timedelta(seconds=random.choice([1, 5, 5, 30]))
+        anomaly = random.random() < 0.6
+        services = random.sample(SERVICES, random.randint(0, 3)) if anomaly else []
+        signals = random.sample(SIGNALS, random.randint(1, 2)) if anomaly else []
+        self.manager.update(
+            anomaly_result={"anomaly": anomaly, "signals": signals, "metrics": {"tick": self.counts["updates"]}},
+            affected_services=services,
+            now=self.now,
+        )
+        self.count("updates")
+
+    def read(self):
+        current = self.manager.get_current()
+        active = self.manager.get_open()
+        self.count("reads")
+        for view in ([current] if current else []) + active:
+            if view["severity"] != calculate_severity(set(view["signals"])):
+                raise AssertionError(f"Incoherent view of {view['incident_id']}: {view['severity']} for {view['signals']}")
+            if view["approval"]["status"] == "APPROVED" and view["remediation"]["status"] != "EXECUTED":
+                raise AssertionError(f"Approved {view['incident_id']} without executed remediation")
+
+    def pick(self):
+        # Mostly the current incident, so reasoners and deciders collide on it
+        current = self.manager.get_current()
+        if current and random.random() < 0.7:
+            return current["incident_id"]
+        views = self.manager.get_open()
+        return random.choice(views)["incident_id"] if views else None
+
+    def reason(self):
+        incident_id = self.pick()
+        if not incident_id:
+            return
+        incident = self.manager.get_incident(incident_id)
+        if incident is None:
+            # Resolved and evicted from the recent history since it was picked
+            return
+        data = incident.to_dict()
+        result = OfflineReasoningAgent().analyze_incident(data, data.get("similar_incidents", []))
+        # Some proposals fall under the approval threshold
+        result["confidence"] = random.choice([0.4, 0.7, 0.9])
+        self.manager.update_reasoning(incident_id, result)
+        self.count("reasons")
+
+    def decide(self):
+        incident_id = self.pick()
+        if not incident_id:
+            return
+        decision = random.choice(["APPROVE", "REJECT"])
+        try:
+            if decision == "APPROVE":
+                self.manager.approve_incident(incident_id, "stress", None)
+            else:
+                self.manager.reject_incident(incident_id, "stress", None)
+        except (ApprovalLockError, ValueError):
+            self.count("refused")
+            return
+        with self.lock:
+            self.decisions.setdefault(incident_id, []).append(decision)
+        self.count("approved" if decision == "APPROVE" else "rejected")
+
+    def run(self):
+        self.now = datetime.now(timezone.utc)
+        threads = [threading.Thread(target=self.guarded(self.detection_tick), name="detection")]
+        threads += [threading.Thread(target=self.guarded(self.read), name=f"reader-{i}") for i in range(READERS)]
+        threads += [threading.Thread(target=self.guarded(self.decide), name=f"decider-{i}") for i in range(DECIDERS)]
+        threads += [threading.Thread(target=self.guarded(self.reason), name=f"reasoner-{i}") for i in range(REASONERS)]
+        for thread in threads:
+            thread.start()
+        self.stop.wait(self.seconds)
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+
+    def reads_while_locked(self) -> bool:
+        """Readers must not wait for a detection tick holding the manager lock."""
+        done = threading.Event()
+
+        def read():
+            self.manager.get_current()
+            self.manager.get_open()
+            for view in self.manager.get_open():
+                self.manager.get_incident(view["incident_id"])
+            done.set()
+
+        with self.manager._lock:
+            reader = threading.Thread(target=read)
+            reader.start()
+            finished = done.wait(5)
+        reader.join()
+        return finished
+
+    def check(self) -> bool:
+        ok = True
+        if not self.reads_while_locked():
+            log("FAILURE: reads blocked while the manager lock was held")
+            ok = False
+        if self.errors:
+            log(f"FAILURE: {len(self.errors)} thread(s) raised:")
+            for error in self.errors:
+                print(error)
+            ok = False
+
+        store = IncidentStore.get_instance()
+        store.flush()
+        db = SessionLocal()
+        try:
+            for incident_id, decisions in self.decisions.items():
+                if len(decisions) > 1:
+                    log(f"FAILURE: {incident_id} decided {len(decisions)} times: {decisions}")
+                    ok = False
+                    continue
+                expected = "APPROVED" if decisions[0] == "APPROVE" else "REJECTED"
+                incident = self.manager.get_incident(incident_id)
+                if incident is not None and incident.to_dict()["approval"]["status"] != expected:
+                    log(f"FAILURE: {incident_id} shows {incident.to_dict()['approval']['status']}, decision was {expected}")
+                    ok = False
+                record = get_incident_record(db, incident_id)
+                if record is None or record["approval"]["status"] != expected:
+                    log(f"FAILURE: stored approval of {incident_id} does not match {expected}")
+                    ok = False
+        finally:
+            db.close()
+
+        manager = self.manager
+        with manager._lock:
+            for incident_id, incident in manager.incidents.items():
+                if incident.status == "RESOLVED" or manager._timers.deadline(incident_id) is None:
+                    log(f"FAILURE: open incident {incident_id} is {incident.status} / has no timer")
+                    ok = False
+                for svc in incident.services:
+                    if manager._by_service.get(svc) != incident_id:
+                        log(f"FAILURE: service {svc} not indexed to {incident_id}")
+                        ok = False
+            if len(manager._timers) != len(manager.incidents):
+                log(f"FAILURE: {len(manager._timers)} timers for {len(manager.incidents)} open incidents")
+                ok = False
+            stale = [svc for svc, incident_id in manager._by_service.items() if incident_id not in manager.incidents]
+            if stale:
+                log(f"FAILURE: services indexed to resolved incidents: {stale}")
+                ok = False
+        return ok
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    IncidentStore.get_instance().start()
+
+    # Switch threads far more often than the default 5 ms so check-then-act races get a chance
+    sys.setswitchinterval(1e-5)
+    stress = Stress(seconds)
+    log(f"Hammering IncidentManager for {seconds:g}s "
+        f"(1 detection, {READERS} readers, {DECIDERS} deciders, {REASONERS} reasoners)")
+    stress.run()
+    ok = stress.check()
+    IncidentStore.get_instance().stop()
+
+    log(f"Counts: {stress.counts}, open incidents: {len(stress.manager.get_open())}")
+    if ok:
+        log("SUCCESS: no races detected")
+    else:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+const BASE_URL = import.meta.env.VITE_MONITORING_BACKEND_URL || "http://localhost:5000";
+
+// Live dashboard state pushed by the backend (GET /stream/events).
+// Calls onState({ incident, pipeline, attack }) on every change and
+// onUnavailable() if the stream never connects (e.g. an older backend),
+// so the caller can fall back to polling. Returns a function closing the stream.
+export function subscribeDashboard(onState, onUnavailable) {
+    const source = new EventSource(`${BASE_URL}/stream/events`);
+    let connected = false;
+    let incidents = {};
+    let currentId = null;
+    let pipeline = null;
+    let attack = null;
+
+    const emit = () => onState({ incident: incidents[currentId] || null, pipeline, attack });
+
+    // Events of an incident can arrive out of order around a snapshot
+    const keep = (incident) => {
+        const held = incidents[incident.incident_id];
+        if (!held || held.version <= incident.version) {
+            incidents[incident.incident_id] = incident;
+        }
+    };
+
+    // Only open incidents and the current one are needed
+    const prune = () => {
+        Object.keys(incidents).forEach((id) => {
+            if (id !== currentId && incidents[id].status === "RESOLVED") {
+                delete incidents[id];
+            }
+        });
+    };
+
+    source.addEventListener("snapshot", (e) => {
+        const data = JSON.parse(e.data);
+        connected = true;
+        incidents = {};
+        data.incidents.forEach(keep);
+        if (data.current) keep(data.current);
+        currentId = data.current ? data.current.incident_id : null;
+        pipeline = data.pipeline;
+        attack = data.attack;
+        emit();
+    });
+    source.addEventListener("incident", (e) => {
+        keep(JSON.parse(e.data));
+        prune();
+        emit();
+    });
+    source.addEventListener("current", (e) => {
+        currentId = JSON.parse(e.data).incident_id;
+        prune();
+        emit();
+    });
+    source.addEventListener("pipeline", (e) => {
+        pipeline = { ...pipeline, ...JSON.parse(e.data) };
+        emit();
+    });
+    source.addEventListener("attack", (e) => {
+        attack = JSON.parse(e.data);
+        emit();
+    });
+    source.onerror = () => {
+        // Once connected, EventSource reconnects by itself and gets a new snapshot
+        if (!connected) {
+            source.close();
+            if (onUnavailable) onUnavailable();
+        }
+    };
+
+    return () => source.close();
+}
@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { getCurrentIncident } from "../api/incidentApi";
 import { getAttackStatus, getPipelineStatus } from "../api/monitoringApi";
+import { subscribeDashboard } from "../api/streamApi";
 import { Link } from "react-router-dom";
 import StatusBanner from "../components/StatusBanner";
 import LoadingSpinner from "../components/LoadingSpinner";
@@ -13,6 +14,7 @@ export default function IncidentsPage() {
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
+        let interval = null;
         const fetchData = async () => {
             try {
                 const [incData, attData, pipeData] = await Promise.all([
@@ -30,10 +32,21 @@ export default function IncidentsPage() {
             }
         };
 
-        fetchData();
-        const interval = setInterval(fetchData, 2000);
+        // Pushed updates; poll every 2s only if the stream is unavailable
+        const closeStream = subscribeDashboard((state) => {
+            setIncident(state.incident);
+            setAttackStatus(state.attack);
+            setPipelineStatus(state.pipeline);
+            setLoading(false);
+        }, () => {
+            fetchData();
+            interval = setInterval(fetchData, 2000);
+        });
 
-        return () => clearInterval(interval);
+        return () => {
+            closeStream();
+            if (interval) clearInterval(interval);
+        };
     }, []);
 
     if (loading) {